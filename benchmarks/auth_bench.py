@@ -0,0 +1,261 @@
+"""
+benchmark that is used to measure the auth subsystem at scale, on synthetic users, roles, permissions and resources
+
+The auth config is generated once per run into a temporary directory, then the construction and the load,
+the saves, the lookups, the checks, the grants and the resource accesses are measured on it.
+
+Usage:
+    python -m benchmarks.auth_bench [--users 100000] [--roles 1000] [--permissions 10000] [--resources 10000]
+        [--storage json|sqlite] [--trusted] [--json results.json] [--baseline former.json]
+"""
+import argparse
+import pathlib
+import random
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, NamedTuple
+
+from benchmarks.harness import BenchResult, add_arguments, alpha_name, measure, report, trace_memory
+from modules.auth.core import AuthorizationManager
+from modules.auth.permissions import Permission, PermissionCode, auth_check
+from modules.auth.records import AuthTables
+from modules.auth.resources import Resource, required_perm_generator
+from modules.auth.roles import Role
+from modules.auth.storage import SectionChange, make_storage
+from modules.auth.users import User
+
+# the categories the synthetic permissions are spread over, the super permission is left to the root
+CATEGORIES = [code.value for code in PermissionCode if code is not PermissionCode.SuperPermission]
+
+
+class AuthScale(NamedTuple):
+    """
+    The size of the synthetic auth data.
+    """
+
+    users: int
+    roles: int
+    permissions: int
+    resources: int
+    perms_per_role: int
+    roles_per_user: int
+
+
+def generate_config(path: pathlib.Path, scale: AuthScale, seed: int = 0) -> None:
+    """
+    Write the synthetic auth objects into the storage at the path, the same way the auth manager saves them.
+    """
+    rng = random.Random(seed)
+    permissions = [
+        Permission(id=CATEGORIES[i % len(CATEGORIES)], name=alpha_name(i, "perm")) for i in range(scale.permissions)
+    ]
+    roles = [
+        Role.construct(
+            id=i + 1,
+            name=alpha_name(i, "role"),
+            permissions=rng.sample(permissions, min(scale.perms_per_role, len(permissions))),
+            parents=[],
+        )
+        for i in range(scale.roles)
+    ]
+    users = [
+        User.construct(
+            id=10000 + i,
+            name=alpha_name(i, "user"),
+            roles=rng.sample(roles, min(scale.roles_per_user, len(roles))),
+        )
+        for i in range(scale.users)
+    ]
+    resources = [
+        Resource.construct(
+            id=i + 1, name=alpha_name(i, "res"), required_permissions=required_perm_generator(alpha_name(i, "res"))
+        )
+        for i in range(scale.resources)
+    ]
+    sections = {
+        "Permissions": permissions,
+        "Roles": roles,
+        "Users": users,
+        "Resources": resources,
+    }
+    storage = make_storage(path)
+    storage.save(
+        {key: SectionChange({obj.unique_label: obj for obj in objects}, None) for key, objects in sections.items()}
+    )
+    getattr(storage, "close", lambda: None)()
+
+
+def bench_load(path: pathlib.Path, trusted: bool, memory: bool) -> List[Any]:
+    """
+    Returns: the loaded manager and the measurement of its construction, which loads the whole config.
+    """
+
+    def _construct() -> AuthorizationManager:
+        return AuthorizationManager(id=1, name="bench", config_file_path=path, trusted_load=trusted)
+
+    start = time.perf_counter()
+    manager = _construct()
+    seconds = time.perf_counter() - start
+    peak = retained = None
+    if memory:
+        del manager
+        manager, peak, retained = trace_memory(_construct)
+    return [manager, BenchResult("construct and load", 1, seconds, peak, retained)]
+
+
+def bench_manager(manager: AuthorizationManager, scale: AuthScale, args: argparse.Namespace) -> List[BenchResult]:
+    rng = random.Random(1)
+    memory = not args.no_memory
+    repeat = args.repeat
+    number = args.number
+    users = manager.users
+    roles = [role for role in manager.roles if role.id]
+    permissions = manager.permissions
+    resources = manager.resources
+    picked = [rng.choice(users) for _ in range(number)]
+    results: List[BenchResult] = []
+
+    def _measure(name: str, operation, ops: int, **kwargs) -> None:
+        results.append(measure(name, operation, ops, repeat, memory, **kwargs))
+
+    def _each(operation):
+        # the operation is applied to the picked objects in turn, one per op
+        iterator = iter(())
+
+        def _next():
+            nonlocal iterator
+            try:
+                return operation(next(iterator))
+            except StopIteration:
+                iterator = iter(picked)
+                return operation(next(iterator))
+
+        return _next
+
+    _measure("get_user by label", _each(lambda user: manager.get_user(user.id, user.name)), number)
+    # the lookups by the id or the name alone scan all the users
+    scans = max(1, number // 100)
+    _measure("get_user by id", _each(lambda user: manager.get_user(user_id=user.id)), scans)
+    _measure("get_user by name", _each(lambda user: manager.get_user(user_name=user.name)), scans)
+
+    _measure("tables compile", lambda: AuthTables.compile(manager.version, users, manager.role_closure()), 1)
+    tables = manager.tables()
+    _measure("resolve_permissions cached", lambda: tables.resolve(users[0].id), number)
+    fresh: List[AuthTables] = [tables]
+
+    def _fresh_tables():
+        # new tables, so every op of the timing misses the cache of the effective permissions
+        fresh[0] = AuthTables.compile(manager.version, users, manager.role_closure())
+
+    _measure("resolve_permissions uncached", _each(lambda user: fresh[0].resolve(user.id)), number, setup=_fresh_tables)
+
+    query = list(roles[0].permissions)
+    hit, miss = [query[0]], [Permission(id=CATEGORIES[0], name="missing")]
+    _measure("auth_check hit", lambda: auth_check(hit, query), number)
+    _measure("auth_check miss", lambda: auth_check(miss, query), number)
+    _measure("auth_check all required", lambda: auth_check(query, query, all_required=True), number)
+
+    resource = Resource(
+        id=1,
+        name="benchSource",
+        source={"entries": {alpha_name(i, "key"): i for i in range(1000)}},
+        required_permissions=required_perm_generator("benchSource"),
+    )
+    granted = query + [
+        Permission(id=code, name="benchSource")
+        for code in (PermissionCode.ReadPermission.value, PermissionCode.ModifyPermission.value)
+    ]
+    _measure("Resource.get_read", lambda: resource.get_read(granted), number)
+    _measure("Resource.get_read deep copy", lambda: resource.get_read(granted, deep_copy=True), max(1, number // 100))
+    _measure(
+        "Resource.get_modify",
+        lambda: resource.get_modify(granted, lambda source: source.__setitem__("modified", True)),
+        number,
+    )
+
+    # the grants are batched, so the one save and publish at the exit are spread over the ops
+    grants = max(1, min(number, len(users), len(roles)))
+
+    def _grant_roles():
+        with manager.batch():
+            for user in rng.sample(users, grants):
+                manager.grant_role_to_user(rng.choice(roles).unique_label, user.unique_label)
+
+    def _grant_perms():
+        with manager.batch():
+            for _ in range(grants):
+                manager.grant_perm_to_role(rng.choice(permissions).unique_label, rng.choice(roles).unique_label)
+
+    def _grant_resource_perms():
+        with manager.batch():
+            for _ in range(grants):
+                manager.grant_perm_to_resource(
+                    rng.choice(permissions).unique_label, rng.choice(resources).unique_label, "read"
+                )
+
+    for name, operation in (
+        ("grant_role_to_user batched", _grant_roles),
+        ("grant_perm_to_role batched", _grant_perms),
+        ("grant_perm_to_resource batched", _grant_resource_perms),
+    ):
+        _measure(name, operation, 1)
+        results[-1] = results[-1]._replace(ops=grants)
+
+    # a single grant is saved on its own, the save is most of its cost
+    _measure(
+        "grant_role_to_user saved",
+        lambda: manager.grant_role_to_user(rng.choice(roles).unique_label, rng.choice(users).unique_label),
+        1,
+    )
+
+    def _mark_all():
+        for section in manager._managers:
+            section.mark_dirty()
+
+    _measure("save full rewrite", manager.flush, 1, setup=_mark_all)
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100000, help="the synthetic users")
+    parser.add_argument("--roles", type=int, default=1000, help="the synthetic roles")
+    parser.add_argument("--permissions", type=int, default=10000, help="the synthetic permissions")
+    parser.add_argument("--resources", type=int, default=10000, help="the synthetic resources")
+    parser.add_argument("--perms-per-role", type=int, default=10, help="the permissions granted to every role")
+    parser.add_argument("--roles-per-user", type=int, default=2, help="the roles granted to every user")
+    parser.add_argument("--storage", choices=["json", "sqlite"], default="json", help="the storage of the config")
+    parser.add_argument("--trusted", action="store_true", help="load the config without validation")
+    parser.add_argument("--number", type=int, default=1000, help="the ops per timing of the fast operations")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    scale = AuthScale(
+        users=args.users,
+        roles=args.roles,
+        permissions=args.permissions,
+        resources=args.resources,
+        perms_per_role=args.perms_per_role,
+        roles_per_user=args.roles_per_user,
+    )
+    params: Dict[str, Any] = {
+        **scale._asdict(),
+        "storage": args.storage,
+        "trusted": args.trusted,
+        "number": args.number,
+        "repeat": args.repeat,
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        path = pathlib.Path(directory) / f"auth_bench.{'db' if args.storage == 'sqlite' else 'json'}"
+        start = time.perf_counter()
+        generate_config(path, scale)
+        print(f"generated {scale} in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+        manager, load_result = bench_load(path, args.trusted, not args.no_memory)
+        results = [load_result] + bench_manager(manager, scale, args)
+        getattr(manager._storage, "close", lambda: None)()
+    return report(args, "auth", params, results)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
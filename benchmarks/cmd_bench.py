@@ -0,0 +1,162 @@
+"""
+benchmark that is used to measure the cmd interpreter on synthetic cmd trees
+
+The tree is made of namespaces down to the depth, each one with fanout children, the last level is executable,
+every node has the given count of aliases, the leaves require an execute permission.
+The deepest path is the last child at every level, the worst case of the lookups by name.
+
+Usage:
+    python -m benchmarks.cmd_bench [--depth 4] [--fanout 8] [--aliases 2] [--number 2000]
+        [--json results.json] [--baseline former.json]
+"""
+import argparse
+import sys
+from typing import Any, Callable, Dict, List
+
+from benchmarks.harness import BenchResult, add_arguments, alpha_name, measure, measure_async, report
+from modules.auth.permissions import Permission, PermissionCode
+from modules.auth.resources import RequiredPermission
+from modules.cmd import ExecutableNode, NameSpaceNode, has_identifier_collision, tokenize_cmd
+
+RUN_PERMISSION = Permission(id=PermissionCode.ExecutePermission.value, name="benchRun")
+
+
+def node_name(index: int) -> str:
+    return alpha_name(index, "n")
+
+
+def node_aliases(index: int, aliases: int) -> List[str]:
+    return [f"{node_name(index)}{k}" for k in range(aliases)]
+
+
+def make_leaf(index: int, aliases: int) -> ExecutableNode:
+    def _echo(text: str = "", times: int = 1) -> str:
+        """
+        Echo the text the times given
+        """
+        return text * times
+
+    return ExecutableNode(
+        name=node_name(index),
+        aliases=node_aliases(index, aliases),
+        source=_echo,
+        help_message="A synthetic leaf",
+        required_permissions=RequiredPermission(execute=[RUN_PERMISSION]),
+    )
+
+
+def build_tree(depth: int, fanout: int, aliases: int, index: int = 0) -> NameSpaceNode:
+    """
+    Build the synthetic tree, namespaces down to the depth with executable leaves on the last level.
+
+    Args:
+        depth (int): The levels below the built namespace.
+        fanout (int): The children of every namespace.
+        aliases (int): The aliases of every node.
+        index (int, optional): The index the built namespace is named by. Defaults to 0.
+
+    Returns:
+        NameSpaceNode: The root of the tree.
+    """
+    if depth <= 1:
+        children = [make_leaf(i, aliases) for i in range(fanout)]
+    else:
+        children = [build_tree(depth - 1, fanout, aliases, i) for i in range(fanout)]
+    return NameSpaceNode(
+        name=node_name(index),
+        aliases=node_aliases(index, aliases),
+        help_message="A synthetic namespace",
+        children_node=children,
+    )
+
+
+def bench_cmd(args: argparse.Namespace) -> List[BenchResult]:
+    memory = not args.no_memory
+    repeat = args.repeat
+    number = args.number
+    results: List[BenchResult] = []
+
+    def _measure(name: str, operation: Callable[[], Any], ops: int = number, **kwargs) -> None:
+        results.append(measure(name, operation, ops, repeat, memory, **kwargs))
+
+    _measure("build tree", lambda: build_tree(args.depth, args.fanout, args.aliases), 1)
+    root = NameSpaceNode(name="root", children_node=[build_tree(args.depth, args.fanout, args.aliases)])
+    last = args.fanout - 1
+    # through the aliases where there are, the lookup matches the names and the aliases alike
+    path = [node_name(0)] + [
+        node_aliases(last, args.aliases)[-1] if args.aliases else node_name(last) for _ in range(args.depth)
+    ]
+    cmd = " ".join(path + ["hello", "3"])
+    quoted = " ".join(path + ['"hello world"', "3"])
+    missing = " ".join(path[:-1] + ["missing"])
+    granted = [RUN_PERMISSION]
+
+    _measure("tokenize_cmd", lambda: tokenize_cmd(cmd))
+    _measure("tokenize_cmd quoted", lambda: tokenize_cmd(quoted))
+    _measure("get_node deepest", lambda: root.get_node(path, granted))
+
+    async def _hit():
+        return await (await root.interpret(cmd, granted))
+
+    async def _miss():
+        try:
+            await root.interpret(missing, granted)
+        except KeyError:
+            return
+        raise AssertionError("the missing cmd is found")
+
+    async def _denied():
+        try:
+            await (await root.interpret(cmd, []))
+        except PermissionError:
+            return
+        raise AssertionError("the cmd is run without the permission")
+
+    async def _doc():
+        return await root.interpret(" ".join(path + ["help"]), granted, "help")
+
+    for name, factory in (
+        ("interpret hit", _hit),
+        ("interpret miss", _miss),
+        ("interpret permission denied", _denied),
+        ("interpret doc", _doc),
+    ):
+        results.append(measure_async(name, factory, number, repeat, memory))
+
+    namespace = root.get_node(path[:-1], granted)
+    extra = make_leaf(args.fanout + 1, args.aliases)
+
+    def _add_node():
+        namespace.add_node(extra, granted)
+        namespace.children_node.pop()
+
+    _measure("add_node", _add_node)
+    _measure("has_identifier_collision", lambda: has_identifier_collision(namespace.children_node))
+    _measure("__doc__ namespace", lambda: namespace.__doc__())
+    _measure("__doc__ leaf", lambda: namespace.children_node[-1].__doc__())
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--depth", type=int, default=4, help="the levels of the tree")
+    parser.add_argument("--fanout", type=int, default=8, help="the children of every namespace")
+    parser.add_argument("--aliases", type=int, default=2, help="the aliases of every node")
+    parser.add_argument("--number", type=int, default=2000, help="the ops per timing")
+    add_arguments(parser)
+    args = parser.parse_args()
+    if args.depth < 1 or args.fanout < 1:
+        parser.error("the depth and the fanout must be positive")
+
+    params: Dict[str, Any] = {
+        "depth": args.depth,
+        "fanout": args.fanout,
+        "aliases": args.aliases,
+        "number": args.number,
+        "repeat": args.repeat,
+    }
+    return report(args, "cmd", params, bench_cmd(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
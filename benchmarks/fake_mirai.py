@@ -0,0 +1,343 @@
+"""
+fake_mirai that is used as a local stand-in of the mirai-api-http backend and of the http backends of the extensions
+
+The stand-in speaks the subset of the websocket protocol of mirai-api-http that Ariadne uses:
+the verification on /all, the events pushed with the syncId -1, and the commands answered by their syncId.
+The sent messages are handed over as the replies of the bot, the contact lists are made of the known groups and friends.
+The stub backends answer any http request of the extensions, which reach them through StubHttpClient.
+"""
+import asyncio
+import io
+import itertools
+import json
+import threading
+import time
+import wave
+import zlib
+import struct
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+from aiohttp import WSMsgType, web
+
+from modules.http_client import HttpClient, HttpClientConfig
+
+# the header the stub backends are told the original host by
+STUB_HOST_HEADER: str = "X-Stub-Host"
+# the commands of mirai-api-http that send a message
+SEND_COMMANDS = ("sendGroupMessage", "sendFriendMessage", "sendTempMessage", "sendNudge")
+
+
+class Reply(NamedTuple):
+    """
+    A message sent by the bot.
+
+    Attributes:
+        command (str): The command it is sent with, like sendGroupMessage.
+        target (int): The group or the friend it is sent to.
+        time (float): The perf_counter at which it is received.
+        message_chain (List[Dict[str, Any]]): The serialized message chain.
+    """
+
+    command: str
+    target: int
+    time: float
+    message_chain: List[Dict[str, Any]]
+
+
+def serialize_group(group_id: int, name: str) -> Dict[str, Any]:
+    return {"id": group_id, "name": name, "permission": "MEMBER"}
+
+
+def serialize_member(member_id: int, name: str, group: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": member_id,
+        "memberName": name,
+        "specialTitle": "",
+        "permission": "MEMBER",
+        "joinTimestamp": 0,
+        "lastSpeakTimestamp": 0,
+        "muteTimeRemaining": 0,
+        "group": group,
+    }
+
+
+def serialize_friend(friend_id: int, name: str) -> Dict[str, Any]:
+    return {"id": friend_id, "nickname": name, "remark": ""}
+
+
+def make_png() -> bytes:
+    """
+    Returns: a 1x1 png, the body of the stubbed images.
+    """
+
+    def _chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    header = struct.pack(">IIBBBBB", 1, 1, 8, 6, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + _chunk(b"IHDR", header)
+        + _chunk(b"IDAT", zlib.compress(b"\x00\x00\x00\x00\x00"))
+        + _chunk(b"IEND", b"")
+    )
+
+
+def make_wav(seconds: float = 0.1, rate: int = 8000) -> bytes:
+    """
+    Returns: a silent wav, the body of the stubbed voices.
+    """
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(b"\x00\x00" * int(seconds * rate))
+    return buffer.getvalue()
+
+
+def _translate(request: web.Request) -> web.Response:
+    # the baidu translation api, the query is handed back as its translation
+    query = request.query.get("q", "")
+    return web.json_response(
+        {"from": "auto", "to": request.query.get("to", "en"), "trans_result": [{"src": query, "dst": query}]}
+    )
+
+
+def _speakers(_: web.Request) -> web.Response:
+    # the simple-vits-api
+    return web.json_response({"VITS": [{"id": 0, "lang": ["zh", "ja"], "name": "stub"}]})
+
+
+def _voice(_: web.Request) -> web.Response:
+    return web.Response(
+        body=make_wav(), content_type="audio/wav", headers={"Content-Disposition": "attachment; filename=stub.wav"}
+    )
+
+
+# the stubs by the tail of the requested path, the first matching one answers
+STUB_ROUTES: Dict[str, Callable[[web.Request], web.Response]] = {
+    "/translate": _translate,
+    "/voice/speakers": _speakers,
+    "/voice": _voice,
+}
+IMAGE_SUFFIXES = (".png", ".jpg", ".jpeg", ".gif", ".webp")
+
+
+class StubHttpClient(HttpClient):
+    """
+    The shared http client with every request sent to the stub backends instead,
+    the original host is kept in the STUB_HOST_HEADER header.
+    """
+
+    def __init__(self, stub_url: str, config: Optional[HttpClientConfig] = None):
+        super().__init__(config)
+        self._stub = urlsplit(stub_url)
+
+    async def request(self, method: str, url: str, **kwargs):
+        parts = urlsplit(url)
+        kwargs["headers"] = {**(kwargs.get("headers") or {}), STUB_HOST_HEADER: parts.netloc}
+        rerouted = urlunsplit((self._stub.scheme, self._stub.netloc, parts.path, parts.query, parts.fragment))
+        return await super().request(method, rerouted, **kwargs)
+
+
+class FakeMirai(object):
+    """
+    The stand-in of mirai-api-http for one account, with the stub backends, served by its own thread and event loop.
+
+    Notes:
+        the events are pushed and the replies are handed over inside the loop of the stand-in,
+        use run to schedule a coroutine there from another thread
+    """
+
+    def __init__(
+        self,
+        account: int,
+        verify_key: str,
+        groups: Dict[int, str],
+        members: Dict[int, str],
+        friends: Dict[int, str],
+        backend_delay: float = 0.0,
+    ):
+        """
+        Args:
+            account (int): The account of the bot.
+            verify_key (str): The verify key the bot must connect with.
+            groups (Dict[int, str]): The ids of the groups mapped to their names.
+            members (Dict[int, str]): The ids of the members of every group mapped to their names.
+            friends (Dict[int, str]): The ids of the friends mapped to their names.
+            backend_delay (float, optional): The seconds every stub backend request takes. Defaults to 0.
+        """
+        self._account = account
+        self._verify_key = verify_key
+        self._groups = groups
+        self._members = members
+        self._friends = friends
+        self._backend_delay = backend_delay
+        self._message_ids = itertools.count(1)
+        self._events: Dict[int, Dict[str, Any]] = {}
+        self._ws: Optional[web.WebSocketResponse] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._runners: List[web.AppRunner] = []
+        self._thread: Optional[threading.Thread] = None
+        self._started = threading.Event()
+        self.connected = threading.Event()
+        # the replies are handed to on_reply and counted, not kept, so the stand-in does not weigh on the memory
+        self.reply_count: int = 0
+        self.on_reply: Optional[Callable[[Reply], None]] = None
+        self.mirai_url: str = ""
+        self.backend_url: str = ""
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return self._loop
+
+    def start(self) -> None:
+        """
+        Start serving in a daemon thread, returns once the servers listen.
+        """
+        self._thread = threading.Thread(target=self._serve, name="fake-mirai", daemon=True)
+        self._thread.start()
+        self._started.wait()
+
+    def stop(self) -> None:
+        """
+        Stop serving and wait for the thread to finish.
+        """
+        if self._loop is not None and self._loop.is_running():
+            self.run(self._cleanup()).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join() if self._thread else None
+
+    def run(self, coroutine) -> "asyncio.Future":
+        """
+        Schedule the coroutine in the loop of the stand-in from another thread.
+
+        Returns:
+            concurrent.futures.Future: The future of its result.
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+
+    async def push(self, event: Dict[str, Any]) -> None:
+        """
+        Push an event to the bot, the message events are kept so they could be fetched by their source id.
+
+        Args:
+            event (Dict[str, Any]): The serialized mirai event, like a GroupMessage.
+        """
+        for element in event.get("messageChain", ()):
+            if element.get("type") == "Source":
+                self._events[element["id"]] = event
+        await self._ws.send_str(json.dumps({"syncId": "-1", "data": event}))
+
+    def next_message_id(self) -> int:
+        return next(self._message_ids)
+
+    def _serve(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_until_complete(self._setup())
+        self._started.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            self._loop.close()
+
+    async def _setup(self) -> None:
+        mirai = web.Application()
+        mirai.router.add_get("/all", self._handle_ws)
+        backend = web.Application()
+        backend.router.add_route("*", "/{tail:.*}", self._handle_backend)
+        urls = []
+        for app in (mirai, backend):
+            runner = web.AppRunner(app, access_log=None)
+            await runner.setup()
+            site = web.TCPSite(runner, "127.0.0.1", 0)
+            await site.start()
+            self._runners.append(runner)
+            urls.append(f"http://127.0.0.1:{runner.addresses[0][1]}")
+        self.mirai_url, self.backend_url = urls
+
+    async def _cleanup(self) -> None:
+        if self._ws is not None:
+            await self._ws.close()
+        for runner in self._runners:
+            await runner.cleanup()
+
+    async def _handle_ws(self, request: web.Request) -> web.WebSocketResponse:
+        if request.query.get("verifyKey") != self._verify_key or request.query.get("qq") != str(self._account):
+            return web.json_response({"code": 1, "msg": "Auth Key错误"})
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self._ws = ws
+        await ws.send_str(json.dumps({"syncId": "", "data": {"code": 0, "session": "fake-session"}}))
+        self.connected.set()
+        async for message in ws:
+            if message.type != WSMsgType.TEXT:
+                continue
+            payload = json.loads(message.data)
+            data = self._answer(payload["command"], payload.get("subCommand"), payload.get("content") or {})
+            await ws.send_str(json.dumps({"syncId": payload["syncId"], "data": data}))
+        self.connected.clear()
+        return ws
+
+    def _answer(self, command: str, sub_command: Optional[str], content: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Returns: the answer to a command, every unknown command succeeds with an empty answer.
+        """
+        if command in SEND_COMMANDS:
+            reply = Reply(
+                command,
+                content.get("target") or content.get("qq"),
+                time.perf_counter(),
+                content.get("messageChain", []),
+            )
+            self.reply_count += 1
+            self.on_reply(reply) if self.on_reply else None
+            return {"code": 0, "msg": "success", "messageId": self.next_message_id()}
+        if command == "groupList":
+            return {"code": 0, "msg": "", "data": [self.group(group_id) for group_id in self._groups]}
+        if command == "friendList":
+            return {"code": 0, "msg": "", "data": [self.friend(friend_id) for friend_id in self._friends]}
+        if command == "memberList":
+            target = content.get("target")
+            return {"code": 0, "msg": "", "data": [self.member(member_id, target) for member_id in self._members]}
+        if command == "memberInfo" and sub_command == "get":
+            member_id, group_id = content.get("memberId"), content.get("target")
+            if member_id == self._account:
+                # the bot is a member of every group
+                return {"code": 0, "msg": "", "data": serialize_member(member_id, "bot", self.group(group_id))}
+            if member_id not in self._members:
+                return {"code": 5, "msg": "指定对象不存在"}
+            return {"code": 0, "msg": "", "data": self.member(member_id, group_id)}
+        if command == "messageFromId":
+            event = self._events.get(content.get("messageId", content.get("id")))
+            return {"code": 0, "msg": "", "data": event} if event else {"code": 5, "msg": "指定对象不存在"}
+        if command == "about":
+            return {"code": 0, "msg": "", "data": {"version": "2.9.2"}}
+        return {"code": 0, "msg": ""}
+
+    async def _handle_backend(self, request: web.Request) -> web.StreamResponse:
+        await request.read()
+        if self._backend_delay:
+            await asyncio.sleep(self._backend_delay)
+        path = request.path.rstrip("/")
+        for tail, stub in STUB_ROUTES.items():
+            if path.endswith(tail):
+                return stub(request)
+        if (
+            path.lower().endswith(IMAGE_SUFFIXES)
+            or request.method == "GET"
+            and "image" in request.headers.get("Accept", "")
+        ):
+            return web.Response(body=make_png(), content_type="image/png")
+        return web.json_response({})
+
+    def group(self, group_id: int) -> Dict[str, Any]:
+        return serialize_group(group_id, self._groups[group_id])
+
+    def member(self, member_id: int, group_id: int) -> Dict[str, Any]:
+        return serialize_member(member_id, self._members[member_id], self.group(group_id))
+
+    def friend(self, friend_id: int) -> Dict[str, Any]:
+        return serialize_friend(friend_id, self._friends[friend_id])
@@ -0,0 +1,271 @@
+"""
+harness that is used to time the benchmark operations and record their results in a comparable form
+
+The results of a suite are printed as a table and could be written as json with --json,
+a former json given by --baseline is compared against, the operations slower than the threshold are flagged.
+"""
+import argparse
+import asyncio
+import datetime
+import gc
+import json
+import pathlib
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+# the version of the json layout written by dump_results
+RESULTS_FORMAT: int = 1
+
+
+class BenchResult(NamedTuple):
+    """
+    The measurement of an operation.
+
+    Attributes:
+        name (str): The name of the operation, unique within the suite.
+        ops (int): The operations run per timing.
+        seconds (float): The seconds taken by the ops, the best of the repeats.
+        peak_bytes (Optional[int]): The peak of the bytes allocated by one operation, None if not traced.
+        retained_bytes (Optional[int]): The bytes still allocated after one operation, None if not traced.
+    """
+
+    name: str
+    ops: int
+    seconds: float
+    peak_bytes: Optional[int] = None
+    retained_bytes: Optional[int] = None
+
+    @property
+    def ops_per_sec(self) -> float:
+        return self.ops / self.seconds if self.seconds > 0 else float("inf")
+
+    @property
+    def us_per_op(self) -> float:
+        return self.seconds / self.ops * 1e6
+
+
+def alpha_name(index: int, prefix: str = "") -> str:
+    """
+    Returns: a name unique to the index made of letters only, as the auth and the cmd names of the synthetic data.
+    """
+    letters = []
+    while True:
+        index, rest = divmod(index, 26)
+        letters.append(chr(97 + rest))
+        if not index:
+            break
+    return prefix + "".join(reversed(letters))
+
+
+def trace_memory(operation: Callable[[], Any]) -> Tuple[Any, int, int]:
+    """
+    Run the operation once with the allocations traced.
+
+    Returns:
+        Tuple[Any, int, int]: The result of the operation, the peak bytes and the retained bytes it allocated.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        start, _ = tracemalloc.get_traced_memory()
+        result = operation()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, peak - start, current - start
+
+
+def measure(
+    name: str,
+    operation: Callable[[], Any],
+    number: int = 1,
+    repeat: int = 3,
+    memory: bool = True,
+    setup: Optional[Callable[[], Any]] = None,
+) -> BenchResult:
+    """
+    Time an operation, run number times in a row, the best of the repeats is taken.
+
+    Args:
+        name (str): The name of the operation.
+        operation (Callable[[], Any]): The operation, called without arguments.
+        number (int, optional): The calls per timing. Defaults to 1.
+        repeat (int, optional): The timings, the fastest one is kept as the least disturbed. Defaults to 3.
+        memory (bool, optional): Whether to trace the allocations of one more call. Defaults to True.
+        setup (Optional[Callable[[], Any]], optional): Called before every timing and the traced call,
+            its time is not counted. Defaults to None.
+
+    Returns:
+        BenchResult: The measurement.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        setup() if setup else None
+        start = time.perf_counter()
+        for _ in range(number):
+            operation()
+        best = min(best, time.perf_counter() - start)
+    peak = retained = None
+    if memory:
+        setup() if setup else None
+        _, peak, retained = trace_memory(operation)
+    return BenchResult(name=name, ops=number, seconds=best, peak_bytes=peak, retained_bytes=retained)
+
+
+def measure_async(
+    name: str, factory: Callable[[], Awaitable[Any]], number: int, repeat: int, memory: bool
+) -> BenchResult:
+    """
+    Measure a coroutine, the ops of a timing are run inside one event loop turn,
+    so the cost of starting the loop is not counted.
+    """
+    loop = asyncio.new_event_loop()
+
+    async def _batch(count: int) -> None:
+        for _ in range(count):
+            await factory()
+
+    try:
+        result = measure(name, lambda: loop.run_until_complete(_batch(number)), 1, repeat, memory=False)
+        peak = retained = None
+        if memory:
+            _, peak, retained = trace_memory(lambda: loop.run_until_complete(_batch(1)))
+    finally:
+        loop.close()
+    return result._replace(ops=number, peak_bytes=peak, retained_bytes=retained)
+
+
+def environment() -> Dict[str, Any]:
+    """
+    Returns: where the results are measured, so the results of different machines or revisions are told apart.
+    """
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        revision = None
+    return {
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "revision": revision,
+        "time": datetime.datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+def dump_results(path: str | pathlib.Path, suite: str, params: Dict[str, Any], results: List[BenchResult]) -> None:
+    """
+    Write the results as json, with the parameters of the suite and the environment.
+    """
+    payload = {
+        "format": RESULTS_FORMAT,
+        "suite": suite,
+        "params": params,
+        "environment": environment(),
+        "results": [{**result._asdict(), "ops_per_sec": result.ops_per_sec} for result in results],
+    }
+    path = pathlib.Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2)
+
+
+def load_results(path: str | pathlib.Path) -> Dict[str, BenchResult]:
+    """
+    Read the results written by dump_results.
+
+    Returns:
+        Dict[str, BenchResult]: The results by their names.
+
+    Raises:
+        ValueError: If the file is not in the layout written by dump_results.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        payload = json.load(f)
+    if payload.get("format") != RESULTS_FORMAT:
+        raise ValueError(f"{path} is not a benchmark result of format {RESULTS_FORMAT}")
+    fields = BenchResult._fields
+    return {
+        entry["name"]: BenchResult(**{key: value for key, value in entry.items() if key in fields})
+        for entry in payload["results"]
+    }
+
+
+def find_regressions(
+    results: List[BenchResult], baseline: Dict[str, BenchResult], threshold: float
+) -> List[Tuple[BenchResult, BenchResult]]:
+    """
+    Returns: the results slower than their baseline by more than the threshold, a ratio like 0.1 for 10%,
+        paired with the baseline.
+    """
+    return [
+        (result, baseline[result.name])
+        for result in results
+        if result.name in baseline and result.us_per_op > baseline[result.name].us_per_op * (1 + threshold)
+    ]
+
+
+def _format_bytes(value: Optional[int]) -> str:
+    if value is None:
+        return "-"
+    for unit in ("B", "KiB", "MiB"):
+        if abs(value) < 1024:
+            return f"{value:.0f}{unit}"
+        value /= 1024
+    return f"{value:.1f}GiB"
+
+
+def print_results(results: List[BenchResult], baseline: Optional[Dict[str, BenchResult]] = None) -> None:
+    """
+    Print the results as a table, with the change against the baseline if given.
+    """
+    width = max([len(result.name) for result in results] + [9])
+    header = f"{'operation':<{width}}{'ops/s':>14}{'us/op':>14}{'peak':>12}{'retained':>12}"
+    print(header + (f"{'vs baseline':>14}" if baseline is not None else ""))
+    for result in results:
+        line = (
+            f"{result.name:<{width}}{result.ops_per_sec:>14.1f}{result.us_per_op:>14.2f}"
+            f"{_format_bytes(result.peak_bytes):>12}{_format_bytes(result.retained_bytes):>12}"
+        )
+        if baseline is not None:
+            former = baseline.get(result.name)
+            line += f"{result.us_per_op / former.us_per_op - 1:>+13.1%}" if former else f"{'new':>14}"
+        print(line)
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Add the arguments shared by the suites: --repeat, --no-memory, --json, --baseline and --threshold.
+    """
+    parser.add_argument("--repeat", type=int, default=3, help="the timings per operation, the best is kept")
+    parser.add_argument("--no-memory", action="store_true", help="skip tracing the allocations")
+    parser.add_argument("--json", default=None, help="write the results as json to the path")
+    parser.add_argument("--baseline", default=None, help="compare against the json results of a former run")
+    parser.add_argument(
+        "--threshold", type=float, default=0.1, help="the slowdown against the baseline flagged as a regression"
+    )
+
+
+def report(args: argparse.Namespace, suite: str, params: Dict[str, Any], results: List[BenchResult]) -> int:
+    """
+    Print, write and compare the results as asked by the shared arguments.
+
+    Returns:
+        int: The exit code, 1 if any operation regressed against the baseline, 0 otherwise.
+    """
+    baseline = load_results(args.baseline) if args.baseline else None
+    print_results(results, baseline)
+    if args.json:
+        dump_results(args.json, suite, params, results)
+    if baseline is None:
+        return 0
+    regressions = find_regressions(results, baseline, args.threshold)
+    for result, former in regressions:
+        print(f"REGRESSION {result.name}: {former.us_per_op:.2f}us -> {result.us_per_op:.2f}us per op")
+    return 1 if regressions else 0
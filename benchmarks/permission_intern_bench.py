@@ -0,0 +1,118 @@
+"""
+benchmark that is used to count the allocations of the permissions made at startup, with and without the interning
+
+Usage:
+    python -m benchmarks.permission_intern_bench [--resources 500] [--repeat 4]
+"""
+import argparse
+import gc
+import tracemalloc
+from contextlib import contextmanager
+from typing import List, NamedTuple, Iterator
+
+from modules.auth.permissions import Permission, PermissionInterner, PermissionCode
+from modules.auth.resources import required_perm_generator, RequiredPermission
+from modules.auth.roles import Role
+
+
+class AllocationResult(NamedTuple):
+    """
+    The allocations of a run.
+
+    Attributes:
+        label (str): The name of the run.
+        live_permissions (int): The distinct permission instances alive at the end of the run.
+        allocated_blocks (int): The memory blocks still allocated by the run.
+        allocated_bytes (int): The bytes still allocated by the run.
+        peak_bytes (int): The peak of the bytes allocated during the run.
+        intern_hits (int): The permissions taken from the interning table instead of being made.
+    """
+
+    label: str
+    live_permissions: int
+    allocated_blocks: int
+    allocated_bytes: int
+    peak_bytes: int
+    intern_hits: int
+
+
+@contextmanager
+def interning(enabled: bool) -> Iterator[None]:
+    """
+    Run with the interning on or off, off is how the permissions were made before the interning.
+    """
+    interner, copy_mode = Permission.__interner__, Permission.__config__.copy_on_model_validation
+    Permission.__interner__ = PermissionInterner(maxsize=interner.stats().maxsize if enabled else 0)
+    Permission.__config__.copy_on_model_validation = copy_mode if enabled else "shallow"
+    try:
+        yield
+    finally:
+        Permission.__interner__ = interner
+        Permission.__config__.copy_on_model_validation = copy_mode
+
+
+def simulate_startup(resources: int, repeat: int) -> List[object]:
+    """
+    Make the permissions the way the startup does: every plugin generates the required permissions of its resources,
+    the permissions are registered, granted to roles, and generated again by every reinstall.
+    """
+    su = Permission(id=PermissionCode.SuperPermission.value, name="su")
+    kept: List[object] = []
+    for _ in range(repeat):
+        requirements: List[RequiredPermission] = [
+            required_perm_generator(
+                target_resource_name=f"res_{chr(97 + i % 26)}{'x' * (i // 26)}", super_permissions=[su]
+            )
+            for i in range(resources)
+        ]
+        roles = [
+            Role(id=i, name="member", permissions=requirement.read + requirement.execute)
+            for i, requirement in enumerate(requirements)
+        ]
+        kept.extend(requirements)
+        kept.extend(roles)
+    return kept
+
+
+def measure(label: str, enabled: bool, resources: int, repeat: int) -> AllocationResult:
+    gc.collect()
+    with interning(enabled):
+        tracemalloc.start()
+        kept = simulate_startup(resources, repeat)
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        live = len({id(obj) for obj in gc.get_objects() if isinstance(obj, Permission)})
+        hits = Permission.intern_stats().hits
+    stats = snapshot.statistics("filename")
+    del kept
+    return AllocationResult(
+        label=label,
+        live_permissions=live,
+        allocated_blocks=sum(stat.count for stat in stats),
+        allocated_bytes=sum(stat.size for stat in stats),
+        peak_bytes=peak,
+        intern_hits=hits,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resources", type=int, default=500, help="the resources generated per round")
+    parser.add_argument("--repeat", type=int, default=4, help="the rounds of generation")
+    args = parser.parse_args()
+
+    results = [
+        measure("without interning", False, args.resources, args.repeat),
+        measure("with interning", True, args.resources, args.repeat),
+    ]
+    print(f"{'run':<20}{'permissions':>12}{'blocks':>12}{'bytes':>14}{'peak bytes':>14}{'hits':>10}")
+    for result in results:
+        print(
+            f"{result.label:<20}{result.live_permissions:>12}{result.allocated_blocks:>12}"
+            f"{result.allocated_bytes:>14}{result.peak_bytes:>14}{result.intern_hits:>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""
+benchmark that is used to measure the hot paths the plugins declare as their benchmark scenarios
+
+The plugins are imported from the extensions of the repo, the isolated ones in process too,
+then installed along with their dependencies against a broadcast that is never launched,
+a bare root node and an auth manager of a temporary config, as the bot would install them.
+Every scenario is run with each of its data sizes, the results of each plugin are a suite of their own,
+so the json paths could be templated by the plugin name to compare the plugins one by one between releases.
+
+Usage:
+    python -m benchmarks.plugin_bench [PLUGIN ...] [--scenario NAME] [--list]
+        [--json results/{plugin}.json] [--baseline former/{plugin}.json]
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+import pathlib
+import sys
+import tempfile
+from inspect import iscoroutinefunction
+from typing import Any, Dict, List, Optional, Type
+
+from graia.broadcast import Broadcast
+
+from benchmarks.harness import BenchResult, add_arguments, measure, measure_async, report
+from constant import EXTENSION_CONFIG_DIR
+from modules.auth.core import AuthorizationManager, Root
+from modules.circuit_breaker import CircuitBreakerRegistry
+from modules.cmd import NameSpaceNode
+from modules.extension_manager import ExtensionManager
+from modules.http_client import HttpClient
+from modules.plugin_base import AbstractPlugin, BenchScenario
+from modules.plugin_manifest import PluginManifest
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parent.parent
+# the placeholder of the json paths replaced by the plugin name
+PLUGIN_PLACEHOLDER: str = "{plugin}"
+
+
+def import_plugins(manager: ExtensionManager, manifests: List[PluginManifest]) -> Dict[str, Type[AbstractPlugin]]:
+    """
+    Import the extensions of the manifests, each plugin that yields no class is reported with the reason.
+
+    Returns:
+        Dict[str, Type[AbstractPlugin]]: The classes of the imported plugins by their names.
+    """
+    plugins: Dict[str, Type[AbstractPlugin]] = {}
+    for extension in sorted({manifest.extension for manifest in manifests}):
+        try:
+            imported = {plugin.get_plugin_name(): plugin for plugin in manager.import_extension(extension)}
+        except Exception as e:
+            imported, reason = {}, f"failed to import {extension}: {e!r}"
+        else:
+            reason = f"not exported by {extension}"
+        for manifest in manifests:
+            if manifest.extension != extension:
+                continue
+            if manifest.name in imported:
+                plugins[manifest.name] = imported[manifest.name]
+            else:
+                print(f"skipped {manifest.name}, {reason}", file=sys.stderr)
+    return plugins
+
+
+def with_dependencies(names: List[str], plugins: Dict[str, Type[AbstractPlugin]]) -> List[str]:
+    """
+    Returns: the names along with the names of the importable plugins they depend on, transitively.
+    """
+    closure: List[str] = []
+    stack = list(names)
+    while stack:
+        name = stack.pop()
+        if name in closure or name not in plugins:
+            continue
+        closure.append(name)
+        stack.extend(plugins[name].Dependencies)
+    return closure
+
+
+def install_plugins(
+    manager: ExtensionManager,
+    plugins: List[Type[AbstractPlugin]],
+    http_client: HttpClient,
+    loop: asyncio.AbstractEventLoop,
+) -> Dict[str, bool]:
+    """
+    Load and install the plugins, the output of the installs goes to the stderr to keep the results readable.
+
+    Returns:
+        Dict[str, bool]: The plugin name to whether it is installed successfully.
+    """
+    context: Dict[str, Any] = dict(
+        broadcast=Broadcast(),
+        root_namespace_node=NameSpaceNode(name="root"),
+        proxy=manager.plugins_view,
+        auth_manager=AuthorizationManager(**Root()._asdict(), config_file_path="auth.json"),
+        http_client=http_client,
+        circuit_breakers=CircuitBreakerRegistry(),
+    )
+    manager.bind_install_context(**context)
+    with contextlib.redirect_stdout(sys.stderr):
+        for plugin in plugins:
+            manager.load_plugin(plugin=plugin, **context)
+        return loop.run_until_complete(manager.install_plugins([plugin.get_plugin_name() for plugin in plugins]))
+
+
+def bench_scenario(scenario: BenchScenario, repeat: int, memory: bool) -> List[BenchResult]:
+    """
+    Run the scenario with each of its data sizes, the data is made once per size.
+    """
+    results: List[BenchResult] = []
+    for size in scenario.sizes:
+        data = scenario.setup(size) if scenario.setup else size
+        name = f"{scenario.name} n={size}"
+        if iscoroutinefunction(scenario.operation):
+            results.append(measure_async(name, lambda: scenario.operation(data), scenario.number, repeat, memory))
+        else:
+            results.append(measure(name, lambda: scenario.operation(data), scenario.number, repeat, memory))
+    return results
+
+
+def plugin_path(path: Optional[str], plugin_name: str) -> Optional[str]:
+    return path and path.replace(PLUGIN_PLACEHOLDER, plugin_name)
+
+
+def run_plugins(args: argparse.Namespace) -> int:
+    manager = ExtensionManager("extensions", [], manifest_cache_path="manifests.json")
+    with contextlib.redirect_stdout(sys.stderr):
+        manifests = manager.detect_manifests()
+    known = {manifest.name for manifest in manifests}
+    for name in args.plugin:
+        if name not in known:
+            print(f"skipped {name}, no such plugin in the extensions", file=sys.stderr)
+    # the plugins that declare scenarios are told from their sources, so the ones failing to import are reported too
+    names = args.plugin or sorted(manifest.name for manifest in manifests if manifest.benchmarked)
+    selected = [manifest for manifest in manifests if manifest.name in names]
+    with contextlib.redirect_stdout(sys.stderr):
+        plugins = import_plugins(manager, selected)
+        # the dependencies are imported only if they are not imported along with the selected ones
+        missing = [name for name in with_dependencies(list(plugins), plugins) if name not in plugins]
+        plugins.update(import_plugins(manager, [manifest for manifest in manifests if manifest.name in missing]))
+    names = [name for name in names if name in plugins]
+
+    loop = asyncio.new_event_loop()
+    http_client = HttpClient()
+    try:
+        installed = install_plugins(
+            manager, [plugins[name] for name in with_dependencies(names, plugins)], http_client, loop
+        )
+        return bench_plugins(args, manager, names, installed)
+    finally:
+        loop.run_until_complete(http_client.close())
+        loop.close()
+
+
+def bench_plugins(
+    args: argparse.Namespace, manager: ExtensionManager, names: List[str], installed: Dict[str, bool]
+) -> int:
+    code = 0
+    for name in names:
+        if not installed.get(name):
+            print(f"skipped {name}, failed to install", file=sys.stderr)
+            continue
+        plugin = manager.plugins[name]
+        scenarios = [
+            scenario for scenario in plugin.benchmark_scenarios() if not args.scenario or scenario.name in args.scenario
+        ]
+        if args.list:
+            for scenario in scenarios:
+                print(f"{name}: {scenario.name}, sizes {list(scenario.sizes)}, {scenario.number} ops per timing")
+            continue
+        if not scenarios:
+            print(f"skipped {name}, no scenario to run", file=sys.stderr)
+            continue
+        print(f"\n{name} {plugin.get_plugin_version()}")
+        results: List[BenchResult] = []
+        for scenario in scenarios:
+            results.extend(bench_scenario(scenario, args.repeat, not args.no_memory))
+        params: Dict[str, Any] = {
+            "plugin": name,
+            "version": plugin.get_plugin_version(),
+            "scenarios": {scenario.name: list(scenario.sizes) for scenario in scenarios},
+            "repeat": args.repeat,
+        }
+        plugin_args = argparse.Namespace(
+            **{
+                **vars(args),
+                "json": plugin_path(args.json, name),
+                "baseline": plugin_path(args.baseline, name),
+            }
+        )
+        if plugin_args.baseline and not os.path.exists(plugin_args.baseline):
+            print(f"no baseline of {name} at {plugin_args.baseline}, compared against nothing", file=sys.stderr)
+            plugin_args.baseline = None
+        code = max(code, report(plugin_args, f"plugin:{name}", params, results))
+    return code
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "plugin", nargs="*", help="the names of the plugins to run, all the plugins that declare scenarios if none"
+    )
+    parser.add_argument("--scenario", action="append", default=None, help="run the named scenario only, repeatable")
+    parser.add_argument("--list", action="store_true", help="list the scenarios of the plugins instead of running")
+    add_arguments(parser)
+    args = parser.parse_args()
+    if args.repeat < 1:
+        parser.error("the repeat must be positive")
+    for path in (args.json, args.baseline):
+        if path and PLUGIN_PLACEHOLDER not in path and len(args.plugin) != 1:
+            parser.error(f"the json paths must contain {PLUGIN_PLACEHOLDER} unless a single plugin is run")
+
+    with tempfile.TemporaryDirectory() as directory:
+        cwd = os.getcwd()
+        # the json paths are taken from the current directory, before moving into the working one
+        args.json, args.baseline = (path and os.path.abspath(path) for path in (args.json, args.baseline))
+        os.chdir(directory)
+        try:
+            # the extensions are imported from the repo and keep their data next to their sources as in production,
+            # the configs, the auth and the manifest cache are written into the working directory
+            os.symlink(REPO_ROOT / "extensions", "extensions", target_is_directory=True)
+            pathlib.Path(EXTENSION_CONFIG_DIR).mkdir(parents=True)
+            return run_plugins(args)
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,494 @@
+"""
+benchmark that is used to measure the bot end to end, by replaying message traces against a local stand-in of mirai
+
+The ChatBot is started with all the bundled extensions against the stand-in of fake_mirai,
+the http backends of the extensions are answered by its stub backends.
+The trace is pushed at the given rate, the messages starting with a cmd root are expected to be replied,
+the latency is taken from pushing the message to receiving the reply to its group or friend,
+the replies of a group or a friend are paired with its expecting messages in order.
+The trace is replayed --repeat times by the same bot, the first pass also installs the lazy plugins,
+the pass of the best throughput is reported.
+The memory is the resident set of the process, its growth over the install and over the passes, and its peak.
+
+A trace is a jsonl of the serialized mirai events, as pushed by mirai-api-http,
+a synthetic one is generated if no --trace is given, with the mix of the message kinds:
+    chatter: plain group messages
+    command: group messages of the cmds
+    friend: friend messages of the cmds
+    mention: group messages at the bot
+    forward: forwarded group messages with images, then the extractor cmd quoting them
+
+Usage:
+    python -m benchmarks.replay_bench [--messages 2000] [--rate 50]
+        [--mix chatter:4,command:3,friend:2,mention:1,forward:1]
+        [--command "magi" ...] [--trace trace.jsonl] [--save-trace trace.jsonl] [--backend-delay 0.01]
+        [--json results.json] [--baseline former.json]
+"""
+import argparse
+import asyncio
+import collections
+import json
+import math
+import os
+import pathlib
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Deque, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from graia.ariadne.app import Ariadne
+from graia.ariadne.connection.config import WebsocketClientConfig
+from loguru import logger
+
+from benchmarks.fake_mirai import FakeMirai, Reply, StubHttpClient, serialize_friend, serialize_group, serialize_member
+from benchmarks.harness import BenchResult, add_arguments, alpha_name, report
+from modules.auth.core import Root
+from modules.auth.utils import make_label
+from constant import EXTENSION_CONFIG_DIR
+from modules.chat_bot import HELP_KEYWORD, BotConfig, BotConnectionConfig, BotInfo, ChatBot
+from modules.extension_manager import InstallStatus
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+BOT_ACCOUNT: int = 10000
+VERIFY_KEY: str = "replay"
+DEFAULT_MIX: str = "chatter:4,command:3,friend:2,mention:1,forward:1"
+# the cmds of the bundled extensions the synthetic traces are made of by default,
+# the ones needing assets not shipped are left out, so is magi which blocks the loop for seconds composing its gif
+COMMANDS: List[str] = [
+    "ecnomi npv 0.05 100 100 100",
+    "trans en 你好",
+    "emojimerge 😀 😂",
+    "cv list",
+    f"nvlin {HELP_KEYWORD}",
+    f"trans {HELP_KEYWORD}",
+]
+CHATTER: List[str] = ["早", "hello", "有人吗", "哈哈哈哈", "今天吃什么", "ok", "收到", "这是一条比较长的群聊消息" * 3]
+PERCENTILES: Tuple[int, ...] = (50, 90, 99)
+
+
+class Population(NamedTuple):
+    """
+    The contacts of a trace, served by the stand-in as the contact lists of the bot.
+    """
+
+    groups: Dict[int, str]
+    members: Dict[int, str]
+    friends: Dict[int, str]
+
+
+class ReplayPass(NamedTuple):
+    """
+    The outcome of replaying the trace once.
+
+    Attributes:
+        messages (int): The messages pushed.
+        seconds (float): The seconds from the first push to the last push or the last paired reply.
+        latencies (List[float]): The seconds to the reply of every replied message.
+        lost (int): The expecting messages never replied within the timeout.
+        unsolicited (int): The replies with no expecting message to pair with.
+    """
+
+    messages: int
+    seconds: float
+    latencies: List[float]
+    lost: int
+    unsolicited: int
+
+
+def parse_mix(mix: str) -> Dict[str, int]:
+    """
+    Returns: the weights of the message kinds of a mix like chatter:4,command:3.
+
+    Raises:
+        ValueError: If a kind is unknown or a weight is not a non-negative integer.
+    """
+    weights: Dict[str, int] = {}
+    for part in mix.split(","):
+        kind, _, weight = part.partition(":")
+        if kind not in ("chatter", "command", "friend", "mention", "forward") or not weight.isdigit():
+            raise ValueError(f"invalid mix part {part!r}")
+        weights[kind] = int(weight)
+    if not any(weights.values()):
+        raise ValueError("the mix has no weight")
+    return weights
+
+
+def make_population(groups: int, members: int, friends: int) -> Population:
+    return Population(
+        groups={100000 + i: alpha_name(i, "group") for i in range(groups)},
+        members={200000 + i: alpha_name(i, "member") for i in range(members)},
+        friends={300000 + i: alpha_name(i, "friend") for i in range(friends)},
+    )
+
+
+def synthetic_trace(
+    count: int, population: Population, mix: Dict[str, int], commands: List[str], seed: int = 0
+) -> List[Dict[str, Any]]:
+    """
+    Generate a trace of the serialized mirai events.
+
+    Args:
+        count (int): The messages of the trace, a forward counts as two with the cmd quoting it.
+        population (Population): The contacts the messages are sent by.
+        mix (Dict[str, int]): The weights of the message kinds.
+        commands (List[str]): The cmds the command and the friend messages are chosen from.
+        seed (int, optional): The seed of the choices. Defaults to 0.
+
+    Returns:
+        List[Dict[str, Any]]: The events in the order to push.
+    """
+    rng = random.Random(seed)
+    kinds, weights = zip(*mix.items())
+    groups, members, friends = (list(contacts.items()) for contacts in population)
+    now = int(time.time())
+    trace: List[Dict[str, Any]] = []
+
+    def _group_message(chain: List[Dict[str, Any]], group=None, member=None) -> Dict[str, Any]:
+        group = group or rng.choice(groups)
+        member = member or rng.choice(members)
+        return {
+            "type": "GroupMessage",
+            "sender": serialize_member(*member, serialize_group(*group)),
+            "messageChain": [{"type": "Source", "id": len(trace) + 1, "time": now}, *chain],
+        }
+
+    while len(trace) < count:
+        kind = rng.choices(kinds, weights)[0]
+        if kind == "chatter":
+            trace.append(_group_message([{"type": "Plain", "text": rng.choice(CHATTER)}]))
+        elif kind == "command":
+            trace.append(_group_message([{"type": "Plain", "text": rng.choice(commands)}]))
+        elif kind == "friend":
+            trace.append(
+                {
+                    "type": "FriendMessage",
+                    "sender": serialize_friend(*rng.choice(friends)),
+                    "messageChain": [
+                        {"type": "Source", "id": len(trace) + 1, "time": now},
+                        {"type": "Plain", "text": rng.choice(commands)},
+                    ],
+                }
+            )
+        elif kind == "mention":
+            trace.append(
+                _group_message(
+                    [
+                        {"type": "At", "target": BOT_ACCOUNT, "display": ""},
+                        {"type": "Plain", "text": rng.choice(CHATTER)},
+                    ]
+                )
+            )
+        else:
+            group, member = rng.choice(groups), rng.choice(members)
+            nodes = [
+                {
+                    "senderId": sender_id,
+                    "time": now,
+                    "senderName": sender_name,
+                    "messageChain": [
+                        {"type": "Plain", "text": rng.choice(CHATTER)},
+                        {
+                            "type": "Image",
+                            "imageId": f"{{{i:08X}-0000-0000-0000-000000000000}}.png",
+                            "url": f"http://images.qq.example/{i}.png",
+                        },
+                    ],
+                }
+                for i, (sender_id, sender_name) in enumerate(rng.sample(members, min(3, len(members))))
+            ]
+            forward = _group_message([{"type": "Forward", "nodeList": nodes}], group, member)
+            trace.append(forward)
+            quote = {
+                "type": "Quote",
+                "id": forward["messageChain"][0]["id"],
+                "groupId": group[0],
+                "senderId": member[0],
+                "targetId": group[0],
+                "origin": [],
+            }
+            trace.append(_group_message([quote, {"type": "Plain", "text": "extractor p 1"}], group, member))
+    return trace[:count]
+
+
+def load_trace(path: str | pathlib.Path) -> List[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def save_trace(path: str | pathlib.Path, trace: List[Dict[str, Any]]) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(json.dumps(event, ensure_ascii=False) + "\n" for event in trace)
+
+
+def population_of(trace: List[Dict[str, Any]]) -> Population:
+    """
+    Returns: the contacts the messages of the trace are sent by.
+    """
+    population = Population({}, {}, {})
+    for event in trace:
+        sender = event.get("sender", {})
+        if "group" in sender:
+            population.groups[sender["group"]["id"]] = sender["group"]["name"]
+            population.members[sender["id"]] = sender["memberName"]
+        elif "nickname" in sender:
+            population.friends[sender["id"]] = sender["nickname"]
+    return population
+
+
+def command_roots(bot: ChatBot) -> Set[str]:
+    """
+    Returns: the names and the aliases of the cmd roots, the roots of the lazy plugins not installed yet included.
+    """
+    roots: Set[str] = set()
+    for node in bot.root.children_node:
+        roots.add(node.name)
+        roots.update(node.aliases)
+    for manifest in bot.extensions.lazy_plugins.values():
+        roots.update(manifest.command_roots)
+    return roots
+
+
+def expected_target(event: Dict[str, Any], roots: Set[str]) -> Optional[int]:
+    """
+    Returns: the group or the friend the reply to the event is sent to, None if the event does not expect a reply.
+    """
+    text = "".join(element.get("text", "") for element in event.get("messageChain", ()) if element["type"] == "Plain")
+    tokens = text.split()
+    if not tokens or tokens[0] not in roots:
+        return None
+    if event["type"] == "GroupMessage":
+        return event["sender"]["group"]["id"]
+    return event["sender"]["id"] if event["type"] == "FriendMessage" else None
+
+
+async def replay(fake: FakeMirai, trace: List[Dict[str, Any]], rate: float, roots: Set[str], timeout: float):
+    """
+    Push the trace at the rate and pair the replies, runs in the loop of the stand-in.
+
+    Args:
+        fake (FakeMirai): The stand-in the bot is connected to.
+        trace (List[Dict[str, Any]]): The events to push.
+        rate (float): The messages per second, as fast as possible if not positive.
+        roots (Set[str]): The cmd roots, see command_roots.
+        timeout (float): The seconds the replies are waited for after the last push.
+
+    Returns:
+        ReplayPass: The outcome.
+    """
+    pending: Dict[int, Deque[float]] = collections.defaultdict(collections.deque)
+    latencies: List[float] = []
+    unsolicited = 0
+    last_reply = 0.0
+
+    def _on_reply(reply: Reply) -> None:
+        nonlocal unsolicited, last_reply
+        sent = pending.get(reply.target)
+        if not sent:
+            unsolicited += 1
+            return
+        latencies.append(reply.time - sent.popleft())
+        last_reply = reply.time
+
+    fake.on_reply = _on_reply
+    start = time.perf_counter()
+    for index, event in enumerate(trace):
+        if rate > 0:
+            delay = start + index / rate - time.perf_counter()
+            await asyncio.sleep(delay) if delay > 0 else None
+        target = expected_target(event, roots)
+        pending[target].append(time.perf_counter()) if target is not None else None
+        await fake.push(event)
+    pushed = time.perf_counter()
+    while any(pending.values()) and time.perf_counter() - pushed < timeout:
+        await asyncio.sleep(0.005)
+    fake.on_reply = None
+    return ReplayPass(
+        messages=len(trace),
+        seconds=max(pushed, last_reply) - start,
+        latencies=latencies,
+        lost=sum(len(sent) for sent in pending.values()),
+        unsolicited=unsolicited,
+    )
+
+
+def percentile(values: List[float], q: float) -> float:
+    """
+    Returns: the q-th percentile of the values by the nearest rank, 0 if there is no value.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered), max(1, math.ceil(q / 100 * len(ordered)))) - 1]
+
+
+def peak_rss_bytes() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes everywhere but on macos
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def rss_bytes() -> int:
+    """
+    Returns: the resident set size of the process, the peak one where the current one is not readable.
+    """
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return peak_rss_bytes()
+
+
+def run_replay(args: argparse.Namespace, trace: List[Dict[str, Any]]) -> Tuple[List[ReplayPass], Dict[str, Any]]:
+    """
+    Start the bot against the stand-in in the working directory, replay the trace and stop the bot.
+
+    Returns:
+        Tuple[List[ReplayPass], Dict[str, Any]]: The outcome of every pass, and the installed plugins and the memory.
+    """
+    population = population_of(trace)
+    fake = FakeMirai(BOT_ACCOUNT, VERIFY_KEY, *population, backend_delay=args.backend_delay)
+    fake.start()
+    rss_start = rss_bytes()
+    bot = ChatBot(
+        bot_info=BotInfo(account_id=BOT_ACCOUNT, bot_name="replay"),
+        bot_config=BotConfig(
+            extension_dir="extensions",
+            auth_config_file_path="auth.json",
+            accepted_message_types=["GroupMessage", "FriendMessage"],
+        ),
+        bot_connection_config=BotConnectionConfig(
+            verify_key=VERIFY_KEY, websocket_config=WebsocketClientConfig(host=fake.mirai_url)
+        ),
+        http_client=StubHttpClient(fake.backend_url),
+    )
+    # the groups and the friends are granted the root role, so every cmd of the trace passes the checks
+    root_role = make_label(*Root())
+    with bot.auth_manager.batch():
+        for user_id, name in {**population.groups, **population.friends}.items():
+            bot.auth_manager.add_user(user_id, name, [root_role])
+    start = time.perf_counter()
+    bot.init_utils(install_requirements=False)
+    info: Dict[str, Any] = {
+        "plugins": sorted(
+            record.plugin for record in bot.extensions.install_timeline if record.status == InstallStatus.OK
+        ),
+        "install_seconds": time.perf_counter() - start,
+        "rss_installed": rss_bytes() - rss_start,
+    }
+    passes: List[ReplayPass] = []
+    failure: List[BaseException] = []
+    # the loop the bot is launched in, the bot is stopped from the driver thread through it
+    bot_loop = Ariadne.service.loop
+
+    def _drive() -> None:
+        try:
+            if not fake.connected.wait(args.timeout):
+                raise TimeoutError("the bot never connected to the stand-in")
+            # the session is taken right after the connection, the launch of the bot is let finish
+            time.sleep(args.settle)
+            for _ in range(args.repeat):
+                passes.append(fake.run(replay(fake, trace, args.rate, command_roots(bot), args.timeout)).result())
+        except BaseException as e:
+            failure.append(e)
+        finally:
+            info["rss_replayed"] = rss_bytes() - rss_start
+            info["rss_peak"] = peak_rss_bytes()
+            bot_loop.call_soon_threadsafe(bot.stop)
+
+    driver = threading.Thread(target=_drive, name="replay-driver", daemon=True)
+    driver.start()
+    bot.run(init_utils=False)
+    driver.join()
+    fake.stop()
+    if failure:
+        raise failure[0]
+    return passes, info
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=2000, help="the messages of the synthetic trace")
+    parser.add_argument("--rate", type=float, default=50, help="the messages pushed per second, 0 for no limit")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="the weights of the message kinds of the synthetic trace")
+    parser.add_argument("--groups", type=int, default=20, help="the groups of the synthetic trace")
+    parser.add_argument("--members", type=int, default=200, help="the group members of the synthetic trace")
+    parser.add_argument("--friends", type=int, default=50, help="the friends of the synthetic trace")
+    parser.add_argument(
+        "--command", action="append", default=None, help="a cmd of the synthetic trace, repeat to give more"
+    )
+    parser.add_argument("--trace", default=None, help="replay the jsonl trace instead of a synthetic one")
+    parser.add_argument("--save-trace", default=None, help="write the replayed trace as jsonl to the path")
+    parser.add_argument("--backend-delay", type=float, default=0.0, help="the seconds every stub backend takes")
+    parser.add_argument("--timeout", type=float, default=30, help="the seconds the replies are waited for")
+    parser.add_argument("--settle", type=float, default=1.0, help="the seconds the bot is let launch before replaying")
+    parser.add_argument("--log-level", default="WARNING", help="the level of the logs of ariadne")
+    add_arguments(parser)
+    args = parser.parse_args()
+    if args.repeat < 1:
+        parser.error("the repeat must be positive")
+    if args.trace:
+        trace = load_trace(args.trace)
+    else:
+        try:
+            mix = parse_mix(args.mix)
+        except ValueError as e:
+            parser.error(str(e))
+        population = make_population(max(1, args.groups), max(1, args.members), max(1, args.friends))
+        trace = synthetic_trace(args.messages, population, mix, args.command or COMMANDS)
+    if args.save_trace:
+        save_trace(args.save_trace, trace)
+    for path in ("json", "baseline"):
+        # the bot runs in a temporary working directory, the given paths are taken from the current one
+        setattr(args, path, getattr(args, path) and os.path.abspath(getattr(args, path)))
+    logger.remove()
+    logger.add(sys.stderr, level=args.log_level)
+
+    with tempfile.TemporaryDirectory() as directory:
+        cwd = os.getcwd()
+        os.chdir(directory)
+        try:
+            # the extensions are imported from the repo and keep their data next to their sources as in production,
+            # the configs, the auth and the manifest cache of the bot are written into the working directory
+            os.symlink(REPO_ROOT / "extensions", "extensions", target_is_directory=True)
+            pathlib.Path(EXTENSION_CONFIG_DIR).mkdir(parents=True)
+            passes, info = run_replay(args, trace)
+        finally:
+            os.chdir(cwd)
+
+    best = min(passes, key=lambda replay_pass: replay_pass.seconds)
+    print(f"installed {len(info['plugins'])} plugins: {', '.join(info['plugins'])}", file=sys.stderr)
+    for index, replay_pass in enumerate(passes):
+        print(
+            f"pass {index}: {replay_pass.messages} messages in {replay_pass.seconds:.2f}s, "
+            f"{len(replay_pass.latencies)} replied, {replay_pass.lost} lost, {replay_pass.unsolicited} unsolicited",
+            file=sys.stderr,
+        )
+    memory = not args.no_memory
+    results = [
+        BenchResult("install extensions", 1, info["install_seconds"], None, info["rss_installed"] if memory else None),
+        BenchResult(
+            "replay", best.messages, best.seconds, *((info["rss_peak"], info["rss_replayed"]) if memory else ())
+        ),
+    ]
+    results.extend(BenchResult(f"latency p{q}", 1, percentile(best.latencies, q)) for q in PERCENTILES)
+    results.append(BenchResult("latency max", 1, max(best.latencies, default=0.0)))
+    params: Dict[str, Any] = {
+        "messages": len(trace),
+        "rate": args.rate,
+        "mix": None if args.trace else args.mix,
+        "commands": None if args.trace else args.command or COMMANDS,
+        "trace": args.trace,
+        "backend_delay": args.backend_delay,
+        "repeat": args.repeat,
+        "plugins": info["plugins"],
+        "replied": len(best.latencies),
+        "lost": best.lost,
+    }
+    return report(args, "replay", params, results)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+"""
+benchmark that is used to measure the cost of reading a resource, the read-only view against the deep copy
+
+Usage:
+    python -m benchmarks.resource_read_bench [--sizes 100 10000 100000] [--number 20]
+"""
+import argparse
+import timeit
+from typing import Any, Dict, List
+
+from modules.auth.permissions import Permission, PermissionCode
+from modules.auth.resources import Resource, required_perm_generator
+
+
+def make_corpus(size: int) -> Dict[str, Any]:
+    """
+    Make a source shaped like the ones shared between the plugins, a dictionary of entries and an index.
+    """
+    return {
+        "entries": {f"word{i}": {"freq": i, "tags": [f"tag{i % 7}", f"tag{i % 11}"]} for i in range(size)},
+        "index": [f"word{i}" for i in range(size)],
+    }
+
+
+def measure(size: int, number: int) -> List[float]:
+    """
+    Returns: the seconds per read of the view and of the deep copy.
+    """
+    su = Permission(id=PermissionCode.SuperPermission.value, name="su")
+    resource = Resource(
+        id=1,
+        name="corpus",
+        source=make_corpus(size),
+        required_permissions=required_perm_generator(target_resource_name="corpus", super_permissions=[su]),
+    )
+    permissions = [su]
+    view = timeit.timeit(lambda: resource.get_read(permissions)["entries"][f"word{size - 1}"]["freq"], number=number)
+    deep = timeit.timeit(
+        lambda: resource.get_read(permissions, deep_copy=True)["entries"][f"word{size - 1}"]["freq"], number=number
+    )
+    return [view / number, deep / number]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10000, 100000], help="the entries of the source")
+    parser.add_argument("--number", type=int, default=20, help="the reads per measurement")
+    args = parser.parse_args()
+
+    print(f"{'entries':>10}{'view (us)':>14}{'deep copy (us)':>18}{'speedup':>12}")
+    for size in args.sizes:
+        view, deep = measure(size, args.number)
+        print(f"{size:>10}{view * 1e6:>14.2f}{deep * 1e6:>18.2f}{deep / view:>11.0f}x")
+
+
+if __name__ == "__main__":
+    main()
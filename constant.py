@@ -7,6 +7,9 @@ CONFIG_DIR: str = "config"
 EXTENSION_DIR: str = "extensions"
 EXTENSION_CONFIG_DIR: str = f"{CONFIG_DIR}/{EXTENSION_DIR}"
 CONFIG_FILE_NAME: str = "config.json"
+EXTENSION_MANIFEST_CACHE_PATH: str = f"{CONFIG_DIR}/extension_manifests.json"
+REQUIREMENTS_FINGERPRINT_PATH: str = f"{CONFIG_DIR}/requirements_fingerprint.json"
+AUTH_WARM_START_PATH: str = f"{CONFIG_DIR}/auth_warm_start.pickle"
 REQUIREMENTS_FILE_NAME: str = "requirements.txt"
 USER_BATCH_SCRIPT_PATH = str(pathlib.Path(f"{ROOT}/user.bat"))
 Value = Union[str, int, float, List, Dict, bool]
@@ -1,3 +1,4 @@
+import asyncio
 import hashlib
 import re
 import time
@@ -20,7 +21,16 @@ from langchain_core.runnables import Runnable
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from pydantic import SecretStr
 
-from modules.shared import AbstractPlugin, EnumCMD, get_pwd, NameSpaceNode, ExecutableNode, CmdBuilder, explore_folder
+from modules.shared import (
+    AbstractPlugin,
+    EnumCMD,
+    get_pwd,
+    NameSpaceNode,
+    ExecutableNode,
+    CmdBuilder,
+    explore_folder,
+    CircuitOpenError,
+)
 from .few_shot import FewShotsCreator, make_derived_fs_examples
 
 
@@ -44,6 +54,8 @@ class CMD(EnumCMD):
 
 
 class Akia(AbstractPlugin):
+    OPENAI_BACKEND = "OpenAI"
+
     CONFIG_API_HOST = "api_host"
     CONFIG_RETRIEVER_DATA_DIR = "retriever_data_dir"
     CONFIG_API_KEY = "api_key"
@@ -102,7 +114,7 @@ class Akia(AbstractPlugin):
     def get_plugin_author(cls) -> str:
         return "Whth"
 
-    def install(self):
+    async def install(self):
         chat_client = ChatOpenAI(
             openai_api_key=SecretStr(self.config_registry.get_config(self.CONFIG_API_KEY)),
             openai_api_base=self.config_registry.get_config(self.CONFIG_API_HOST),
@@ -126,11 +138,12 @@ class Akia(AbstractPlugin):
             selector.k = self.config_registry.get_config(self.CONFIG_FS_LENGTH)
 
         fsc = FewShotsCreator("input", "output")
-        fsc.load_data_file(self.config_registry.get_config(self.CONFIG_EXAMPLES_PATH))
+        await asyncio.to_thread(fsc.load_data_file, self.config_registry.get_config(self.CONFIG_EXAMPLES_PATH))
 
         derived_fs_examples = make_derived_fs_examples(fsc)
-        derived_fs_examples.dump_data_file(
-            Path(self.config_registry.get_config(self.CONFIG_RETRIEVER_DATA_DIR)) / "derived_fs_examples.yaml"
+        await asyncio.to_thread(
+            derived_fs_examples.dump_data_file,
+            Path(self.config_registry.get_config(self.CONFIG_RETRIEVER_DATA_DIR)) / "derived_fs_examples.yaml",
         )
 
         self.__lang_chain: Optional[ConversationChain] = None
@@ -234,11 +247,17 @@ class Akia(AbstractPlugin):
             _sync_config()
             print(f"Mute[OFF],Receive:\n {str(message)}")
 
-            ret_message = await ainvoke(
-                self.__lang_chain,
-                message_string,
-                self.config_registry.get_config(self.CONFIG_STOP_SIGN),
-            )
+            try:
+                ret_message = await self.circuit_breakers.call(
+                    self.OPENAI_BACKEND,
+                    ainvoke,
+                    self.__lang_chain,
+                    message_string,
+                    self.config_registry.get_config(self.CONFIG_STOP_SIGN),
+                )
+            except CircuitOpenError:
+                print(f"{self.OPENAI_BACKEND} is unavailable, skip the talk")
+                return
 
             await app.send_message(message_event, ret_message)
 
@@ -272,11 +291,17 @@ class Akia(AbstractPlugin):
 
             print(f"Mute[OFF],Receive:\n {str(message)}")
             _sync_config()
-            ret_message = await ainvoke(
-                self.__lang_chain,
-                message_string,
-                self.config_registry.get_config(self.CONFIG_STOP_SIGN),
-            )
+            try:
+                ret_message = await self.circuit_breakers.call(
+                    self.OPENAI_BACKEND,
+                    ainvoke,
+                    self.__lang_chain,
+                    message_string,
+                    self.config_registry.get_config(self.CONFIG_STOP_SIGN),
+                )
+            except CircuitOpenError:
+                print(f"{self.OPENAI_BACKEND} is unavailable, skip the talk")
+                return
 
             await app.send_message(message_event, ret_message)
 
@@ -1,3 +1,4 @@
+import asyncio
 import copy
 import random
 from functools import partial
@@ -6,7 +7,15 @@ from typing import List
 from sparkdesk_api.core import SparkAPI
 from sparkdesk_api.utils import VERSIONS
 
-from modules.shared import get_pwd, AbstractPlugin, ExecutableNode, EnumCMD, CmdBuilder, NameSpaceNode
+from modules.shared import (
+    get_pwd,
+    AbstractPlugin,
+    BenchScenario,
+    ExecutableNode,
+    EnumCMD,
+    CmdBuilder,
+    NameSpaceNode,
+)
 from .external_gpt import run_all, api
 from .fuzzy import FuzzyDictionary
 
@@ -27,6 +36,10 @@ class CMD(EnumCMD):
 
 
 class CodeTalker(AbstractPlugin):
+    LazyLoad = True
+
+    SPARK_BACKEND = "Spark"
+
     CONFIG_SECRETS = "secrets"
     CONFIG_SECRETS_APPID = f"{CONFIG_SECRETS}/appID"
     CONFIG_SECRETS_APIKEY = f"{CONFIG_SECRETS}/apiKey"
@@ -83,8 +96,10 @@ class CodeTalker(AbstractPlugin):
             version=self._config_registry.get_config(self.CONFIG_API_VERSION),
         )
 
-    def install(self):
-        fuzzy_dictionary = FuzzyDictionary(save_path=self._config_registry.get_config(self.CONFIG_DICTIONARY_PATH))
+    async def install(self):
+        fuzzy_dictionary = await asyncio.to_thread(
+            FuzzyDictionary, save_path=self._config_registry.get_config(self.CONFIG_DICTIONARY_PATH)
+        )
         print(f"Loading Fuzzy Dictionary Size:{len(fuzzy_dictionary.dictionary.keys())}")
 
         configurable = {
@@ -96,7 +111,32 @@ class CodeTalker(AbstractPlugin):
             config_getter=self.config_registry.get_config, config_setter=self.config_registry.set_config
         )
 
-        def _talk(*message_token: str) -> str:
+        def _spark_chat(message: str) -> str:
+            """
+            Generate a response using the Spark API, and register it in the fuzzy dictionary.
+
+            Raises:
+                ConnectionError: If the Spark API gives no response.
+            """
+            response: str = self.sparkAPI.chat(
+                query=message,
+                history=copy.deepcopy(self._config_registry.get_config(self.CONFIG_PRE_APPEND_HISTORY)),
+                max_tokens=self._config_registry.get_config(self.CONFIG_MAX_TOKENS),
+            )
+            if not response:
+                raise ConnectionError("Spark API gives no response")
+            # Register the generated response in the fuzzy dictionary
+            fuzzy_dictionary.register_key_value(message, response)
+            fuzzy_dictionary.save_to_json()
+            return response
+
+        # answer with the silent feedback when the Spark API is down
+        self.circuit_breakers.register_fallback(
+            self.SPARK_BACKEND,
+            lambda *_: random.choice(self.config_registry.get_config(self.CONFIG_SILENT_FEEDBACK)),
+        )
+
+        async def _talk(*message_token: str) -> str:
             """
             Executes the _talk function to generate a response based on the given message tokens.
 
@@ -113,19 +153,7 @@ class CodeTalker(AbstractPlugin):
             # If the random number is less than or equal to the re-generate probability
             # or no similar words are found in the dictionary
             if random.random() <= self._config_registry.get_config(self.CONFIG_RE_GENERATE_PROBABILITY) or not search:
-                max_tokens = self._config_registry.get_config(self.CONFIG_MAX_TOKENS)
-                # Generate a response using the Spark API
-                response: str = self.sparkAPI.chat(
-                    query=message,
-                    history=copy.deepcopy(self._config_registry.get_config(self.CONFIG_PRE_APPEND_HISTORY)),
-                    max_tokens=max_tokens,
-                )
-                if response:
-                    # Register the generated response in the fuzzy dictionary
-                    fuzzy_dictionary.register_key_value(message, response)
-                    fuzzy_dictionary.save_to_json()
-                else:
-                    response = random.choice(self.config_registry.get_config(self.CONFIG_SILENT_FEEDBACK))
+                response: str = await self.circuit_breakers.call(self.SPARK_BACKEND, _spark_chat, message)
                 print(f"Request Response: {response}")
             else:
                 # Select a random response from the search results
@@ -203,3 +231,21 @@ class CodeTalker(AbstractPlugin):
             if stdout:
                 return stdout
         return ""
+
+    def benchmark_scenarios(self) -> List[BenchScenario]:
+        def _setup(size: int) -> FuzzyDictionary:
+            # a dictionary of the size, kept in the working directory of the runner
+            fuzzy_dictionary = FuzzyDictionary(save_path=f"fuzzy_dictionary_{size}.json")
+            for i in range(size):
+                fuzzy_dictionary.register_key_value(f"how could I do the thing number {i}?", f"answer {i}")
+            return fuzzy_dictionary
+
+        return [
+            BenchScenario(
+                name="FuzzyDictionary.search",
+                operation=lambda fuzzy_dictionary: fuzzy_dictionary.search("how could I do the thing number 42"),
+                setup=_setup,
+                sizes=(100, 1000, 10000),
+                number=5,
+            )
+        ]
@@ -1,5 +1,5 @@
 import os
-from typing import List, Callable, Optional
+from typing import List, Callable, Optional, Awaitable
 
 from modules.file_manager import get_pwd
 from modules.plugin_base import AbstractPlugin
@@ -8,9 +8,12 @@ __all__ = ["CyVoice"]
 
 
 class CyVoice(AbstractPlugin):
+    LazyLoad = True
+    Dependencies = ["BaiduTranslater"]
+
     __TRANSLATE_PLUGIN_NAME: str = "BaiduTranslater"
     __TRANSLATE_METHOD_NAME: str = "translate"
-    __TRANSLATE_METHOD_TYPE = Callable[[str, str, str], str]  # [tolang, query, fromlang] -> str
+    __TRANSLATE_METHOD_TYPE = Callable[[str, str, str], Awaitable[str]]  # [tolang, query, fromlang] -> str
 
     __READ_CMD = "read"
     __CHANGE_CV_CMD = "change"
@@ -20,6 +23,8 @@ class CyVoice(AbstractPlugin):
     __CONFIG_SET_CMD = "set"
     __CONFIG_LIST_CMD = "list"
 
+    __VITS_BACKEND = "VITS"
+
     __TRANSLATE_CMD = "trans"
     __TRANSLATE_ENABLE_CMD = "enable"
     __TRANSLATE_TO_LANG_CMD = "target_lang"
@@ -74,12 +79,14 @@ class CyVoice(AbstractPlugin):
         from .api import VITS
 
         translater: Optional[AbstractPlugin] = self._plugin_view.get(self.__TRANSLATE_PLUGIN_NAME, None)
+        translate: Optional[CyVoice.__TRANSLATE_METHOD_TYPE] = None
         if translater:
             translate: CyVoice.__TRANSLATE_METHOD_TYPE = getattr(translater, self.__TRANSLATE_METHOD_NAME)
 
         temp_dir: str = self._config_registry.get_config(self.CONFIG_TEMP_FILE_DIR_PATH)
         os.makedirs(temp_dir, exist_ok=True)
         VITS.base = self._config_registry.get_config(self.CONFIG_API_HOST_URL)
+        VITS.client = self.http_client
         cmd_builder = CmdBuilder(
             config_setter=self._config_registry.set_config, config_getter=self._config_registry.get_config
         )
@@ -126,9 +133,11 @@ class CyVoice(AbstractPlugin):
                 Voice: The voice object representing the current cv voice.
             """
             cv_id: int = self._config_registry.get_config(self.CONFIG_USED_CV_INDEX)
-            speaker_names = await VITS.get_voice_speakers()
+            speaker_names = await self.circuit_breakers.call(self.__VITS_BACKEND, VITS.get_voice_speakers)
             return Voice(
-                path=await VITS.voice_vits(
+                path=await self.circuit_breakers.call(
+                    self.__VITS_BACKEND,
+                    VITS.voice_vits,
                     f"{self._config_registry.get_config(self.CONFIG_ANNOTATE_STATEMENT)}{speaker_names[cv_id]}ですわ！",
                     cv_id=cv_id,
                     save_dir=self._config_registry.get_config(self.CONFIG_TEMP_FILE_DIR_PATH),
@@ -149,9 +158,13 @@ class CyVoice(AbstractPlugin):
                 None.
             """
             if self._config_registry.get_config(self.CONFIG_ENABLE_TRANSLATE) and translate:
-                sentence = translate(self._config_registry.get_config(self.CONFIG_TARGET_LANGUAGE), sentence, "auto")
+                sentence = await translate(
+                    self._config_registry.get_config(self.CONFIG_TARGET_LANGUAGE), sentence, "auto"
+                )
 
-            save_path = await VITS.voice_vits(
+            save_path = await self.circuit_breakers.call(
+                self.__VITS_BACKEND,
+                VITS.voice_vits,
                 sentence,
                 cv_id=self._config_registry.get_config(self.CONFIG_USED_CV_INDEX),
                 noise_w=self._config_registry.get_config(self.CONFIG_NOISE_W),
@@ -170,7 +183,7 @@ class CyVoice(AbstractPlugin):
                 str: A string containing the names of the speakers.
 
             """
-            speaker_names: List[str] = await VITS.get_voice_speakers()
+            speaker_names: List[str] = await self.circuit_breakers.call(self.__VITS_BACKEND, VITS.get_voice_speakers)
             speakers_count = len(speaker_names)
             all_pages = (speakers_count // page_size) + 1
             temp_string = f"Page ({page}/{all_pages})\n"
@@ -180,7 +193,7 @@ class CyVoice(AbstractPlugin):
             if self.config_registry.get_config(self.CONFIG_ENABLE_TRANSLATE) and translate:
                 temp_string += f" ID |CV Name|Translated Name\n"
                 for index, name in enumerate(page_content, start=page_size * (page - 1)):
-                    temp_string += f" ID: {index:<4}|{name:<8}|{translate('zh', name, 'auto')}\n"
+                    temp_string += f" ID: {index:<4}|{name:<8}|{await translate('zh', name, 'auto')}\n"
             else:
                 for index, name in enumerate(page_content, start=page_size * (page - 1)):
                     temp_string += f" ID: {index:<4}|{name:<8}\n"
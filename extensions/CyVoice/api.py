@@ -1,12 +1,13 @@
 import re
 from typing import Dict, List
 
-from aiohttp import ClientSession
+from aiohttp import ClientTimeout
 from pydantic import BaseModel
 
+from modules.http_client import HttpClient
 from modules.shared import get_pwd
 
-TIMEOUT = 30
+TIMEOUT = ClientTimeout(total=30)
 
 
 class CVData(BaseModel):
@@ -24,6 +25,7 @@ class VITS(object):
     __API_VOICE_APP_KEY_WORD: str = "voice"
     __API_REQUEST_SPEAKERS_KEY_WORD: str = "speakers"
     base: str = "http://127.0.0.1:23456"
+    client: HttpClient = HttpClient()
 
     @classmethod
     async def voice_speakers(cls) -> str:
@@ -38,9 +40,8 @@ class VITS(object):
         url = f"{cls.base}/{cls.__API_VOICE_APP_KEY_WORD}/{cls.__API_REQUEST_SPEAKERS_KEY_WORD}"
         # Construct the URL for fetching voice speakers data
 
-        async with ClientSession() as session:
-            async with session.get(url=url, timeout=TIMEOUT) as response:
-                json: Dict[str, List[Dict[str]]] = await response.json()  # Fetch the JSON response
+        response = await cls.client.get(url=url, timeout=TIMEOUT, raise_for_status=True)
+        json: Dict[str, List[Dict[str]]] = await response.json()  # Fetch the JSON response
 
         for model_type in json:
             temp_string = f"{model_type}:\n\n"  # Add the model type to the string
@@ -56,9 +57,8 @@ class VITS(object):
         url = f"{cls.base}/{cls.__API_VOICE_APP_KEY_WORD}/{cls.__API_REQUEST_SPEAKERS_KEY_WORD}"
         # Construct the URL for fetching voice speakers data
 
-        async with ClientSession() as session:
-            async with session.get(url=url, timeout=TIMEOUT) as response:
-                json: Dict[str, List[Dict[str]]] = await response.json()  # Fetch the JSON response
+        response = await cls.client.get(url=url, timeout=TIMEOUT, raise_for_status=True)
+        json: Dict[str, List[Dict[str]]] = await response.json()  # Fetch the JSON response
 
         for model_type in json:
             for speakers in json[model_type]:
@@ -117,16 +117,15 @@ class VITS(object):
         url = f"{cls.base}/{cls.__API_VOICE_APP_KEY_WORD}"
 
         # Send the POST request to the API and get the response
-        async with ClientSession() as session:
-            async with session.post(url=url, json=cvdata.dict(), timeout=TIMEOUT) as response:
-                # Extract the filename from the response headers
-                fname = re.findall("filename=(.+)", response.headers["Content-Disposition"])[0]
+        response = await cls.client.post(url=url, json=cvdata.dict(), timeout=TIMEOUT, raise_for_status=True)
+        # Extract the filename from the response headers
+        fname = re.findall("filename=(.+)", response.headers["Content-Disposition"])[0]
 
-                # Create the path where the voice file will be saved
-                path = f"{save_dir}/{fname}"
+        # Create the path where the voice file will be saved
+        path = f"{save_dir}/{fname}"
 
-                # Save the voice file
-                with open(path, "wb") as f:
-                    f.write(await response.read())
+        # Save the voice file
+        with open(path, "wb") as f:
+            f.write(await response.read())
 
         return path
@@ -1,6 +1,6 @@
-from typing import Dict
+from typing import Dict, List
 
-from modules.shared import AbstractPlugin, EnumCMD, NameSpaceNode, ExecutableNode
+from modules.shared import AbstractPlugin, BenchScenario, EnumCMD, NameSpaceNode, ExecutableNode
 from .value_conversion import Worth
 
 
@@ -10,6 +10,8 @@ class CMD(EnumCMD):
 
 
 class Ecno(AbstractPlugin):
+    LazyLoad = True
+
     CONFIG_INDEX_RATE = "i"
 
     DefaultConfig: Dict = {CONFIG_INDEX_RATE: 0.1}
@@ -69,3 +71,15 @@ class Ecno(AbstractPlugin):
                 ],
             )
         )
+
+    def benchmark_scenarios(self) -> List[BenchScenario]:
+        index_rate: float = self.config_registry.get_config(self.CONFIG_INDEX_RATE)
+        return [
+            BenchScenario(
+                name="Worth.sum_up",
+                operation=lambda worth_seq: Worth.sum_up(worth_seq, index_rate),
+                setup=lambda size: [Worth(value=100.0 + i, sequential_index=i) for i in range(size)],
+                sizes=(10, 100, 1000),
+                number=20,
+            )
+        ]
@@ -9,6 +9,7 @@ class CMD(EnumCMD):
     emojimerge = ["eme","emerge"]
 
 class Emerge(AbstractPlugin):
+    BACKEND_NAME = "EmojiKitchen"
     CONFIG_CACHE_DIR_PATH = "cache_dir_path"
     CONFIG_DB_FILE_PATH = "db_file_path"
     DefaultConfig = {CONFIG_CACHE_DIR_PATH: f"{get_pwd()}/cache",
@@ -42,14 +43,15 @@ class Emerge(AbstractPlugin):
 
         cache_dir = self._config_registry.get_config(self.CONFIG_CACHE_DIR_PATH)
         data_file= self._config_registry.get_config(self.CONFIG_DB_FILE_PATH)
-        merger = EmojiMerge(cache_dir,data_file)
-
+        merger = EmojiMerge(cache_dir, data_file, self.http_client)
+        # a None result is treated as an unmergeable pair
+        self.circuit_breakers.register_fallback(self.BACKEND_NAME, lambda *_: None)
 
         @self.receiver(ApplicationLaunch)
         async def init_merger():
-            await merger.init_data_base()
+            await self.circuit_breakers.call(self.BACKEND_NAME, merger.init_data_base)
 
-        def _merge_emoji(emoji_1: str, emoji_2: str) -> Image | str:
+        async def _merge_emoji(emoji_1: str, emoji_2: str) -> Image | str:
             """
             Merge two emojis and return the merged result as an Image object or a string.
 
@@ -61,7 +63,9 @@ class Emerge(AbstractPlugin):
                 Image or str: The merged emoji as an Image object if successful, or a string indicating failure.
             """
             print(f"{Back.YELLOW}Merge {emoji_1} and {emoji_2}{Back.RESET}")
-            path = merger.merge(emoji_1, emoji_2)
+            path = merger.seach_cache(emoji_1, emoji_2) or await self.circuit_breakers.call(
+                self.BACKEND_NAME, merger.seach_db, emoji_1, emoji_2
+            )
             if path is None:
                 from random import choice
 
@@ -2,9 +2,8 @@ import json
 import pathlib
 from typing import Dict, List
 
-import requests
-
 from modules.file_manager import explore_folder
+from modules.http_client import HttpClient
 from .fetch import fetch_src
 
 
@@ -15,8 +14,9 @@ class EmojiMerge:
 
     SRC_URL = "https://backend.emojikitchen.dev"
 
-    def __init__(self, cache_dir: str, data_path_file: str):
+    def __init__(self, cache_dir: str, data_path_file: str, client: HttpClient):
         pathlib.Path(cache_dir).mkdir(parents=True, exist_ok=True)
+        self._client = client
         self._db_file = data_path_file
         self._data_base: Dict[str, str] = {}
         self._cache_dir = cache_dir
@@ -40,7 +40,7 @@ class EmojiMerge:
         Returns:
             Dict[str, str]: A dictionary containing the downloaded data, where the keys are the emoji names and the values are the URLs of the corresponding emoji images.
         """
-        content: str = await fetch_src(self.SRC_URL)
+        content: str = await fetch_src(self.SRC_URL, self._client)
         content_obj = json.loads(content)
         data_seq: List[Dict] = raw_getter(content_obj)
         index: Dict[str, str] = make_index(data_seq)
@@ -55,17 +55,17 @@ class EmojiMerge:
         if matched:
             return matched[0]
 
-    def seach_db(self, emoji_1: str, emoji_2: str) -> str | None:
+    async def seach_db(self, emoji_1: str, emoji_2: str) -> str | None:
         key1, key2 = (emoji_1 + emoji_2), (emoji_2 + emoji_1)
         src_url = self._data_base.get(key1) or self._data_base.get(key2)
         if src_url is None:
             return None
-        ret = requests.get(src_url)
+        ret = await self._client.get(src_url, raise_for_status=True)
         save_path = pathlib.Path(self._cache_dir).joinpath(f"{emoji_1}{emoji_2}.png")
-        save_path.write_bytes(ret.content)
+        save_path.write_bytes(await ret.read())
         return save_path.as_posix()
 
-    def merge(self, emoji_1: str, emoji_2: str) -> str | None:
+    async def merge(self, emoji_1: str, emoji_2: str) -> str | None:
         """
         Merge two emojis into a single image file and return the file path.
 
@@ -81,7 +81,7 @@ class EmojiMerge:
         """
         if cached := self.seach_cache(emoji_1, emoji_2):
             return cached
-        return self.seach_db(emoji_1, emoji_2)
+        return await self.seach_db(emoji_1, emoji_2)
 
 
 def raw_getter(data_file: Dict) -> List[Dict]:
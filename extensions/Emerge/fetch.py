@@ -1,12 +1,13 @@
-import aiohttp
+from modules.http_client import HttpClient
 
 
-async def fetch_src(url:str):
+async def fetch_src(url:str, client: HttpClient):
     """
     Asynchronously fetches the source code from a given URL.
 
     Args:
         url (str): The URL to fetch the source code from.
+        client (HttpClient): The shared http client used to send the request.
 
     Returns:
         str: The source code as a string.
@@ -14,8 +15,7 @@ async def fetch_src(url:str):
     Raises:
         aiohttp.ClientError: If there was an error in the HTTP request.
     """
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, allow_redirects=True) as response:
-            text = await response.text()
-            return text
+    response = await client.get(url, allow_redirects=True, raise_for_status=True)
+    text = await response.text()
+    return text
 
@@ -1,12 +1,19 @@
 from random import choice, randint
-from typing import Dict
+from typing import Dict, List
 
 import jieba
 from graia.ariadne.event.message import GroupMessage, FriendMessage, ActiveGroupMessage, ActiveFriendMessage
 from graia.ariadne.message.element import Image
 from wordcloud import WordCloud
 
-from modules.shared import AbstractPlugin, get_pwd, NameSpaceNode, ExecutableNode, make_stdout_seq_string
+from modules.shared import (
+    AbstractPlugin,
+    BenchScenario,
+    get_pwd,
+    NameSpaceNode,
+    ExecutableNode,
+    make_stdout_seq_string,
+)
 from .recorder import MessageRecorder
 
 
@@ -312,3 +319,27 @@ class Kotoba(AbstractPlugin):
         )
 
         self.root_namespace_node.add_node(tree)
+
+    def benchmark_scenarios(self) -> List[BenchScenario]:
+        event = FriendMessage.parse_obj(
+            {
+                "type": "FriendMessage",
+                "sender": {"id": 1, "nickname": "bench", "remark": ""},
+                "messageChain": [
+                    {"type": "Source", "id": 1, "time": 0},
+                    {"type": "Plain", "text": "the quick brown fox jumps over the lazy dog"},
+                ],
+            }
+        )
+
+        def _setup(size: int):
+            # the messages already recorded, all of them are saved again with every new one
+            recorder = MessageRecorder(save_file_path=f"kotoba_{size}.json")
+            for i in range(size):
+                recorder.add_data(event.sender.id, f"recorded message {i}")
+            return recorder.make_listener(dense_save=True)
+
+        async def _ingest(listener):
+            await listener(None, event)
+
+        return [BenchScenario(name="ingest", operation=_ingest, setup=_setup, sizes=(100, 1000, 10000), number=10)]
@@ -12,6 +12,8 @@ class BaiduTranslater(AbstractPlugin):
 
     CONFIG_TRANSLATE_KEYWORD = "TranslateKeyword"
 
+    BACKEND_NAME = "BaiduTranslate"
+
     DefaultConfig = {
         CONFIG_APP_ID: "replace with baidu translate app_id",
         CONFIG_APP_KEY: "replace with baidu translate app_key",
@@ -45,10 +47,14 @@ class BaiduTranslater(AbstractPlugin):
             appid=self._config_registry.get_config(self.CONFIG_APP_ID),
             appkey=self._config_registry.get_config(self.CONFIG_APP_KEY),
             url=self._config_registry.get_config(self.CONFIG_API_URL),
+            client=self.http_client,
         )
 
-        def _trans_partial(to_lang: str, query: str) -> str:
-            return f"翻译结果:\n\t{self.translater.translate(to_lang, query)}"
+        # when the api is unreachable, hand back the query untranslated
+        self.circuit_breakers.register_fallback(self.BACKEND_NAME, lambda to_lang, query, from_lang="auto": query)
+
+        async def _trans_partial(to_lang: str, query: str) -> str:
+            return f"翻译结果:\n\t{await self.translate(to_lang, query)}"
 
         su_perm = Permission(id=PermissionCode.SuperPermission.value, name=f"{self.get_plugin_name()}")
         req_perm: RequiredPermission = required_perm_generator(
@@ -63,7 +69,7 @@ class BaiduTranslater(AbstractPlugin):
 
         self._root_namespace_node.add_node(tree)
 
-    def translate(self, to_lang: str, query: str, from_lang: str = "auto"):
+    async def translate(self, to_lang: str, query: str, from_lang: str = "auto"):
         """
         Wrapper for baidu translates
         Args:
@@ -74,4 +80,4 @@ class BaiduTranslater(AbstractPlugin):
         Returns:
 
         """
-        return self.translater.translate(to_lang, query, from_lang)
+        return await self.circuit_breakers.call(self.BACKEND_NAME, self.translater.translate, to_lang, query, from_lang)
@@ -2,7 +2,7 @@ import hashlib
 import random
 from typing import Dict
 
-import requests
+from modules.http_client import HttpClient
 
 RESULT_KEY = "trans_result"
 
@@ -12,10 +12,11 @@ class Translater:
     a simple baidu-based translator plugin for python
     """
 
-    def __init__(self, appid, appkey, url):
+    def __init__(self, appid, appkey, url, client: HttpClient):
         self.appid = appid
         self.appkey = appkey
         self.url = url
+        self.client = client
         print(
             f"Loading as \n"
             f"\tappid: {self.appid}\n"
@@ -52,7 +53,7 @@ class Translater:
         else:
             return m.hexdigest()
 
-    def translate(self, to_lang: str, q: str, from_lang: str = "auto"):
+    async def translate(self, to_lang: str, q: str, from_lang: str = "auto"):
         """
         Translates the given text from one language to another using the API.
 
@@ -85,7 +86,8 @@ class Translater:
         }
 
         # Send POST request to the translation API
-        result: Dict = requests.post(self.url, params=payload).json()
+        response = await self.client.post(self.url, params=payload, raise_for_status=True)
+        result: Dict = await response.json(content_type=None)
 
         # Get the translated text from the response
         if RESULT_KEY not in result:
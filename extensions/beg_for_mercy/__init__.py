@@ -2,7 +2,7 @@ import asyncio
 import pathlib
 import warnings
 from random import choice, uniform
-from typing import Set, Tuple
+from typing import List, Set, Tuple
 
 from colorama import Back
 from graia.ariadne import Ariadne
@@ -18,6 +18,7 @@ from modules.shared import (
     NameSpaceNode,
     make_stdout_seq_string,
     AbstractPlugin,
+    BenchScenario,
     get_pwd,
     generate_random_string,
     EnumCMD,
@@ -245,3 +246,20 @@ class BegForMercy(AbstractPlugin):
             """
             if pf_rank.update_records(msg_event.sender.id, message=str(msg_event.message_chain)):
                 pf_rank.save(pf_rank_path)
+
+    def benchmark_scenarios(self) -> List[BenchScenario]:
+        def _setup(size: int) -> Tuple[ProfanityRank, str]:
+            # every message is checked against all the keywords, a few of them occur in the message
+            profanities = {f"kw{i:05d}" for i in range(size)}
+            message = " ".join(["hello there"] * 20 + [f"kw{i:05d}" for i in range(0, size, max(1, size // 5))])
+            return ProfanityRank(profanities=profanities), message
+
+        return [
+            BenchScenario(
+                name="check_message",
+                operation=lambda data: data[0].check_message(data[1]),
+                setup=_setup,
+                sizes=(10, 100, 1000),
+                number=20,
+            )
+        ]
@@ -1,12 +1,15 @@
 from random import choice
+from typing import List
 
 from modules.file_manager import get_pwd
-from modules.plugin_base import AbstractPlugin
+from modules.plugin_base import AbstractPlugin, BenchScenario
 
 __all__ = ["Magi"]
 
 
 class Magi(AbstractPlugin):
+    LazyLoad = True
+
     class CMD:
         ROOT = "magi"
 
@@ -97,3 +100,26 @@ class Magi(AbstractPlugin):
         )
         self._auth_manager.add_perm_from_req(req_perm)
         self._root_namespace_node.add_node(tree)
+
+    def benchmark_scenarios(self) -> List[BenchScenario]:
+        from modules.file_manager import explore_folder
+        from .gif_factory import GifFactory
+
+        gif_dir_path: str = self._config_registry.get_config(self.CONFIG_GIF_ASSET_PATH)
+        pass_file_path = explore_folder(f"{gif_dir_path}/{self.__PASS_DIR_NAME}")[0]
+        eval_file_path: str = f"{gif_dir_path}/{self.__EVALUATING_DIR_NAME}/{self.__EVALUATING_GIF_NAME}"
+        gif_count: int = self._config_registry.get_config(self.CONFIG_EVAL_GIF_LOOP_COUNT)
+        duration: int = self._config_registry.get_config(self.CONFIG_RESULT_FRAME_DURATION)
+
+        def _compose(jpg_count: int):
+            # the size is the count of the pass frames, the composed gif is written into the working directory
+            GifFactory.append_jpg_to_gif(
+                jpg_path=pass_file_path,
+                jpg_count=jpg_count,
+                gif_path=eval_file_path,
+                gif_count=gif_count,
+                output_path=f"magi/{self.__TEMP_FILE_NAME}",
+                duration=duration,
+            )
+
+        return [BenchScenario(name="gif composition", operation=_compose, sizes=(5, 20), number=1)]
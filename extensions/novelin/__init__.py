@@ -7,6 +7,8 @@ __all__ = ["Novelin"]
 
 
 class Novelin(AbstractPlugin):
+    LazyLoad = True
+
     CONFIG_NOVEL_ASSET_PATH = "novel_asset_path"
     CONFIG_DETECTED_KEYWORD = "detected_keyword"
     DefaultConfig = {
@@ -4,6 +4,7 @@ from typing import List, Iterable
 
 from graia.ariadne.message.element import ForwardNode, Forward, Image
 
+from modules.http_client import HttpClient
 from modules.shared import download_file, rename_image_with_hash
 
 
@@ -34,8 +35,8 @@ def make_zip(source_files: Iterable[str], output_filename: str):
             zipf.write(file, path_obj.name)
 
 
-async def make_image_zipper(images: List[Image], save_dir) -> str:
-    image_files: List[str] = await download_file([image.url for image in images], save_dir)
+async def make_image_zipper(images: List[Image], save_dir, client: HttpClient) -> str:
+    image_files: List[str] = await download_file([image.url for image in images], save_dir, client=client)
 
     print(f"Downloaded images: {image_files}")
     temp_file_path = f"{save_dir}/temp.zip"
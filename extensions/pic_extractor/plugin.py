@@ -89,7 +89,9 @@ class PicExtractor(AbstractPlugin):
             images = await extract_images_from_forward(quoted_msg.get(Forward)[0])
             await app.send_message(msg_event, f"Extracted {len(images)} images")
             save_path = await make_image_zipper(
-                images=images, save_dir=self.config_registry.get_config(PicExtractor.CONFIG_CACHE_DIR)
+                images=images,
+                save_dir=self.config_registry.get_config(PicExtractor.CONFIG_CACHE_DIR),
+                client=self.http_client,
             )
 
             await app.upload_file(save_path, target=msg_event.sender.group)
@@ -19,6 +19,8 @@ class CMD:
 
 
 class RandomMeme(AbstractPlugin):
+    LazyLoad = True
+
     GIF_ASSET_PATH = "gif_asset_path"
 
     DefaultConfig = {
@@ -2,6 +2,8 @@ from modules.plugin_base import AbstractPlugin
 
 
 class SysInfo(AbstractPlugin):
+    LazyLoad = True
+
     __INFO_CPU_CMD = "cpu"
     __INFO_GPU_CMD = "gpu"
     __INFO_MEM_CMD = "mem"
@@ -1,15 +1,48 @@
+import argparse
 import pathlib
 from enum import Enum
-from typing import List
+from typing import List, Optional, TYPE_CHECKING
+
+from modules.startup_profiler import profiler
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--test", action="store_true", help="test mode", default=False)
+parser.add_argument(
+    "--recheck-deps",
+    action="store_true",
+    help="check the extension requirements even if they are unchanged since the last check",
+    default=False,
+)
+parser.add_argument(
+    "--profile-startup",
+    action="store_true",
+    help="report the time and memory taken by each startup phase and plugin",
+    default=False,
+)
+parser.add_argument(
+    "--profile-trace",
+    default=None,
+    help="write the startup profile as a json trace to the path, implies --profile-startup",
+)
+
+
+def profiling_requested(namespace: argparse.Namespace) -> bool:
+    return namespace.profile_startup or namespace.profile_trace is not None
+
 
-from graia.ariadne.connection.config import WebsocketClientConfig
+if __name__ == "__main__" and profiling_requested(parser.parse_known_args()[0]):
+    # enabled before the imports below, so they are profiled too
+    profiler.enable()
 
-from constant import CONFIG_FILE_NAME, CONFIG_DIR, EXTENSION_DIR
-from modules.auth.resources import RequiredPermission
-from modules.chat_bot import ChatBot, BotInfo, BotConfig, BotConnectionConfig
-from modules.cmd import ExecutableNode, NameSpaceNode
-from modules.config_utils import ConfigRegistry
-from modules.shared import EnumCMD
+with profiler.phase("import core"):
+    from constant import CONFIG_FILE_NAME, CONFIG_DIR, EXTENSION_DIR, AUTH_WARM_START_PATH
+    from modules.auth.resources import RequiredPermission
+    from modules.cmd import ExecutableNode, NameSpaceNode, EnumCMD, path_checks, list_accessible_paths
+    from modules.config_utils import ConfigRegistry
+
+if TYPE_CHECKING:
+    # the bot and its ariadne stack are only imported once the bot is built, see Bootstrap.bot
+    from modules.chat_bot import ChatBot
 
 
 class DefaultConfig(Enum):
@@ -18,6 +51,9 @@ class DefaultConfig(Enum):
     VERIFY_KEY = "INITKEYXBVCdNG0"
     ACCOUNT_ID = 1234567890
     ACCEPTED_MESSAGE_TYPES = ["GroupMessage"]
+    AUTH_WARM_START = False
+    # the other accounts served by the bot, like [{"ACCOUNT_ID": 1, "VERIFY_KEY": "", "WEBSOCKET_HOST": ""}]
+    EXTRA_ACCOUNTS = []
     VERSION = "v0.5.1"
 
 
@@ -37,6 +73,16 @@ def make_installed_plugins_cmd(plugins_view):
     return _plugins
 
 
+def make_reload_cmd(extensions):
+    async def _reload(plugin_name: str) -> str:
+        """
+        Reload the target plugin in place, the config is loaded from the config file again
+        """
+        return f'Reload the "{plugin_name}" plugin\nSuccess={await extensions.reload_plugin(plugin_name)}'
+
+    return _reload
+
+
 class CMD(EnumCMD):
     bot = ["b", "bt"]
     version = ["v", "V", "ver"]
@@ -45,98 +91,266 @@ class CMD(EnumCMD):
     disable = ["di", "dis"]
     enable = ["en", "ena"]
     reboot = ["r", "rbt"]
+    reload = ["rld"]
     superuser = ["su"]
+    breakers = ["cb", "brk"]
+    list = ["l", "ls"]
+    reset = ["rs"]
+    who = ["wh"]
+    can = ["cn"]
+
+
+def make_who_cmd(bot: "ChatBot"):
+    def _who(*path: str) -> str:
+        """
+        List the users who could run the cmd at the path, like "bot who bot reboot"
+        """
+        try:
+            checks = path_checks(bot.root, list(path))
+        except KeyError as e:
+            return f"Invalid path: {e}"
+        users = bot.auth_manager.who_can(checks)
+        return "\n".join(user.unique_label for user in users) or "No user"
+
+    return _who
+
+
+def make_can_cmd(bot: "ChatBot"):
+    def _can(user_id: str, group_id: str = "") -> str:
+        """
+        List the cmds the user could run, each one by its path, like "bot can 123456",
+        the roles granted to a group count only if the group id is given too, like "bot can 123456 654321"
+        """
+        try:
+            # the group pseudo-user goes first, then the user, as the cmds are dispatched
+            user_ids = (int(group_id), int(user_id)) if group_id else (int(user_id),)
+        except ValueError as e:
+            return f"Invalid user id: {e}"
+        permission_sets = bot.auth_manager.resolve_permissions(*user_ids).role_permissions
+        return "\n".join(list_accessible_paths(bot.root, permission_sets)) or "No cmd"
+
+    return _can
+
+
+def make_bot_tree(bot: "ChatBot") -> NameSpaceNode:
+    """
+    Make the built-in management cmds of the bot.
+
+    Args:
+        bot (ChatBot): The bot to manage.
+
+    Returns:
+        NameSpaceNode: The root node of the management cmds.
+    """
+    return NameSpaceNode(
+        **CMD.bot.export(),
+        children_node=[
+            ExecutableNode(
+                **CMD.plugins.export(),
+                source=make_installed_plugins_cmd(plugins_view=bot.get_installed_plugins),
+            ),
+            ExecutableNode(
+                **CMD.cmds.export(),
+                source=make_help_cmd(client=bot.root),
+                help_message="These cmds are both built-in and extensions",
+            ),
+            ExecutableNode(
+                **CMD.version.export(),
+                source=lambda: DefaultConfig.VERSION.value,
+                help_message="The core version of the bot",
+            ),
+            ExecutableNode(
+                **CMD.disable.export(),
+                help_message="Disable the target plugin",
+                source=lambda x: f'Disable the "{x}" plugin\nSuccess={bot.extensions.disable_plugin(x)}',
+            ),
+            ExecutableNode(
+                **CMD.enable.export(),
+                help_message="Enable the target plugin",
+                source=lambda x: f'Enable the "{x}" plugin\nSuccess={bot.extensions.enable_plugin(x)}',
+            ),
+            ExecutableNode(
+                **CMD.reboot.export(),
+                required_permissions=RequiredPermission(execute=[bot.auth_manager.__su_permission__]),
+                help_message="Reboot the bot",
+                source=lambda: f"Reboot the bot\nSuccess={bot.reboot()}",
+            ),
+            ExecutableNode(
+                **CMD.reload.export(),
+                required_permissions=RequiredPermission(execute=[bot.auth_manager.__su_permission__]),
+                help_message="Reload the target plugin without rebooting the bot",
+                source=make_reload_cmd(extensions=bot.extensions),
+            ),
+            ExecutableNode(
+                **CMD.who.export(),
+                required_permissions=RequiredPermission(execute=[bot.auth_manager.__su_permission__]),
+                help_message="List the users who could run the cmd at the path",
+                source=make_who_cmd(bot),
+            ),
+            ExecutableNode(
+                **CMD.can.export(),
+                required_permissions=RequiredPermission(execute=[bot.auth_manager.__su_permission__]),
+                help_message="List the cmds the user could run, in the group if its id is given",
+                source=make_can_cmd(bot),
+            ),
+            NameSpaceNode(
+                **CMD.breakers.export(),
+                required_permissions=RequiredPermission(read=[bot.auth_manager.__su_permission__]),
+                help_message="Circuit breakers of the external backends",
+                children_node=[
+                    ExecutableNode(
+                        **CMD.list.export(),
+                        help_message="List the state of every circuit breaker",
+                        source=lambda: bot.circuit_breakers.status(),
+                    ),
+                    ExecutableNode(
+                        **CMD.reset.export(),
+                        help_message="Close the circuit breaker of the target backend",
+                        source=lambda x: f'Reset the "{x}" breaker\n' f"Success={bot.circuit_breakers.reset(x)}",
+                    ),
+                ],
+            ),
+        ],
+        help_message="ChatBot coral management tool",
+    )
+
+
+class Bootstrap(object):
+    """
+    Builds the core components of the bot on demand, each one in its own startup phase.
+
+    Notes:
+        nothing is built on the construction, so the tooling and the tests could take only the parts they need,
+        the config and the bot, with its ariadne app and auth manager, are each built on their first access
+    """
+
+    def __init__(self, name: str = "Mieka", config_dir: str = CONFIG_DIR):
+        """
+        Args:
+            name (str, optional): The name of the bot, which names its config file. Defaults to "Mieka".
+            config_dir (str, optional): The directory of the config file, the default auth config is kept there too.
+                Defaults to CONFIG_DIR.
+        """
+        self._name: str = name
+        self._config_dir: str = config_dir
+        self._config: Optional[ConfigRegistry] = None
+        self._bot: Optional["ChatBot"] = None
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def config(self) -> ConfigRegistry:
+        """
+        Returns the loaded config of the bot, registers the defaults on the first access.
+        """
+        if self._config is None:
+            with profiler.phase("load config"):
+                pathlib.Path(self._config_dir).mkdir(parents=True, exist_ok=True)
+                config = ConfigRegistry(f"{self._config_dir}/{self._name}_{CONFIG_FILE_NAME}")
+                for default in (
+                    DefaultConfig.ACCOUNT_ID,
+                    DefaultConfig.VERIFY_KEY,
+                    DefaultConfig.WEBSOCKET_HOST,
+                    DefaultConfig.ACCEPTED_MESSAGE_TYPES,
+                    DefaultConfig.AUTH_WARM_START,
+                    DefaultConfig.EXTRA_ACCOUNTS,
+                ):
+                    config.register_config(default.name, default.value)
+                # the auth config defaults to the config directory of the bot
+                config.register_config(
+                    DefaultConfig.AUTH_CONFIG_FILE_NAME.name,
+                    f"{self._config_dir}/{pathlib.Path(DefaultConfig.AUTH_CONFIG_FILE_NAME.value).name}",
+                )
+                config.load_config()
+            self._config = config
+        return self._config
+
+    @property
+    def bot_built(self) -> bool:
+        return self._bot is not None
+
+    @property
+    def bot(self) -> "ChatBot":
+        """
+        Returns the bot with the built-in management cmds installed, builds it on the first access.
+        """
+        if self._bot is None:
+            with profiler.phase("import bot"):
+                from graia.ariadne.connection.config import WebsocketClientConfig
+
+                from modules.chat_bot import ChatBot, BotInfo, BotConfig, BotConnectionConfig
+            config = self.config
+            with profiler.phase("construct bot"):
+                bot = ChatBot(
+                    bot_info=BotInfo(account_id=config.get_config(DefaultConfig.ACCOUNT_ID.name), bot_name=self._name),
+                    bot_config=BotConfig(
+                        extension_dir=EXTENSION_DIR,
+                        auth_config_file_path=config.get_config(DefaultConfig.AUTH_CONFIG_FILE_NAME.name),
+                        accepted_message_types=config.get_config(DefaultConfig.ACCEPTED_MESSAGE_TYPES.name),
+                        auth_warm_start_path=(
+                            AUTH_WARM_START_PATH if config.get_config(DefaultConfig.AUTH_WARM_START.name) else None
+                        ),
+                    ),
+                    bot_connection_config=BotConnectionConfig(
+                        verify_key=config.get_config(DefaultConfig.VERIFY_KEY.name),
+                        websocket_config=WebsocketClientConfig(
+                            host=config.get_config(DefaultConfig.WEBSOCKET_HOST.name)
+                        ),
+                    ),
+                    extra_accounts={
+                        account[DefaultConfig.ACCOUNT_ID.name]: BotConnectionConfig(
+                            verify_key=account[DefaultConfig.VERIFY_KEY.name],
+                            websocket_config=WebsocketClientConfig(host=account[DefaultConfig.WEBSOCKET_HOST.name]),
+                        )
+                        for account in config.get_config(DefaultConfig.EXTRA_ACCOUNTS.name)
+                    },
+                )
+                bot.root.add_node(make_bot_tree(bot))
+            self._bot = bot
+        return self._bot
 
 
 class Mieka(object):
     """
-    Mieka chatbot
+    Mieka chatbot, the bot is built on the first run
     """
 
-    __NAME = "Mieka"
-    pathlib.Path(CONFIG_DIR).mkdir(parents=True, exist_ok=True)
-    __config = ConfigRegistry(f"{CONFIG_DIR}/{__NAME}_{CONFIG_FILE_NAME}")
-    __config.register_config(DefaultConfig.ACCOUNT_ID.name, DefaultConfig.ACCOUNT_ID.value)
-    __config.register_config(DefaultConfig.VERIFY_KEY.name, DefaultConfig.VERIFY_KEY.value)
-    __config.register_config(DefaultConfig.AUTH_CONFIG_FILE_NAME.name, DefaultConfig.AUTH_CONFIG_FILE_NAME.value)
-    __config.register_config(DefaultConfig.WEBSOCKET_HOST.name, DefaultConfig.WEBSOCKET_HOST.value)
-    __config.register_config(DefaultConfig.ACCEPTED_MESSAGE_TYPES.name, DefaultConfig.ACCEPTED_MESSAGE_TYPES.value)
-    __config.load_config()
-    accepted_message_types: List[str] = __config.get_config(DefaultConfig.ACCEPTED_MESSAGE_TYPES.name)
-    __bot_info = BotInfo(account_id=__config.get_config(DefaultConfig.ACCOUNT_ID.name), bot_name=__NAME)
-    __bot_config = BotConfig(
-        extension_dir=EXTENSION_DIR,
-        auth_config_file_path=__config.get_config(DefaultConfig.AUTH_CONFIG_FILE_NAME.name),
-        accepted_message_types=accepted_message_types,
-    )
-    __bot_connection_config = BotConnectionConfig(
-        verify_key=__config.get_config(DefaultConfig.VERIFY_KEY.name),
-        websocket_config=WebsocketClientConfig(host=__config.get_config(DefaultConfig.WEBSOCKET_HOST.name)),
-    )
-    __bot = ChatBot(
-        bot_info=__bot_info,
-        bot_config=__bot_config,
-        bot_connection_config=__bot_connection_config,
-    )
+    def __init__(self, bootstrap: Optional[Bootstrap] = None):
+        self._bootstrap: Bootstrap = bootstrap or Bootstrap("Mieka")
 
-    def __init__(self):
-        bot_tree: NameSpaceNode = NameSpaceNode(
-            **CMD.bot.export(),
-            children_node=[
-                ExecutableNode(
-                    **CMD.plugins.export(),
-                    source=make_installed_plugins_cmd(plugins_view=self.__bot.get_installed_plugins),
-                ),
-                ExecutableNode(
-                    **CMD.cmds.export(),
-                    source=make_help_cmd(client=self.__bot.root),
-                    help_message="These cmds are both built-in and extensions",
-                ),
-                ExecutableNode(
-                    **CMD.version.export(),
-                    source=lambda: DefaultConfig.VERSION.value,
-                    help_message="The core version of the bot",
-                ),
-                ExecutableNode(
-                    **CMD.disable.export(),
-                    help_message="Disable the target plugin",
-                    source=lambda x: f'Disable the "{x}" plugin\nSuccess={self.__bot.extensions.disable_plugin(x)}',
-                ),
-                ExecutableNode(
-                    **CMD.enable.export(),
-                    help_message="Enable the target plugin",
-                    source=lambda x: f'Enable the "{x}" plugin\nSuccess={self.__bot.extensions.enable_plugin(x)}',
-                ),
-                ExecutableNode(
-                    **CMD.reboot.export(),
-                    required_permissions=RequiredPermission(execute=[self.__bot.auth_manager.__su_permission__]),
-                    help_message="Reboot the bot",
-                    source=lambda: f"Reboot the bot\nSuccess={self.__bot.reboot()}",
-                ),
-            ],
-            help_message="ChatBot coral management tool",
-        )
-        self.__bot.root.add_node(bot_tree)
+    @property
+    def bootstrap(self) -> Bootstrap:
+        return self._bootstrap
+
+    @property
+    def bot(self) -> "ChatBot":
+        return self._bootstrap.bot
 
-    @classmethod
-    def run(cls):
+    def run(self, recheck_deps: bool = False, init_utils: bool = True):
         """
         run the bot, save config_registry on exit
         Returns:
 
         """
 
-        cls.__bot.run(init_utils=True)
+        self.bot.run(init_utils=init_utils, recheck_deps=recheck_deps)
 
-    @classmethod
-    def init_utils(cls):
-        cls.__bot.init_utils()
+    def init_utils(self, recheck_deps: bool = False):
+        self.bot.init_utils(recheck_deps)
 
 
-import argparse
+def report_startup_profile(trace_path: Optional[str] = None) -> None:
+    """
+    Print the startup profile, write it as a json trace if the path is given, then stop profiling.
+    """
+    print(profiler.report())
+    if trace_path:
+        profiler.dump(trace_path)
+        print(f"Startup trace written to {trace_path}")
+    profiler.disable()
 
-parser = argparse.ArgumentParser()
-parser.add_argument("--test", action="store_true", help="test mode", default=False)
 
 if __name__ == "__main__":
     args = parser.parse_args()
@@ -145,11 +359,17 @@ if __name__ == "__main__":
     if args.test:
         print("test mode")
         try:
-            bot.init_utils()
+            bot.init_utils(args.recheck_deps)
         except Exception as e:
             print(e)
             exit(1)
+        report_startup_profile(args.profile_trace) if profiling_requested(args) else None
         print("test mode done")
         exit(0)
 
-    bot.run()
+    if profiling_requested(args):
+        bot.init_utils(args.recheck_deps)
+        report_startup_profile(args.profile_trace)
+        bot.run(args.recheck_deps, init_utils=False)
+    else:
+        bot.run(args.recheck_deps)
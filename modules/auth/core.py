@@ -1,15 +1,22 @@
+import asyncio
 import inspect
 import pathlib
+import threading
+from contextlib import contextmanager, nullcontext
 from functools import wraps
-from typing import Optional, NamedTuple, Any, Dict, Iterable, List, Callable, Type
+from typing import Optional, NamedTuple, Any, Dict, Iterable, List, Callable, Type, Iterator, Tuple, FrozenSet
 
 from pydantic import PrivateAttr, validator
 
 from .permissions import Permission, PermissionCode, PermissionManager
+from .index import PermissionIndex
+from .records import UserRecord, AuthTables, EffectivePermissions
 from .resources import ResourceManager, Resource, required_perm_generator, RequiredPermission
-from .roles import RoleManager, Role
+from .roles import RoleManager, Role, RoleCycleError, resolve_role_closure, find_role_path
+from .snapshot import snapshot_key, load_snapshot, dump_snapshot
+from .storage import AuthStorage, SectionChange, make_storage
 from .users import UserManager, User
-from .utils import AuthBaseModel, make_label, UniqueLabel
+from .utils import AuthBaseModel, ManagerBase, make_label, UniqueLabel
 
 
 class Root(NamedTuple):
@@ -17,13 +24,17 @@ class Root(NamedTuple):
     name: str = "root"
 
 
-def final_handler(final_method: str, exception: Optional[Type[Exception]] = Exception) -> Callable:
+def final_handler(
+    final_method: str, exception: Optional[Type[Exception]] = Exception, context: Optional[str] = None
+) -> Callable:
     """
     Decorator that wraps a function and handles exceptions and a final method call.
 
     Args:
         final_method (str): The name of the final method to be called after the function is executed.
         exception (Optional[Type[Exception]], optional): The type of exception to catch. Default to Exception.
+        context (Optional[str], optional): The name of the method making the context manager
+            the function and the final method are run in. Defaults to None.
 
     Returns:
         Callable: The wrapped function.
@@ -51,13 +62,14 @@ def final_handler(final_method: str, exception: Optional[Type[Exception]] = Exce
         @wraps(func)
         def wrapped(self, *args, **kwargs) -> bool:
             result = False
-            try:
-                result = func(self, *args, **kwargs)
-            except exception:
-                pass
-            finally:
-                final_method_obj = getattr(self, final_method)
-                final_method_obj()
+            with getattr(self, context)() if context else nullcontext():
+                try:
+                    result = func(self, *args, **kwargs)
+                except exception:
+                    pass
+                finally:
+                    final_method_obj = getattr(self, final_method)
+                    final_method_obj()
             return result
 
         return wrapped  # 更新装饰函数的元信息
@@ -72,6 +84,15 @@ class AuthorizationManager(AuthBaseModel):
 
     Notes:
         the change is required to reboot the bot to take effect.
+        if warm_start_path is set, the loaded objects are snapshotted there and restored on the next load,
+        as long as the config file and the auth models stay unchanged.
+        every mutation saves the config, use batch to save many mutations at once,
+        with a positive flush_delay the saves made inside a running event loop are written in the background.
+        a config_file_path with a database suffix (.db, .sqlite, .sqlite3) stores the objects in sqlite,
+        which is imported once from the json config of the same name and saves only the changed objects.
+        with trusted_load the stored objects are built without validation, only for the config written by the bot.
+        the dispatch reads the users and the roles through the immutable tables, see tables,
+        which are compiled anew after the mutations and published by swapping the reference, so it never blocks
     """
 
     class Config:
@@ -80,10 +101,26 @@ class AuthorizationManager(AuthBaseModel):
     __su_permission__: Permission = PrivateAttr(default=Permission(id=PermissionCode.SuperPermission.value, name="su"))
 
     config_file_path: pathlib.Path | str
+    warm_start_path: Optional[str] = None
+    flush_delay: float = 0.0
+    trusted_load: bool = False
+    _batch_depth: int = PrivateAttr(default=0)
+    _flush_handle: Optional[asyncio.TimerHandle] = PrivateAttr(default=None)
     _users: UserManager = PrivateAttr()
     _roles: RoleManager = PrivateAttr()
     _permissions: PermissionManager = PrivateAttr()
     _resources: ResourceManager = PrivateAttr()
+    _storage: AuthStorage = PrivateAttr()
+    _write_lock: threading.RLock = PrivateAttr(default_factory=threading.RLock)
+    _tables: AuthTables = PrivateAttr(default_factory=lambda: AuthTables(-1, {}, {}))
+    _tables_roles_version: int = PrivateAttr(default=-1)
+    _pending_users: Dict[UniqueLabel, None] = PrivateAttr(default_factory=dict)
+    _pending_users_version: int = PrivateAttr(default=-1)
+    _role_closure: Dict[UniqueLabel, FrozenSet[Permission]] = PrivateAttr(default_factory=dict)
+    _closure_version: int = PrivateAttr(default=-1)
+    _index: PermissionIndex = PrivateAttr(default_factory=PermissionIndex)
+    _index_roles_version: int = PrivateAttr(default=-1)
+    _index_users_version: int = PrivateAttr(default=-1)
 
     @property
     def users(self) -> List[User]:
@@ -111,18 +148,22 @@ class AuthorizationManager(AuthBaseModel):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         root = Root()._asdict()
-        self._permissions = PermissionManager(**root, config_file_path=self.config_file_path)
-        self._roles = RoleManager(**root, config_file_path=self.config_file_path)
-        self._users = UserManager(**root, config_file_path=self.config_file_path)
-        self._resources = ResourceManager(**root, config_file_path=self.config_file_path)
+        # the managers share the storage and are loaded all at once by self.load below
+        self._storage = make_storage(self.config_file_path)
+        shared = dict(**root, config_file_path=self.config_file_path, load_on_init=False, storage=self._storage)
+        self._permissions = PermissionManager(**shared)
+        self._roles = RoleManager(**shared)
+        self._users = UserManager(**shared)
+        self._resources = ResourceManager(**shared)
         self._permissions.add_object(self.__su_permission__)
         self.load()
         su_role = Role(**root, permissions=[self.__su_permission__])
         self._roles.add_object(su_role)
         su_user = User(id=self.id, name=self.name, roles=[su_role])
         self._users.add_object(su_user)
+        self.tables()
 
-    @final_handler("save", KeyError)
+    @final_handler("save", KeyError, context="batch")
     def add_user(self, user_id: int, user_name: str, user_roles: Optional[Iterable[UniqueLabel]] = None) -> bool:
         """
         Adds a user to the system.
@@ -139,9 +180,12 @@ class AuthorizationManager(AuthBaseModel):
             user_roles: List[Role] = [self._roles.object_dict[label] for label in user_roles]
         else:
             user_roles = []
-        return self._users.add_object(User(id=user_id, name=user_name, roles=user_roles))
+        version = self._users.version
+        added = self._users.add_object(User(id=user_id, name=user_name, roles=user_roles))
+        self._user_changed(make_label(user_id, user_name), version)
+        return added
 
-    @final_handler("save", KeyError)
+    @final_handler("save", KeyError, context="batch")
     def remove_user(self, user_id: int, user_name: str) -> bool:
         """
         Removes a user from the list of users.
@@ -153,7 +197,9 @@ class AuthorizationManager(AuthBaseModel):
         Returns:
             bool: True if the user was successfully removed, False otherwise.
         """
+        version = self._users.version
         self._users.remove_object(make_label(user_id, user_name))
+        self._user_changed(make_label(user_id, user_name), version)
         return True
 
     def get_user(self, user_id: Optional[int] = None, user_name: Optional[str] = None) -> User | List[User]:
@@ -166,7 +212,163 @@ class AuthorizationManager(AuthBaseModel):
         else:
             raise KeyError("Either user_id or user_name must be provided.")
 
-    @final_handler("save", KeyError)
+    @property
+    def version(self) -> int:
+        """
+        Returns: the version of the users and the roles, it grows with every change made through the managers.
+        """
+        return self._users.version + self._roles.version
+
+    def role_closure(self) -> Dict[UniqueLabel, FrozenSet[Permission]]:
+        """
+        Get the permissions of every role together with the inherited ones, resolved once per change of the roles.
+
+        Returns:
+            Dict[UniqueLabel, FrozenSet[Permission]]: The role labels mapped to their full permissions.
+
+        Notes:
+            a cycle loaded from the storage is warned about and broken, the grants never make one
+        """
+        if self._roles.version != self._closure_version:
+            self._role_closure = resolve_role_closure(self._roles.object_dict)
+            self._closure_version = self._roles.version
+        return self._role_closure
+
+    def permission_index(self) -> PermissionIndex:
+        """
+        Get the reverse permission index, the roles are indexed again on their changes, which are rare,
+        the users granted or added through this manager are indexed one by one, any other change of the users
+        indexes all of them again.
+
+        Returns:
+            PermissionIndex: The index in sync with the roles and the users.
+
+        Notes:
+            the index is changed in place by the writer, it is read under the write lock, see who_can
+        """
+        if self._roles.version != self._index_roles_version:
+            self._index.index_roles(self.role_closure())
+            self._index_roles_version = self._roles.version
+        if self._users.version != self._index_users_version:
+            self._index.clear_users()
+            for user in self._users.object_dict.values():
+                self._index.index_user(user.unique_label, [role.unique_label for role in user.roles])
+            self._index_users_version = self._users.version
+        return self._index
+
+    def _user_changed(self, user_label: UniqueLabel, version: int) -> None:
+        """
+        Track the user changed by the manager, so the index and the next tables are updated for this user alone,
+        as long as they were in sync with the users before the change, otherwise they are rebuilt as a whole.
+
+        Args:
+            user_label (UniqueLabel): The label of the changed user.
+            version (int): The version of the users before the change.
+        """
+        user: Optional[User] = self._users.object_dict.get(user_label)
+        if self._pending_users_version == version:
+            self._pending_users[user_label] = None
+            self._pending_users_version = self._users.version
+        if self._index_users_version != version:
+            return
+        if user is None:
+            self._index.unindex_user(user_label)
+        else:
+            self._index.index_user(user_label, [role.unique_label for role in user.roles])
+        self._index_users_version = self._users.version
+
+    def who_can(self, checks: Iterable[Tuple[List[Permission], List[Permission]]]) -> List[User]:
+        """
+        Find the users with a role passing all the permission checks, see modules.cmd.path_checks.
+
+        Args:
+            checks (Iterable[Tuple[List[Permission], List[Permission]]]): The required and the super permissions
+                of every check.
+
+        Returns:
+            List[User]: The users, sorted by their labels.
+
+        Notes:
+            an admin query, it waits for the mutation in progress, unlike the dispatch reading the tables
+        """
+        with self._write_lock:
+            labels = self.permission_index().users_passing(checks)
+            return [self._users.object_dict[label] for label in sorted(labels) if label in self._users.object_dict]
+
+    def tables(self) -> AuthTables:
+        """
+        Get the latest published tables, compiled again first if the users or the roles changed since.
+
+        Returns:
+            AuthTables: The tables, immutable, so they could be held and read without any lock.
+
+        Notes:
+            the tables are published by the writer on the exit of every mutation or batch,
+            they are only compiled here for the changes made around the managers, and only when no mutation
+            is in progress, a reader never waits for the writer, it takes the last published tables instead
+        """
+        tables = self._tables
+        if tables.version == self.version or self._batch_depth or not self._write_lock.acquire(blocking=False):
+            return tables
+        try:
+            return self._publish()
+        finally:
+            self._write_lock.release()
+
+    def _publish(self) -> AuthTables:
+        """
+        Compile the tables of the current version and publish them, the caller must hold the write lock.
+
+        Returns:
+            AuthTables: The published tables.
+
+        Notes:
+            if only the users tracked by _user_changed are changed since the last tables, the new tables are made
+            from the last ones with the records of those users alone compiled again, otherwise they are compiled whole
+        """
+        if self._tables.version == self.version:
+            return self._tables
+        if self._roles.version == self._tables_roles_version and self._users.version == self._pending_users_version:
+            changed = {label: self._users.object_dict.get(label) for label in self._pending_users}
+            tables = self._tables.evolve(self.version, changed)
+        else:
+            tables = AuthTables.compile(self.version, list(self._users.object_dict.values()), self.role_closure())
+        # published by swapping the reference, the readers holding the old tables keep them
+        self._tables = tables
+        self._pending_users.clear()
+        self._pending_users_version = self._users.version
+        self._tables_roles_version = self._roles.version
+        return tables
+
+    def get_user_records(self, user_id: int) -> Tuple[UserRecord, ...]:
+        """
+        Get the runtime records of the users of the id, from the latest published tables.
+
+        Args:
+            user_id (int): The id of the users.
+
+        Returns:
+            Tuple[UserRecord, ...]: The records of the users, empty if there is none.
+        """
+        return self.tables().user_records(user_id)
+
+    def resolve_permissions(self, *user_ids: int) -> EffectivePermissions:
+        """
+        Resolve the effective permissions of all the users of the ids, cached until the users or the roles change.
+
+        Args:
+            *user_ids (int): The ids of the users, a group id takes the pseudo-user of the group.
+
+        Returns:
+            EffectivePermissions: The permissions of the users, empty if there is no user of the ids.
+
+        Notes:
+            the tables are invalidated by the version, so the roles or the users changed without going through
+            the managers, e.g. by calling Role.add_permission directly, are not seen until the next change
+        """
+        return self.tables().resolve(*user_ids)
+
+    @final_handler("save", KeyError, context="batch")
     def add_role(self, role_id: int, role_name: str, role_perms: Optional[Iterable[UniqueLabel]] = None) -> bool:
         """
         Adds a role to the RoleManager.
@@ -186,7 +388,7 @@ class AuthorizationManager(AuthBaseModel):
 
         return self._roles.add_object(Role(id=role_id, name=role_name, permissions=role_perms))
 
-    @final_handler("save", KeyError)
+    @final_handler("save", KeyError, context="batch")
     def remove_role(self, role_id: int, role_name: str) -> bool:
         """
         Remove a role from the list of roles.
@@ -201,7 +403,7 @@ class AuthorizationManager(AuthBaseModel):
         self._roles.remove_object(make_label(role_id, role_name))
         return True
 
-    @final_handler("save", KeyError)
+    @final_handler("save", KeyError, context="batch")
     def add_perm_from_info(self, perm_id: int, perm_name: str) -> bool:
         """
         Adds a permission to the object.
@@ -215,14 +417,14 @@ class AuthorizationManager(AuthBaseModel):
         """
         return self._permissions.add_object(Permission(id=perm_id, name=perm_name))
 
-    @final_handler("save", KeyError)
+    @final_handler("save", KeyError, context="batch")
     def add_perm_from_raw(self, perm: Permission) -> bool:
         """
         Adds a permission to the object.
         """
         return self._permissions.add_object(perm)
 
-    @final_handler("save", KeyError)
+    @final_handler("save", KeyError, context="batch")
     def add_perm_from_req(self, required_permission: RequiredPermission) -> bool:
         """
         Adds a permission to the object.
@@ -237,7 +439,7 @@ class AuthorizationManager(AuthBaseModel):
             + required_permission.super
         )
 
-    @final_handler("save", KeyError)
+    @final_handler("save", KeyError, context="batch")
     def remove_perm(self, perm_id: int, perm_name: str) -> bool:
         """
         Removes a permission from the object.
@@ -252,7 +454,7 @@ class AuthorizationManager(AuthBaseModel):
         self._permissions.remove_object(make_label(perm_id, perm_name))
         return True
 
-    @final_handler("save", KeyError)
+    @final_handler("save", KeyError, context="batch")
     def add_resource(self, resource_id: int, resource_name: str, source: Any, std_init: bool = True) -> bool:
         """
         Adds a resource to the object's resource collection.
@@ -292,7 +494,7 @@ class AuthorizationManager(AuthBaseModel):
                 )
             )
 
-    @final_handler("save", KeyError)
+    @final_handler("save", KeyError, context="batch")
     def remove_resource(self, resource_id: int, resource_name: str) -> bool:
         """
         Remove a resource from the list of resources.
@@ -307,7 +509,7 @@ class AuthorizationManager(AuthBaseModel):
         self._resources.remove_object(make_label(target_id=resource_id, target_name=resource_name))
         return True
 
-    @final_handler("save", KeyError)
+    @final_handler("save", KeyError, context="batch")
     def grant_perm_to_resource(self, perm_label: str, resource_label: str, category_name: str) -> bool:
         """
         Grant permission to a resource.
@@ -323,9 +525,10 @@ class AuthorizationManager(AuthBaseModel):
         source: Resource = self._resources.object_dict[resource_label]
         perm_to_grant: Permission = self._permissions.object_dict[perm_label]
         source.required_permissions.add_permission(perm_to_grant, category_name)
+        self._resources.mark_dirty(resource_label)
         return True
 
-    @final_handler("save", KeyError)
+    @final_handler("save", KeyError, context="batch")
     def grant_perm_to_role(self, perm_label: str, role_label: str) -> bool:
         """
         Grant permission to a role.
@@ -338,9 +541,10 @@ class AuthorizationManager(AuthBaseModel):
             bool: True if the permission was granted successfully, False otherwise.
         """
         self._roles.object_dict.get(role_label).add_permission(self._permissions.object_dict.get(perm_label))
+        self._roles.mark_dirty(role_label)
         return True
 
-    @final_handler("save", KeyError)
+    @final_handler("save", KeyError, context="batch")
     def grant_role_to_user(self, role_label: str, user_label: str) -> bool:
         """
         Grant a role to a user.
@@ -352,20 +556,132 @@ class AuthorizationManager(AuthBaseModel):
         Returns:
             bool: True if the role is successfully granted to the user, False otherwise.
         """
+        version = self._users.version
         self._users.object_dict.get(user_label).add_role(self._roles.object_dict.get(role_label))
+        self._users.mark_dirty(user_label)
+        self._user_changed(user_label, version)
+        return True
+
+    @final_handler("save", KeyError, context="batch")
+    def grant_parent_to_role(self, parent_label: str, role_label: str) -> bool:
+        """
+        Make a role inherit all the permissions of the parent role, including the ones the parent inherits.
+
+        Args:
+            parent_label (str): The label of the role to inherit from.
+            role_label (str): The label of the role that inherits.
+
+        Returns:
+            bool: True if the parent is granted, False if the role already has it or any of the roles is missing.
+
+        Raises:
+            RoleCycleError: If the role is the parent itself or one of its ancestors.
+        """
+        roles = self._roles.object_dict
+        role: Role = roles[role_label]
+        if parent_label not in roles:
+            raise KeyError(f"[{parent_label}] is not in the role list")
+        if parent_label in role.parents:
+            return False
+        cycle = find_role_path(roles, parent_label, role_label)
+        if cycle:
+            raise RoleCycleError(f"Roles would form a cycle: {' -> '.join([role_label] + cycle)}")
+        role.parents.append(parent_label)
+        self._roles.mark_dirty(role_label)
         return True
 
+    @final_handler("save", KeyError, context="batch")
+    def revoke_parent_from_role(self, parent_label: str, role_label: str) -> bool:
+        """
+        Stop a role from inheriting the permissions of the parent role.
+
+        Args:
+            parent_label (str): The label of the parent role.
+            role_label (str): The label of the role.
+
+        Returns:
+            bool: True if the parent is revoked, False if the role does not have it.
+        """
+        parents: List[UniqueLabel] = self._roles.object_dict[role_label].parents
+        if parent_label not in parents:
+            return False
+        parents.remove(parent_label)
+        self._roles.mark_dirty(role_label)
+        return True
+
+    @contextmanager
+    def batch(self) -> Iterator["AuthorizationManager"]:
+        """
+        Defer the saves of the mutations made inside the context, they are saved at once on the exit.
+
+        Examples:
+            with auth_manager.batch():
+                for user_id in user_ids:
+                    auth_manager.add_user(user_id, "member")
+
+        Notes:
+            the batches could be nested, only the exit of the outermost one saves,
+            every mutation runs in a batch of its own, the batch holds the write lock of the manager,
+            so the mutations of other threads wait, while the readers keep the tables published before it
+        """
+        with self._write_lock:
+            self._batch_depth += 1
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+                if not self._batch_depth:
+                    self._publish()
+                    self.save()
+
     def save(self) -> None:
         """
         Save the changes made to the permissions, roles, resources, and users.
 
         Returns:
             None
+
+        Notes:
+            inside a batch nothing is saved until the batch exits,
+            with a positive flush_delay and a running event loop, the flush is scheduled after the delay,
+            so all the changes made meanwhile are written together
         """
-        self._permissions.save_object_list()
-        self._roles.save_object_list()
-        self._resources.save_object_list()
-        self._users.save_object_list()
+        if self._batch_depth:
+            return
+        if self.flush_delay > 0:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                loop = None
+            if loop is not None:
+                if self._flush_handle is None:
+                    self._flush_handle = loop.call_later(self.flush_delay, self.flush)
+                return
+        self.flush()
+
+    def flush(self) -> bool:
+        """
+        Write the changed sections into the storage at once, the unchanged sections are skipped.
+
+        Returns:
+            bool: True if anything is written, False if nothing changed.
+        """
+        with self._write_lock:
+            if self._flush_handle is not None:
+                self._flush_handle.cancel()
+                self._flush_handle = None
+            dirty_managers = [manager for manager in self._managers if manager.dirty]
+            if not dirty_managers:
+                return False
+            self._storage.save(
+                {
+                    manager.root_key: SectionChange(manager.object_dict, manager.changed_labels)
+                    for manager in dirty_managers
+                }
+            )
+            for manager in dirty_managers:
+                manager.mark_saved()
+            return True
 
     def load(self):
         """
@@ -377,12 +693,41 @@ class AuthorizationManager(AuthBaseModel):
         Returns:
             None
         """
-        if not pathlib.Path(self.config_file_path).exists():
+        if not self._storage.exists():
+            return
+        key = snapshot_key(self.config_file_path) if self.warm_start_path else None
+        if key and self._restore_snapshot(key):
             return
-        self._permissions.load_object_list()
-        self._roles.load_object_list()
-        self._resources.load_object_list()
-        self._users.load_object_list()
+        # the storage is read once, then each manager builds its own section
+        sections = self._storage.load_sections([manager.root_key for manager in self._managers])
+        for manager in self._managers:
+            manager.load_objects(sections[manager.root_key], trusted=self.trusted_load)
+        if key:
+            dump_snapshot(
+                self.warm_start_path, key, {manager.root_key: manager.object_dict for manager in self._managers}
+            )
+
+    @property
+    def _managers(self) -> List[ManagerBase]:
+        return [self._permissions, self._roles, self._resources, self._users]
+
+    def _restore_snapshot(self, key: str) -> bool:
+        """
+        Restore the objects from the warm start snapshot, skips the json parsing and the model validation.
+
+        Args:
+            key (str): The key the snapshot must match.
+
+        Returns:
+            bool: True if the snapshot is restored, False if it is missing or stale.
+        """
+        payload = load_snapshot(self.warm_start_path, key)
+        if payload is None or any(manager.root_key not in payload for manager in self._managers):
+            return False
+        for manager in self._managers:
+            for restored in payload[manager.root_key].values():
+                manager.add_object(restored, mark=False)
+        return True
 
     def update_resources(self, source_dict: Dict[str, Any]):
         """
@@ -0,0 +1,107 @@
+"""
+index that is used to answer which users hold a permission without walking all the users
+"""
+from typing import Dict, Set, FrozenSet, Mapping, Iterable, Tuple, Sequence
+
+from .permissions import Permission
+from .utils import UniqueLabel
+
+
+class PermissionIndex(object):
+    """
+    The reverse index from the permissions to the roles holding them, and from the roles to the users granted them.
+
+    Notes:
+        the roles are indexed by their definitions with the inherited permissions,
+        the users are indexed by the labels of their roles, so a user is updated without touching the others
+    """
+
+    def __init__(self):
+        self._role_permissions: Dict[UniqueLabel, FrozenSet[Permission]] = {}
+        self._permission_roles: Dict[Permission, Set[UniqueLabel]] = {}
+        self._user_roles: Dict[UniqueLabel, Tuple[UniqueLabel, ...]] = {}
+        self._role_users: Dict[UniqueLabel, Set[UniqueLabel]] = {}
+
+    def index_roles(self, role_permissions: Mapping[UniqueLabel, FrozenSet[Permission]]) -> None:
+        """
+        Index all the roles again, the users are kept.
+
+        Args:
+            role_permissions (Mapping[UniqueLabel, FrozenSet[Permission]]): The roles mapped to their full permissions.
+        """
+        self._role_permissions = dict(role_permissions)
+        self._permission_roles = {}
+        for role_label, permissions in role_permissions.items():
+            for permission in permissions:
+                self._permission_roles.setdefault(permission, set()).add(role_label)
+
+    def index_user(self, user_label: UniqueLabel, role_labels: Iterable[UniqueLabel]) -> None:
+        """
+        Index the user, replacing the roles it was indexed with.
+
+        Args:
+            user_label (UniqueLabel): The label of the user.
+            role_labels (Iterable[UniqueLabel]): The labels of the roles of the user.
+        """
+        self.unindex_user(user_label)
+        roles = tuple(role_labels)
+        self._user_roles[user_label] = roles
+        for role_label in roles:
+            self._role_users.setdefault(role_label, set()).add(user_label)
+
+    def unindex_user(self, user_label: UniqueLabel) -> None:
+        """
+        Drop the user from the index, nothing happens if it is not indexed.
+        """
+        for role_label in self._user_roles.pop(user_label, ()):
+            users = self._role_users.get(role_label)
+            if users is not None:
+                users.discard(user_label)
+                if not users:
+                    del self._role_users[role_label]
+
+    def clear_users(self) -> None:
+        self._user_roles.clear()
+        self._role_users.clear()
+
+    def roles_passing(self, required: Sequence[Permission], supers: Sequence[Permission]) -> Set[UniqueLabel]:
+        """
+        Find the roles passing a check, the same way as auth_check with any of the permissions required.
+
+        Args:
+            required (Sequence[Permission]): The required permissions, every role passes if empty.
+            supers (Sequence[Permission]): The super permissions that pass whatever is required.
+
+        Returns:
+            Set[UniqueLabel]: The labels of the passing roles.
+        """
+        if not required:
+            return set(self._role_permissions) | set(self._role_users)
+        passing: Set[UniqueLabel] = set()
+        for permission in (*required, *supers):
+            passing |= self._permission_roles.get(permission, set())
+        return passing
+
+    def users_passing(self, checks: Iterable[Tuple[Sequence[Permission], Sequence[Permission]]]) -> Set[UniqueLabel]:
+        """
+        Find the users with a role passing all the checks, the way the cmds are interpreted with each role in turn.
+
+        Args:
+            checks (Iterable[Tuple[Sequence[Permission], Sequence[Permission]]]): The required and the super
+                permissions of every check.
+
+        Returns:
+            Set[UniqueLabel]: The labels of the users.
+        """
+        roles: Set[UniqueLabel] | None = None
+        for required, supers in checks:
+            passing = self.roles_passing(required, supers)
+            roles = passing if roles is None else roles & passing
+            if not roles:
+                return set()
+        if roles is None:
+            roles = self.roles_passing((), ())
+        users: Set[UniqueLabel] = set()
+        for role_label in roles:
+            users |= self._role_users.get(role_label, set())
+        return users
@@ -1,9 +1,14 @@
 from enum import Enum
+from typing import Dict, Any, Type, Iterable, Tuple, Optional, NamedTuple
+from weakref import WeakValueDictionary
+
 from pydantic import root_validator
-from typing import Dict, Any, Type, Iterable, FrozenSet
 
 from .utils import AuthBaseModel, manager_factory, ManagerBase
 
+# the most permissions kept interned at once, the permissions made beyond it are simply not shared
+PERMISSION_INTERN_MAXSIZE: int = 8192
+
 
 class PermissionCode(Enum):
     ReadPermission: int = 1
@@ -14,6 +19,83 @@ class PermissionCode(Enum):
     SuperPermission: int = 32
 
 
+class InternStats(NamedTuple):
+    """
+    The statistics of an interning table.
+
+    Attributes:
+        hits (int): The lookups that returned an interned instance.
+        misses (int): The lookups that made a new instance.
+        overflows (int): The new instances not interned since the table is full.
+        size (int): The instances interned now.
+        maxsize (int): The most instances interned at once.
+    """
+
+    hits: int
+    misses: int
+    overflows: int
+    size: int
+    maxsize: int
+
+
+class PermissionInterner(object):
+    """
+    The interning table of the permissions, keyed by (id, name).
+
+    Notes:
+        the instances are held weakly, so a permission no longer used anywhere is freed and leaves the table
+    """
+
+    def __init__(self, maxsize: int = PERMISSION_INTERN_MAXSIZE):
+        self._table: WeakValueDictionary[Tuple[int, str], "Permission"] = WeakValueDictionary()
+        self._maxsize: int = maxsize
+        self._hits: int = 0
+        self._misses: int = 0
+        self._overflows: int = 0
+
+    def get(self, key: Tuple[int, str]) -> Optional["Permission"]:
+        """
+        Look up the interned permission of the key.
+
+        Args:
+            key (Tuple[int, str]): The id and the full name of the permission.
+
+        Returns:
+            Optional[Permission]: The interned permission, None if there is none.
+        """
+        interned = self._table.get(key)
+        if interned is None:
+            self._misses += 1
+        else:
+            self._hits += 1
+        return interned
+
+    def put(self, permission: "Permission") -> None:
+        """
+        Intern a validated permission, unless another one of the same key is already interned or the table is full.
+
+        Args:
+            permission (Permission): The permission to intern.
+        """
+        key = (permission.id, permission.name)
+        if key in self._table:
+            return
+        if len(self._table) >= self._maxsize:
+            self._overflows += 1
+            return
+        self._table[key] = permission
+
+    def stats(self) -> InternStats:
+        return InternStats(self._hits, self._misses, self._overflows, len(self._table), self._maxsize)
+
+    def clear(self) -> None:
+        """
+        Drop the interned permissions and reset the statistics.
+        """
+        self._table.clear()
+        self._hits = self._misses = self._overflows = 0
+
+
 class Permission(AuthBaseModel):
     """
     ReadPermission: int = 1
@@ -24,20 +106,68 @@ class Permission(AuthBaseModel):
     SuperPermission: int = 32
     """
 
+    # the interned instances are referenced weakly
+    __slots__ = ("__weakref__",)
+
     __permission_categories__: Dict[int, str] = {v.value: v.name for v in PermissionCode}
 
-    __cache__: Dict[FrozenSet, "Permission"] = {}
+    __interner__: PermissionInterner = PermissionInterner()
+
+    class Config:
+        # the permissions are immutable, so the models holding them share the instance instead of a copy
+        copy_on_model_validation = "none"
 
     def __new__(cls, **kwargs) -> "Permission":
-        if not kwargs:
-            # TODO never figured out why this is needed, the process of Instantiate this class seems need call this
-            #  method twice, first with kwargs, then with no args
-            # Note the cache is do working as expected, how strange:(
-            return super().__new__(cls)
-        key = frozenset(kwargs.values())
-        if key not in cls.__cache__:
-            cls.__cache__[key] = super().__new__(cls)
-        return cls.__cache__[key]
+        # pydantic makes the copies and the unpickled instances without kwargs, those are never interned
+        key = cls._intern_key(kwargs)
+        if key is not None:
+            interned = cls.__interner__.get(key)
+            if interned is not None:
+                return interned
+        return super().__new__(cls)
+
+    def __init__(self, **data: Any):
+        if "id" in self.__dict__:
+            # an interned instance, which is validated already
+            return
+        super().__init__(**data)
+        self.__interner__.put(self)
+
+    @classmethod
+    def _intern_key(cls, kwargs: Dict[str, Any]) -> Optional[Tuple[int, str]]:
+        """
+        Make the interning key from the kwargs of the constructor, None if they are not plain id and name.
+        """
+        if kwargs.keys() != {"id", "name"}:
+            return None
+        perm_id, name = kwargs["id"], kwargs["name"]
+        if type(perm_id) is not int or type(name) is not str or perm_id not in cls.__permission_categories__:
+            return None
+        return perm_id, cls._full_name(perm_id, name)
+
+    @classmethod
+    def _full_name(cls, perm_id: int, name: str) -> str:
+        """
+        Append the category suffix to the name, unless the name has it already.
+        """
+        suffix = f"{cls.__permission_categories__[perm_id]}"
+        return f"{name}{suffix}" if suffix not in name else name
+
+    @classmethod
+    def from_trusted(cls, data: Dict[str, Any]) -> "Permission":
+        interned = cls.__interner__.get((data["id"], data["name"]))
+        if interned is not None:
+            return interned
+        permission = cls.construct(id=data["id"], name=data["name"])
+        cls.__interner__.put(permission)
+        return permission
+
+    @classmethod
+    def intern_stats(cls) -> InternStats:
+        """
+        Returns: the statistics of the permission interning table.
+        """
+        return cls.__interner__.stats()
 
     @root_validator()
     def validate_all(cls, params: Dict[str, Any]) -> Dict[str, Any]:
@@ -60,9 +190,7 @@ class Permission(AuthBaseModel):
                 f"{params['id']} is not a valid permission category,"
                 f" must be one of {list[cls.__permission_categories__.keys()]}"
             )
-        suffix = f'{cls.__permission_categories__[params["id"]]}'
-        true_name: str = f"{params['name']}{suffix}" if suffix not in params["name"] else params["name"]
-        params["name"] = true_name
+        params["name"] = cls._full_name(params["id"], params["name"])
         return params
 
 
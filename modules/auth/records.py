@@ -0,0 +1,278 @@
+"""
+records that are used as the compact runtime representation of the roles and the users on the hot paths
+"""
+from types import MappingProxyType
+from typing import FrozenSet, Tuple, Any, Dict, Mapping, Optional, NamedTuple, Iterable, List
+
+from .permissions import Permission
+from .roles import Role, inherited_permissions
+from .users import User
+from .utils import UniqueLabel, extract_label
+
+# the most user id combinations whose effective permissions are cached at once by each tables version
+EFFECTIVE_CACHE_SIZE: int = 4096
+
+
+class _FrozenRecord(object):
+    """
+    A frozen record with __slots__, equal and hashed by (id, name) like the auth models.
+    """
+
+    __slots__ = ()
+
+    id: int
+    name: str
+
+    def __setattr__(self, key: str, value: Any):
+        raise AttributeError(f"{self.__class__.__name__} is frozen")
+
+    def __delattr__(self, key: str):
+        raise AttributeError(f"{self.__class__.__name__} is frozen")
+
+    def __hash__(self) -> int:
+        return hash((self.id, self.name))
+
+    def __eq__(self, other: Any) -> bool:
+        return self.id == getattr(other, "id", None) and self.name == getattr(other, "name", None)
+
+    def __ne__(self, other: Any) -> bool:
+        return not self.__eq__(other)
+
+    def __reduce__(self):
+        return self.__class__, tuple(getattr(self, slot) for slot in self.__slots__)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(id={self.id}, name={self.name!r})"
+
+
+class RoleRecord(_FrozenRecord):
+    """
+    The runtime record of a role, its permissions are a frozenset so the membership test is O(1).
+
+    Notes:
+        the permissions include the ones inherited from the parents of the role
+    """
+
+    __slots__ = ("id", "name", "permissions")
+
+    def __init__(self, id: int, name: str, permissions: FrozenSet[Permission]):
+        object.__setattr__(self, "id", id)
+        object.__setattr__(self, "name", name)
+        object.__setattr__(self, "permissions", permissions)
+
+    def __contains__(self, item: Permission) -> bool:
+        return item in self.permissions
+
+    @classmethod
+    def from_model(
+        cls, role: Role, closure: Optional[Mapping[UniqueLabel, FrozenSet[Permission]]] = None
+    ) -> "RoleRecord":
+        """
+        Make the record of the role.
+
+        Args:
+            role (Role): The role model.
+            closure (Optional[Mapping[UniqueLabel, FrozenSet[Permission]]], optional): The resolved closure of
+                the roles, see resolve_role_closure, the parents are not inherited if None. Defaults to None.
+
+        Returns:
+            RoleRecord: The record of the role.
+        """
+        return cls(role.id, role.name, inherited_permissions(role, closure))
+
+    def to_model(self) -> Role:
+        """
+        Returns: the role model with the inherited permissions flattened into it.
+        """
+        return Role(id=self.id, name=self.name, permissions=list(self.permissions))
+
+
+class UserRecord(_FrozenRecord):
+    """
+    The runtime record of a user, with the union of the permissions of its roles.
+    """
+
+    __slots__ = ("id", "name", "roles", "permissions", "_role_keys")
+
+    def __init__(
+        self,
+        id: int,
+        name: str,
+        roles: Tuple[RoleRecord, ...],
+        permissions: FrozenSet[Permission] | None = None,
+        role_keys: FrozenSet[Tuple[int, str]] | None = None,
+    ):
+        object.__setattr__(self, "id", id)
+        object.__setattr__(self, "name", name)
+        object.__setattr__(self, "roles", roles)
+        if permissions is None:
+            permissions = frozenset().union(*(role.permissions for role in roles))
+        object.__setattr__(self, "permissions", permissions)
+        if role_keys is None:
+            role_keys = frozenset((role.id, role.name) for role in roles)
+        object.__setattr__(self, "_role_keys", role_keys)
+
+    def __contains__(self, item: Role | RoleRecord) -> bool:
+        return (item.id, item.name) in self._role_keys
+
+    def __reduce__(self):
+        return self.__class__, (self.id, self.name, self.roles)
+
+    @classmethod
+    def from_model(
+        cls,
+        user: User,
+        memo: Dict[Any, Any] | None = None,
+        closure: Optional[Mapping[UniqueLabel, FrozenSet[Permission]]] = None,
+    ) -> "UserRecord":
+        """
+        Make the record of the user.
+
+        Args:
+            user (User): The user model.
+            memo (Dict[Any, Any] | None, optional): The records and the sets already made for the other users,
+                so a role, or a combination of roles, shared by many users is recorded once,
+                it must only be shared by the calls with the same closure. Defaults to None.
+            closure (Optional[Mapping[UniqueLabel, FrozenSet[Permission]]], optional): The resolved closure of
+                the roles, see RoleRecord.from_model. Defaults to None.
+
+        Returns:
+            UserRecord: The record of the user.
+        """
+        memo = {} if memo is None else memo
+        # the users hold copies of the roles, so the roles are told by their content
+        keys = tuple((role.id, role.name, tuple(role.permissions), tuple(role.parents)) for role in user.roles)
+        for key, role in zip(keys, user.roles):
+            if key not in memo:
+                memo[key] = RoleRecord.from_model(role, closure)
+        roles = tuple(memo[key] for key in keys)
+        combination = ("combination", keys)
+        if combination not in memo:
+            memo[combination] = (
+                frozenset().union(*(role.permissions for role in roles)),
+                frozenset((role.id, role.name) for role in roles),
+            )
+        permissions, role_keys = memo[combination]
+        return cls(user.id, user.name, roles, permissions, role_keys)
+
+    def to_model(self) -> User:
+        return User(id=self.id, name=self.name, roles=[role.to_model() for role in self.roles])
+
+
+class EffectivePermissions(NamedTuple):
+    """
+    The permissions resolved for some user ids, valid until the users or the roles change.
+
+    Attributes:
+        version (int): The version of the auth objects the permissions are resolved at.
+        role_permissions (Tuple[FrozenSet[Permission], ...]): The permissions of every role of the users,
+            in the order of the user ids then of the roles.
+        permissions (FrozenSet[Permission]): All the permissions of the users.
+    """
+
+    version: int
+    role_permissions: Tuple[FrozenSet[Permission], ...]
+    permissions: FrozenSet[Permission]
+
+
+class AuthTables(object):
+    """
+    An immutable version of the compiled auth tables, the users and the roles as of one version.
+
+    Notes:
+        the tables are never changed once compiled, a change of the auth objects compiles new tables
+        that are published by swapping the reference, so a reader keeps the tables it took for as long as it needs,
+        without any lock, and never sees a half-applied change.
+        only the cache of the effective permissions is filled on reading, with values derived from the tables alone
+    """
+
+    __slots__ = ("version", "closure", "_user_records", "_effective")
+
+    def __init__(
+        self,
+        version: int,
+        closure: Mapping[UniqueLabel, FrozenSet[Permission]],
+        user_records: Mapping[int, Tuple[UserRecord, ...]],
+    ):
+        # the mappings are owned by the tables from now on, only read-only proxies of them are handed out
+        self.version: int = version
+        self.closure: Mapping[UniqueLabel, FrozenSet[Permission]] = MappingProxyType(closure)
+        self._user_records: Mapping[int, Tuple[UserRecord, ...]] = MappingProxyType(user_records)
+        self._effective: Dict[Tuple[int, ...], EffectivePermissions] = {}
+
+    @classmethod
+    def compile(
+        cls, version: int, users: Iterable[User], closure: Mapping[UniqueLabel, FrozenSet[Permission]]
+    ) -> "AuthTables":
+        """
+        Compile the tables from the user models.
+
+        Args:
+            version (int): The version of the users and the roles.
+            users (Iterable[User]): All the user models.
+            closure (Mapping[UniqueLabel, FrozenSet[Permission]]): The resolved closure of the roles.
+
+        Returns:
+            AuthTables: The compiled tables.
+        """
+        memo: Dict[Any, Any] = {}
+        user_records: Dict[int, List[UserRecord]] = {}
+        for user in users:
+            user_records.setdefault(user.id, []).append(UserRecord.from_model(user, memo, closure))
+        return cls(version, dict(closure), {key: tuple(records) for key, records in user_records.items()})
+
+    def evolve(self, version: int, changed: Mapping[UniqueLabel, Optional[User]]) -> "AuthTables":
+        """
+        Make the tables of a later version, which differs from these tables only by the changed users.
+
+        Args:
+            version (int): The version of the users and the roles.
+            changed (Mapping[UniqueLabel, Optional[User]]): The labels of the changed users mapped to their models,
+                None for the removed ones.
+
+        Returns:
+            AuthTables: The new tables, the records of the other users and the closure are shared with these tables.
+        """
+        memo: Dict[Any, Any] = {}
+        user_records = dict(self._user_records)
+        for label, user in changed.items():
+            user_id, user_name = extract_label(label)
+            records = [record for record in user_records.get(user_id, ()) if record.name != user_name]
+            if user is not None:
+                records.append(UserRecord.from_model(user, memo, self.closure))
+            if records:
+                user_records[user_id] = tuple(records)
+            else:
+                user_records.pop(user_id, None)
+        return AuthTables(version, self.closure, user_records)
+
+    def user_records(self, user_id: int) -> Tuple[UserRecord, ...]:
+        """
+        Returns: the records of the users of the id, empty if there is none.
+        """
+        return self._user_records.get(user_id, ())
+
+    def resolve(self, *user_ids: int) -> EffectivePermissions:
+        """
+        Resolve the effective permissions of all the users of the ids, cached with the tables.
+
+        Args:
+            *user_ids (int): The ids of the users, a group id takes the pseudo-user of the group.
+
+        Returns:
+            EffectivePermissions: The permissions of the users, empty if there is no user of the ids.
+        """
+        cached = self._effective.get(user_ids)
+        if cached is not None:
+            return cached
+        records = [record for user_id in user_ids for record in self.user_records(user_id)]
+        cached = EffectivePermissions(
+            self.version,
+            tuple(role.permissions for record in records for role in record.roles),
+            frozenset().union(*(record.permissions for record in records)),
+        )
+        if len(self._effective) >= EFFECTIVE_CACHE_SIZE:
+            # drop the oldest, another reader may have dropped it already
+            self._effective.pop(next(iter(self._effective), None), None)
+        self._effective[user_ids] = cached
+        return cached
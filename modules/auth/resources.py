@@ -5,6 +5,7 @@ from typing import Any, List, Callable, Unpack, Iterable, Optional, Type, Dict
 
 from .permissions import Permission, auth_check, PermissionCode
 from .utils import AuthBaseModel, ManagerBase
+from .views import read_only
 
 
 class RequiredPermission(BaseModel):
@@ -18,6 +19,15 @@ class RequiredPermission(BaseModel):
     delete: List[Permission] = Field(default_factory=list, unique_items=True)
     super: List[Permission] = Field(default_factory=list, unique_items=True)
 
+    @classmethod
+    def from_trusted(cls, data: Dict[str, Any]) -> "RequiredPermission":
+        return cls.construct(
+            **{
+                category: [Permission.from_trusted(permission) for permission in perms]
+                for category, perms in data.items()
+            }
+        )
+
     def add_permission(self, permission: Permission, category_name: str) -> None:
         perm_list: List[Permission] = getattr(self, category_name)
         perm_list.append(permission)
@@ -95,26 +105,37 @@ class Resource(AuthBaseModel):
             self._source = self.source
         delattr(self, "source")
 
-    def get_read(self, permissions: Iterable[Permission]) -> Any:
+    @classmethod
+    def from_trusted(cls, data: Dict[str, Any]) -> "Resource":
+        return cls.construct(
+            id=data["id"],
+            name=data["name"],
+            required_permissions=RequiredPermission.from_trusted(data.get("required_permissions", {})),
+        )
+
+    def get_read(self, permissions: Iterable[Permission], deep_copy: bool = False) -> Any:
         """
         Get the read permission for the object.
 
         Parameters:
             permissions (Iterable[Permission]): The permissions to check.
+            deep_copy (bool, optional): Whether to return a mutable deep copy of the source instead of
+                a read-only view of it. Defaults to False.
 
         Returns:
-            Any: The read permission if it is allowed.
+            Any: The read-only view of the source if the read is allowed, see read_only.
 
         Raises:
             PermissionError: If the read operation is not allowed.
         Note:
-            if the source is callable, it will never be returned
+            if the source is callable, it will never be returned.
+            the view costs O(1) however large the source is, and it follows the later modifications of the source
         """
         if callable(self._source):
             raise PermissionError("Illegal Read operation, executable resource cannot be accessed in read")
 
         if auth_check(self.required_permissions.read, permissions, optional_super=self.required_permissions.super):
-            return copy.deepcopy(self._source)
+            return copy.deepcopy(self._source) if deep_copy else read_only(self._source)
         raise PermissionError("Illegal Read operation, insufficient permissions")
 
     def get_modify(self, permissions: Iterable[Permission], operation: Callable, **modify_params: Unpack) -> None:
@@ -1,12 +1,22 @@
+import warnings
+
 from pydantic import Field, validator, PrivateAttr
-from typing import Tuple, Type, List
+from typing import Tuple, Type, List, Dict, Any, Mapping, FrozenSet, Optional
 
 from .permissions import Permission
-from .utils import AuthBaseModel, manager_factory, ManagerBase
+from .utils import AuthBaseModel, manager_factory, ManagerBase, UniqueLabel, extract_label
+
+
+class RoleCycleError(ValueError):
+    """
+    Raised when the parents of the roles would form a cycle.
+    """
 
 
 class Role(AuthBaseModel):
     permissions: List[Permission] = Field(default_factory=list, unique_items=True, allow_mutation=False)
+    # the labels of the roles whose permissions this role inherits
+    parents: List[UniqueLabel] = Field(default_factory=list, unique_items=True, allow_mutation=False)
     __role_activated__: bool = PrivateAttr(default=False)
 
     class Config:
@@ -32,6 +42,26 @@ class Role(AuthBaseModel):
             return permission
         raise ValueError(f"Permission {permission} is not an instance of Permission")
 
+    @validator("parents", each_item=True)
+    def validate_parents(cls, parent: UniqueLabel) -> UniqueLabel:
+        """
+        Validates the parent labels.
+
+        Raises:
+            ValueError: If the parent is not a valid label.
+        """
+        extract_label(parent)
+        return parent
+
+    @classmethod
+    def from_trusted(cls, data: Dict[str, Any]) -> "Role":
+        return cls.construct(
+            id=data["id"],
+            name=data["name"],
+            permissions=[Permission.from_trusted(permission) for permission in data.get("permissions", [])],
+            parents=list(data.get("parents", [])),
+        )
+
     def add_permission(self, permission: Permission):
         """
         Adds a permission to the role.
@@ -82,3 +112,101 @@ class Role(AuthBaseModel):
 
 
 RoleManager: Type[ManagerBase] = manager_factory(Role)
+
+
+def find_role_path(roles: Mapping[UniqueLabel, Role], start: UniqueLabel, target: UniqueLabel) -> List[UniqueLabel]:
+    """
+    Find a path from the start role up to the target role through the parents.
+
+    Args:
+        roles (Mapping[UniqueLabel, Role]): The roles keyed by their labels.
+        start (UniqueLabel): The label of the role to start from.
+        target (UniqueLabel): The label of the role to reach.
+
+    Returns:
+        List[UniqueLabel]: The labels on the path from start to target, empty if the target is not reachable.
+    """
+    stack: List[Tuple[UniqueLabel, List[UniqueLabel]]] = [(start, [start])]
+    seen = set()
+    while stack:
+        label, path = stack.pop()
+        if label == target:
+            return path
+        if label in seen or label not in roles:
+            continue
+        seen.add(label)
+        stack.extend((parent, path + [parent]) for parent in roles[label].parents)
+    return []
+
+
+def resolve_role_closure(
+    roles: Mapping[UniqueLabel, Role], strict: bool = False
+) -> Dict[UniqueLabel, FrozenSet[Permission]]:
+    """
+    Resolve the permissions of every role together with the ones inherited from all its ancestors.
+
+    Args:
+        roles (Mapping[UniqueLabel, Role]): The roles keyed by their labels.
+        strict (bool, optional): Whether to raise on a cycle instead of warning about it and skipping the parent
+            that closes it. Defaults to False.
+
+    Returns:
+        Dict[UniqueLabel, FrozenSet[Permission]]: The roles mapped to their full permissions.
+
+    Raises:
+        RoleCycleError: If strict and the parents form a cycle.
+
+    Notes:
+        the parents not among the roles are skipped
+    """
+    closure: Dict[UniqueLabel, FrozenSet[Permission]] = {}
+    for root in roles:
+        if root in closure:
+            continue
+        # iterative depth-first walk, the role is resolved once all its parents are
+        visiting: List[UniqueLabel] = [root]
+        on_path = {root}
+        cursors: List[int] = [0]
+        while visiting:
+            label = visiting[-1]
+            parents = roles[label].parents
+            if cursors[-1] < len(parents):
+                parent = parents[cursors[-1]]
+                cursors[-1] += 1
+                if parent not in roles or parent in closure:
+                    continue
+                if parent in on_path:
+                    cycle = visiting[visiting.index(parent) :] + [parent]
+                    if strict:
+                        raise RoleCycleError(f"Roles form a cycle: {' -> '.join(cycle)}")
+                    warnings.warn(f"Roles form a cycle: {' -> '.join(cycle)}, skipping {parent}", stacklevel=2)
+                    continue
+                visiting.append(parent)
+                on_path.add(parent)
+                cursors.append(0)
+                continue
+            closure[label] = frozenset(roles[label].permissions).union(
+                *(closure.get(parent, frozenset()) for parent in parents)
+            )
+            visiting.pop()
+            cursors.pop()
+            on_path.discard(label)
+    return closure
+
+
+def inherited_permissions(
+    role: Role, closure: Optional[Mapping[UniqueLabel, FrozenSet[Permission]]]
+) -> FrozenSet[Permission]:
+    """
+    Get the permissions of the role together with the inherited ones.
+
+    Args:
+        role (Role): The role, maybe a copy held by a user.
+        closure (Optional[Mapping[UniqueLabel, FrozenSet[Permission]]]): The resolved closure of the roles.
+
+    Returns:
+        FrozenSet[Permission]: The full permissions of the role.
+    """
+    if not closure or not role.parents:
+        return frozenset(role.permissions)
+    return frozenset(role.permissions).union(*(closure.get(parent, frozenset()) for parent in role.parents))
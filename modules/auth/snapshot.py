@@ -0,0 +1,83 @@
+"""
+snapshot that is used to warm start the auth manager without parsing and validating its config again
+"""
+import hashlib
+import os
+import pathlib
+import pickle
+import platform
+from typing import Dict, Any, Optional
+
+import pydantic
+
+from modules.file_manager import fingerprint_sources
+
+SNAPSHOT_FORMAT: int = 1
+
+
+def snapshot_key(config_file_path: str | pathlib.Path) -> str:
+    """
+    Key the snapshot by the content of the auth config and the versions of the code that defines the pickled models.
+
+    Args:
+        config_file_path (str | pathlib.Path): The path of the auth config file.
+
+    Returns:
+        str: The hex digest of the key.
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{SNAPSHOT_FORMAT}:{platform.python_version()}:{pydantic.VERSION};".encode())
+    digest.update(f"{fingerprint_sources(pathlib.Path(__file__).parent)};".encode())
+    digest.update(pathlib.Path(config_file_path).read_bytes())
+    return digest.hexdigest()
+
+
+def load_snapshot(snapshot_path: str | pathlib.Path, key: str) -> Optional[Dict[str, Dict[str, Any]]]:
+    """
+    Load the snapshot, None if it is missing, broken or stale.
+
+    Args:
+        snapshot_path (str | pathlib.Path): The path of the snapshot file.
+        key (str): The key the snapshot must match.
+
+    Returns:
+        Optional[Dict[str, Dict[str, Any]]]: The object dicts of the managers, keyed by the manager root key.
+
+    Notes:
+        the snapshot is unpickled, so it must be written by the bot itself, never load one from elsewhere
+    """
+    path = pathlib.Path(snapshot_path)
+    if not path.exists():
+        return None
+    try:
+        with open(path, "rb") as f:
+            stored_key, payload = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError, TypeError, ValueError):
+        # a broken snapshot is simply rebuilt
+        return None
+    return payload if stored_key == key else None
+
+
+def dump_snapshot(snapshot_path: str | pathlib.Path, key: str, payload: Dict[str, Dict[str, Any]]) -> bool:
+    """
+    Write the snapshot atomically, the previous one is kept if the payload can not be pickled.
+
+    Args:
+        snapshot_path (str | pathlib.Path): The path of the snapshot file.
+        key (str): The key of the snapshot.
+        payload (Dict[str, Dict[str, Any]]): The object dicts of the managers, keyed by the manager root key.
+
+    Returns:
+        bool: True if the snapshot is written, False otherwise.
+    """
+    path = pathlib.Path(snapshot_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        data = pickle.dumps((key, payload), protocol=pickle.HIGHEST_PROTOCOL)
+    except (pickle.PicklingError, AttributeError, TypeError):
+        return False
+    temp_path = path.with_name(f"{path.name}.tmp")
+    with open(temp_path, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, path)
+    return True
@@ -0,0 +1,369 @@
+"""
+storage that is used to keep the auth objects in a json config file or in a sqlite database
+"""
+import json
+import pathlib
+import sqlite3
+from abc import abstractmethod
+from typing import Dict, List, Any, Optional, Set, NamedTuple, Mapping, Tuple, Iterable
+
+from .utils import write_sections, extract_label, make_label
+
+SQLITE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS permissions (
+    id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    PRIMARY KEY (id, name)
+);
+CREATE TABLE IF NOT EXISTS roles (
+    id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    PRIMARY KEY (id, name)
+);
+CREATE TABLE IF NOT EXISTS role_permissions (
+    role_id INTEGER NOT NULL,
+    role_name TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    perm_id INTEGER NOT NULL,
+    perm_name TEXT NOT NULL,
+    PRIMARY KEY (role_id, role_name, position)
+);
+CREATE INDEX IF NOT EXISTS role_permissions_perm ON role_permissions (perm_id, perm_name);
+CREATE TABLE IF NOT EXISTS role_parents (
+    role_id INTEGER NOT NULL,
+    role_name TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    parent_id INTEGER NOT NULL,
+    parent_name TEXT NOT NULL,
+    PRIMARY KEY (role_id, role_name, position)
+);
+CREATE INDEX IF NOT EXISTS role_parents_parent ON role_parents (parent_id, parent_name);
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    PRIMARY KEY (id, name)
+);
+CREATE TABLE IF NOT EXISTS user_roles (
+    user_id INTEGER NOT NULL,
+    user_name TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    role_id INTEGER NOT NULL,
+    role_name TEXT NOT NULL,
+    permissions TEXT NOT NULL,
+    PRIMARY KEY (user_id, user_name, position)
+);
+CREATE INDEX IF NOT EXISTS user_roles_role ON user_roles (role_id, role_name);
+CREATE TABLE IF NOT EXISTS resources (
+    id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    required_permissions TEXT NOT NULL,
+    PRIMARY KEY (id, name)
+);
+"""
+
+
+class SectionChange(NamedTuple):
+    """
+    The changes of a manager to be saved.
+
+    Attributes:
+        objects (Mapping[str, Any]): All the objects of the manager, keyed by their unique labels.
+        changed (Optional[Set[str]]): The labels of the added, modified or removed objects,
+            None if every object is to be saved.
+    """
+
+    objects: Mapping[str, Any]
+    changed: Optional[Set[str]] = None
+
+
+class AuthStorage(object):
+    """
+    The storage of the auth objects, each manager owns a section keyed by its root key.
+    """
+
+    @abstractmethod
+    def exists(self) -> bool:
+        """
+        Returns: whether there is anything stored to load.
+        """
+        pass
+
+    @abstractmethod
+    def load(self, root_key: str) -> List[Dict[str, Any]]:
+        """
+        Load the object dicts of a section, empty if the section is not stored.
+
+        Args:
+            root_key (str): The root key of the section.
+
+        Returns:
+            List[Dict[str, Any]]: The dicts the objects are built from.
+        """
+        pass
+
+    def load_sections(self, root_keys: Iterable[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Load the object dicts of several sections at once.
+
+        Args:
+            root_keys (Iterable[str]): The root keys of the sections.
+
+        Returns:
+            Dict[str, List[Dict[str, Any]]]: The root keys mapped to the dicts of their sections.
+        """
+        return {root_key: self.load(root_key) for root_key in root_keys}
+
+    @abstractmethod
+    def save(self, changes: Dict[str, SectionChange]) -> None:
+        """
+        Save the changes of several sections at once.
+
+        Args:
+            changes (Dict[str, SectionChange]): The root keys mapped to the changes of their sections.
+
+        Returns:
+            None
+        """
+        pass
+
+
+class JsonStorage(AuthStorage):
+    """
+    The objects are stored in a json file, every save rewrites the changed sections entirely.
+    """
+
+    def __init__(self, config_file_path: str | pathlib.Path):
+        self._path = pathlib.Path(config_file_path)
+
+    def exists(self) -> bool:
+        return self._path.exists()
+
+    def load(self, root_key: str) -> List[Dict[str, Any]]:
+        return self.load_sections([root_key])[root_key]
+
+    def load_sections(self, root_keys: Iterable[str]) -> Dict[str, List[Dict[str, Any]]]:
+        read = {}
+        if self._path.exists():
+            # the file is parsed once for all the sections
+            with open(self._path, "r", encoding="utf-8") as f:
+                read = json.load(f)
+        # root key not found in the JSON file, indicate that the object list is empty
+        return {root_key: read.get(root_key, []) for root_key in root_keys}
+
+    def save(self, changes: Dict[str, SectionChange]) -> None:
+        write_sections(
+            self._path,
+            {root_key: [obj.dict() for obj in change.objects.values()] for root_key, change in changes.items()},
+        )
+
+
+class SqliteStorage(AuthStorage):
+    """
+    The objects are stored in indexed sqlite tables, a save only upserts or deletes the rows of the changed objects.
+
+    Notes:
+        the roles granted to a user are stored with the permissions they carried when granted,
+        just like the json config does, but their parents are always the ones of the stored role
+    """
+
+    def __init__(self, db_path: str | pathlib.Path, migrate_from: Optional[str | pathlib.Path] = None):
+        """
+        Args:
+            db_path (str | pathlib.Path): The path of the database file.
+            migrate_from (Optional[str | pathlib.Path], optional): The json config to migrate from,
+                it is only imported when the database is created. Defaults to None.
+        """
+        self._path = pathlib.Path(db_path)
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        created = not self._path.exists()
+        self._conn = sqlite3.connect(self._path, check_same_thread=False)
+        self._conn.executescript(SQLITE_SCHEMA)
+        if created and migrate_from is not None and pathlib.Path(migrate_from).exists():
+            self.migrate(migrate_from)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def exists(self) -> bool:
+        return self._path.exists()
+
+    def migrate(self, json_path: str | pathlib.Path) -> None:
+        """
+        Import all the sections of a json config, the rows of the imported objects are replaced.
+
+        Args:
+            json_path (str | pathlib.Path): The path of the json config.
+
+        Returns:
+            None
+        """
+        source = JsonStorage(json_path)
+        with self._conn:
+            for root_key in self._writers:
+                for data in source.load(root_key):
+                    self._writers[root_key](self, data)
+
+    def load(self, root_key: str) -> List[Dict[str, Any]]:
+        return self._loaders[root_key](self)
+
+    def save(self, changes: Dict[str, SectionChange]) -> None:
+        with self._conn:
+            for root_key, change in changes.items():
+                writer = self._writers[root_key]
+                if change.changed is None:
+                    self._deleters[root_key](self, None)
+                    for obj in change.objects.values():
+                        writer(self, obj.dict())
+                    continue
+                for label in change.changed:
+                    self._deleters[root_key](self, extract_label(label))
+                    if label in change.objects:
+                        writer(self, change.objects[label].dict())
+
+    @staticmethod
+    def _where(prefix: str, key: Optional[Tuple[int, str]]) -> Tuple[str, Tuple]:
+        return (f" WHERE {prefix}id = ? AND {prefix}name = ?", key) if key else ("", ())
+
+    def _delete_permission(self, key: Optional[Tuple[int, str]]) -> None:
+        where, params = self._where("", key)
+        self._conn.execute(f"DELETE FROM permissions{where}", params)
+
+    def _delete_role(self, key: Optional[Tuple[int, str]]) -> None:
+        where, params = self._where("", key)
+        self._conn.execute(f"DELETE FROM roles{where}", params)
+        where, params = self._where("role_", key)
+        self._conn.execute(f"DELETE FROM role_permissions{where}", params)
+        self._conn.execute(f"DELETE FROM role_parents{where}", params)
+
+    def _delete_user(self, key: Optional[Tuple[int, str]]) -> None:
+        where, params = self._where("", key)
+        self._conn.execute(f"DELETE FROM users{where}", params)
+        where, params = self._where("user_", key)
+        self._conn.execute(f"DELETE FROM user_roles{where}", params)
+
+    def _delete_resource(self, key: Optional[Tuple[int, str]]) -> None:
+        where, params = self._where("", key)
+        self._conn.execute(f"DELETE FROM resources{where}", params)
+
+    def _write_permission(self, data: Dict[str, Any]) -> None:
+        self._conn.execute("INSERT OR REPLACE INTO permissions VALUES (?, ?)", (data["id"], data["name"]))
+
+    def _write_role(self, data: Dict[str, Any]) -> None:
+        self._conn.execute("INSERT OR REPLACE INTO roles VALUES (?, ?)", (data["id"], data["name"]))
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO role_permissions VALUES (?, ?, ?, ?, ?)",
+            [
+                (data["id"], data["name"], position, perm["id"], perm["name"])
+                for position, perm in enumerate(data.get("permissions", []))
+            ],
+        )
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO role_parents VALUES (?, ?, ?, ?, ?)",
+            [
+                (data["id"], data["name"], position, *extract_label(parent))
+                for position, parent in enumerate(data.get("parents", []))
+            ],
+        )
+
+    def _write_user(self, data: Dict[str, Any]) -> None:
+        self._conn.execute("INSERT OR REPLACE INTO users VALUES (?, ?)", (data["id"], data["name"]))
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO user_roles VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (data["id"], data["name"], position, role["id"], role["name"], json.dumps(role.get("permissions", [])))
+                for position, role in enumerate(data.get("roles", []))
+            ],
+        )
+
+    def _write_resource(self, data: Dict[str, Any]) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO resources VALUES (?, ?, ?)",
+            (data["id"], data["name"], json.dumps(data.get("required_permissions", {}))),
+        )
+
+    def _load_permissions(self) -> List[Dict[str, Any]]:
+        return [{"id": id_, "name": name} for id_, name in self._conn.execute("SELECT id, name FROM permissions")]
+
+    def _load_roles(self) -> List[Dict[str, Any]]:
+        roles = {
+            key: {"id": key[0], "name": key[1], "permissions": []} for key in self._conn.execute("SELECT * FROM roles")
+        }
+        for role_id, role_name, perm_id, perm_name in self._conn.execute(
+            "SELECT role_id, role_name, perm_id, perm_name FROM role_permissions ORDER BY role_id, role_name, position"
+        ):
+            roles[(role_id, role_name)]["permissions"].append({"id": perm_id, "name": perm_name})
+        parents = self._load_role_parents()
+        for key, role in roles.items():
+            role["parents"] = parents.get(key, [])
+        return list(roles.values())
+
+    def _load_role_parents(self) -> Dict[Tuple[int, str], List[str]]:
+        parents: Dict[Tuple[int, str], List[str]] = {}
+        for role_id, role_name, parent_id, parent_name in self._conn.execute(
+            "SELECT role_id, role_name, parent_id, parent_name FROM role_parents ORDER BY role_id, role_name, position"
+        ):
+            parents.setdefault((role_id, role_name), []).append(make_label(parent_id, parent_name))
+        return parents
+
+    def _load_users(self) -> List[Dict[str, Any]]:
+        users = {key: {"id": key[0], "name": key[1], "roles": []} for key in self._conn.execute("SELECT * FROM users")}
+        parents = self._load_role_parents()
+        for user_id, user_name, role_id, role_name, permissions in self._conn.execute(
+            "SELECT user_id, user_name, role_id, role_name, permissions FROM user_roles "
+            "ORDER BY user_id, user_name, position"
+        ):
+            users[(user_id, user_name)]["roles"].append(
+                {
+                    "id": role_id,
+                    "name": role_name,
+                    "permissions": json.loads(permissions),
+                    "parents": parents.get((role_id, role_name), []),
+                }
+            )
+        return list(users.values())
+
+    def _load_resources(self) -> List[Dict[str, Any]]:
+        return [
+            {"id": id_, "name": name, "required_permissions": json.loads(required)}
+            for id_, name, required in self._conn.execute("SELECT id, name, required_permissions FROM resources")
+        ]
+
+    _writers = {
+        "Permissions": _write_permission,
+        "Roles": _write_role,
+        "Users": _write_user,
+        "Resources": _write_resource,
+    }
+    _deleters = {
+        "Permissions": _delete_permission,
+        "Roles": _delete_role,
+        "Users": _delete_user,
+        "Resources": _delete_resource,
+    }
+    _loaders = {
+        "Permissions": _load_permissions,
+        "Roles": _load_roles,
+        "Users": _load_users,
+        "Resources": _load_resources,
+    }
+
+
+def make_storage(config_file_path: str | pathlib.Path) -> AuthStorage:
+    """
+    Make the storage by the suffix of the config path, a database suffix selects the sqlite storage.
+
+    Args:
+        config_file_path (str | pathlib.Path): The path of the auth config.
+
+    Returns:
+        AuthStorage: The storage of the auth objects.
+
+    Notes:
+        a new database imports the json config of the same name once, if there is one
+    """
+    path = pathlib.Path(config_file_path)
+    if path.suffix.lower() in SQLITE_SUFFIXES:
+        return SqliteStorage(path, migrate_from=path.with_suffix(".json"))
+    return JsonStorage(path)
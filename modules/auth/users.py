@@ -1,5 +1,5 @@
 from pydantic import validator, Field
-from typing import Type, Iterable, List
+from typing import Type, Iterable, List, Dict, Any
 
 from .roles import Role
 from .utils import AuthBaseModel, manager_factory, ManagerBase
@@ -30,6 +30,12 @@ class User(AuthBaseModel):
 
         return list(set(roles))
 
+    @classmethod
+    def from_trusted(cls, data: Dict[str, Any]) -> "User":
+        return cls.construct(
+            id=data["id"], name=data["name"], roles=[Role.from_trusted(role) for role in data.get("roles", [])]
+        )
+
     def add_role(self, role: Role):
         """
         Adds a role to the user.
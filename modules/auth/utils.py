@@ -1,9 +1,10 @@
 import json
+import os
 import pathlib
 import re
 import warnings
 from abc import abstractmethod
-from typing import TypeVar, Type, Dict, List, final, Any, TypeAlias, Tuple
+from typing import TypeVar, Type, Dict, List, final, Any, TypeAlias, Tuple, Optional, Set
 
 from pydantic import BaseModel, validator, Field, PrivateAttr, NonNegativeInt
 
@@ -44,6 +45,32 @@ def extract_label(label: str) -> Tuple[int, str]:
     raise ValueError(f"Invalid label: {label}")
 
 
+def write_sections(config_file_path: str | pathlib.Path, sections: Dict[str, Any]) -> None:
+    """
+    Write the sections into the json config file in a single pass, the other sections in the file are kept.
+
+    Args:
+        config_file_path (str | pathlib.Path): The path of the config file.
+        sections (Dict[str, Any]): The root keys mapped to their new content.
+
+    Returns:
+        None
+
+    Notes:
+        the file is written to a temp file then renamed, so a crash never leaves a half written config
+    """
+    path = pathlib.Path(config_file_path)
+    temp = {}
+    if path.exists():
+        with open(path, "r", encoding="utf-8") as f:
+            temp = json.load(f)
+    temp.update(sections)
+    temp_path = path.with_name(f"{path.name}.tmp")
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(temp, f, indent=2, ensure_ascii=False)
+    os.replace(temp_path, path)
+
+
 UniqueLabel: TypeAlias = str
 
 
@@ -56,6 +83,22 @@ class AuthBaseModel(BaseModel):
     def unique_label(self) -> UniqueLabel:
         return make_label(self.id, self.name)
 
+    @classmethod
+    def from_trusted(cls, data: Dict[str, Any]) -> "AuthBaseModel":
+        """
+        Build the object from the dict the object itself dumped, skipping the validation.
+
+        Args:
+            data (Dict[str, Any]): The dict made by .dict() of an object of this class.
+
+        Returns:
+            AuthBaseModel: The built object.
+
+        Notes:
+            only use it for the data written by the bot, the broken data is taken as it is
+        """
+        return cls.construct(**data)
+
     @final
     def __hash__(self):
         return hash((self.id, self.name))
@@ -79,19 +122,77 @@ class ManagerBase(AuthBaseModel):
     object_dict: Dict[str, Any]
     load_on_init: bool = True
     _root_key: str = PrivateAttr("root")
+    _storage: Any = PrivateAttr(None)
+    _changed: Optional[Set[str]] = PrivateAttr(default_factory=set)
+    _version: int = PrivateAttr(0)
 
-    def __init__(self, **kwargs):
+    def __init__(self, storage: Any = None, **kwargs):
+        """
+        Args:
+            storage (Any, optional): The AuthStorage shared with the other managers,
+                made from the config_file_path if None. Defaults to None.
+        """
         super().__init__(**kwargs)
         if self.ele_type is None:
             raise ValueError("ele_type cannot be None")
         # use setattr here is to silent the warning, use '=' to set it is fine, too
         setattr(self, "_root_key", f"{self.ele_type.__name__}s")
-        self.load_object_list() if pathlib.Path(self.config_file_path).exists() and self.load_on_init else None
+        if storage is None:
+            from .storage import make_storage
+
+            storage = make_storage(self.config_file_path)
+        setattr(self, "_storage", storage)
+        self.load_object_list() if self.storage.exists() and self.load_on_init else None
 
     @property
     def root_key(self) -> str:
         return self._root_key
 
+    @property
+    def storage(self) -> Any:
+        return self._storage
+
+    @property
+    def dirty(self) -> bool:
+        """
+        Returns: whether the objects changed since the last load or save.
+        """
+        return self._changed is None or bool(self._changed)
+
+    @property
+    def version(self) -> int:
+        """
+        Returns: the counter of the changes made to the objects, it only grows, for invalidating the derived caches.
+        """
+        return self._version
+
+    @property
+    def changed_labels(self) -> Optional[Set[str]]:
+        """
+        Returns: the labels of the objects changed since the last load or save, None if all of them are to be saved.
+        """
+        return None if self._changed is None else set(self._changed)
+
+    def mark_dirty(self, label: Optional[UniqueLabel] = None) -> None:
+        """
+        Mark an object as changed, for the changes made to the objects themselves rather than to the object list.
+
+        Args:
+            label (Optional[UniqueLabel], optional): The label of the changed object,
+                all the objects are marked if None. Defaults to None.
+        """
+        self._version += 1
+        if label is None:
+            self._changed = None
+        elif self._changed is not None:
+            self._changed.add(label)
+
+    def mark_saved(self) -> None:
+        """
+        Mark all the objects as saved.
+        """
+        self._changed = set()
+
     @validator("config_file_path")
     def validate_user_config_file_path(cls, path: pathlib.Path | str) -> str:
         """
@@ -109,7 +210,7 @@ class ManagerBase(AuthBaseModel):
         return str(path.absolute())
 
     @final
-    def add_object(self, new_object: AuthBaseModel, info: bool = False) -> bool:
+    def add_object(self, new_object: AuthBaseModel, info: bool = False, mark: bool = True) -> bool:
         """
         Adds a new object to the object dictionary.
 
@@ -117,6 +218,8 @@ class ManagerBase(AuthBaseModel):
             new_object (AuthBaseModel): The new object to be added.
             info (bool, optional): Whether or not to display a warning if the object already exists.
                 Defaults to False.
+            mark (bool, optional): Whether to mark the object as changed, False for the objects already stored.
+                Defaults to True.
 
         Returns:
             bool: True if the object was successfully added, False otherwise.
@@ -130,6 +233,8 @@ class ManagerBase(AuthBaseModel):
                 )
             return False
         self.object_dict[new_object.unique_label] = new_object
+        self.mark_dirty(new_object.unique_label) if mark else None
+        self._version += 1
         return True
 
     @final
@@ -155,6 +260,7 @@ class ManagerBase(AuthBaseModel):
         if label not in self.object_dict:
             raise KeyError(f"[{label}] is not in the object list")
         del self.object_dict[label]
+        self.mark_dirty(label)
 
     @abstractmethod
     def _make_json_dict(self) -> Dict:
@@ -169,14 +275,10 @@ class ManagerBase(AuthBaseModel):
     @final
     def save_object_list(self):
         """
-        Save the object list to a JSON file.
+        Save the object list to the storage.
 
-        This function reads the existing JSON file, if it exists, and loads its contents into a temporary
-        dictionary.
-        It then updates the dictionary with the contents of the object list by calling the
-        _make_json_dict() method.
-        Finally, it writes the updated dictionary to the JSON file, overwriting its
-        previous contents.
+        The json storage rewrites the whole section of the manager and keeps the other sections,
+        the sqlite storage only writes the rows of the objects changed since the last load or save.
 
         Parameters:
 
@@ -184,13 +286,10 @@ class ManagerBase(AuthBaseModel):
         Returns:
             None
         """
-        temp = {}
-        if pathlib.Path(self.config_file_path).exists():
-            with open(self.config_file_path, "r", encoding="utf-8") as f:
-                temp = json.load(f)
-        temp.update(self._make_json_dict())
-        with open(self.config_file_path, "w+", encoding="utf-8") as f:
-            json.dump(temp, f, indent=2, ensure_ascii=False)
+        from .storage import SectionChange
+
+        self.storage.save({self._root_key: SectionChange(self.object_dict, self.changed_labels)})
+        self.mark_saved()
 
     @abstractmethod
     def _make_object_instance(self, **kwargs) -> AuthBaseModel:
@@ -206,30 +305,42 @@ class ManagerBase(AuthBaseModel):
         pass
 
     @final
-    def load_object_list(self):
+    def load_object_list(self, trusted: bool = False):
         """
-        Load the object list from the config file.
+        Load the object list from the storage.
 
-        This function opens the config file specified by `config_file_path` in read mode,
-        and loads the object list from it. The object list is stored under the `_root_key` key
-        in the JSON file.
+        This function loads the object list stored under the `_root_key` section of the storage,
+        which is the `_root_key` key of the JSON file or the tables of the sqlite database.
 
         Parameters:
             self (ClassName): The instance of the class.
+            trusted (bool, optional): Whether to build the objects without validating them. Defaults to False.
 
         Returns:
             None
         """
-        with open(self.config_file_path, "r", encoding="utf-8") as f:
-            read = json.load(f)
-        if self._root_key not in read:
-            # root key not found in the JSON file,indicate that the object list is empty
-            return
-        temp: List[Dict] = read[self._root_key]
-
-        temp_object_list = [self._make_object_instance(**data) for data in temp]
+        self.load_objects(self.storage.load(self._root_key), trusted)
+
+    @final
+    def load_objects(self, section: List[Dict], trusted: bool = False):
+        """
+        Build the objects from the dicts of the section already read from the storage and add them.
+
+        Parameters:
+            section (List[Dict]): The dicts of the objects.
+            trusted (bool, optional): Whether to build the objects without validating them, see
+                AuthBaseModel.from_trusted. Defaults to False.
+
+        Returns:
+            None
+        """
+        if trusted:
+            temp_object_list = [self.ele_type.from_trusted(data) for data in section]
+        else:
+            temp_object_list = [self._make_object_instance(**data) for data in section]
         for temp_object in temp_object_list:
-            self.add_object(temp_object)
+            # the loaded objects are what the storage already holds
+            self.add_object(temp_object, mark=False)
 
 
 T_AUTH_BASE_MODEL = TypeVar("T_AUTH_BASE_MODEL", bound=AuthBaseModel)
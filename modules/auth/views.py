@@ -0,0 +1,136 @@
+"""
+views that are used to hand out the sources of the resources for reading without copying them
+"""
+import copy
+from collections.abc import Mapping, Sequence, Set
+from enum import Enum
+from typing import Any, Iterator
+
+# the values of these types can not be changed, so they are handed out as they are
+IMMUTABLE_TYPES = (str, bytes, int, float, complex, bool, type(None), frozenset, range, Enum)
+
+
+def read_only(value: Any) -> Any:
+    """
+    Wrap the value in a read-only view, in O(1) time whatever its size.
+
+    Args:
+        value (Any): The value to be read.
+
+    Returns:
+        Any: The immutable value itself, a read-only view of a mapping, sequence or set,
+            or a deep copy of any other object.
+
+    Notes:
+        the views are live, the changes made to the source later show through them,
+        the nested containers are wrapped on access, so nothing reachable from a view could be changed
+    """
+    if isinstance(value, IMMUTABLE_TYPES) or isinstance(value, (FrozenMapping, FrozenSequence, FrozenSetView)):
+        return value
+    if isinstance(value, Mapping):
+        return FrozenMapping(value)
+    if isinstance(value, Sequence) and not isinstance(value, bytearray):
+        return FrozenSequence(value)
+    if isinstance(value, Set):
+        return FrozenSetView(value)
+    # an arbitrary object could be changed through any of its methods, so it is still copied
+    return copy.deepcopy(value)
+
+
+class FrozenMapping(Mapping):
+    """
+    The read-only view of a mapping.
+    """
+
+    __slots__ = ("_data",)
+
+    def __init__(self, data: Mapping):
+        self._data = data
+
+    def __getitem__(self, key: Any) -> Any:
+        return read_only(self._data[key])
+
+    def __iter__(self) -> Iterator:
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._data
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self._data!r})"
+
+    def copy(self) -> Any:
+        """
+        Returns: a mutable deep copy of the viewed mapping, for the reader that needs to change it.
+        """
+        return copy.deepcopy(self._data)
+
+
+class FrozenSequence(Sequence):
+    """
+    The read-only view of a sequence.
+    """
+
+    __slots__ = ("_data",)
+
+    def __init__(self, data: Sequence):
+        self._data = data
+
+    def __getitem__(self, index: int | slice) -> Any:
+        return read_only(self._data[index])
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, FrozenSequence):
+            other = other._data
+        if not isinstance(other, Sequence) or isinstance(other, (str, bytes)):
+            return NotImplemented
+        return len(self._data) == len(other) and all(a == b for a, b in zip(self._data, other))
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self._data!r})"
+
+    def copy(self) -> Any:
+        """
+        Returns: a mutable deep copy of the viewed sequence, for the reader that needs to change it.
+        """
+        return copy.deepcopy(self._data)
+
+
+class FrozenSetView(Set):
+    """
+    The read-only view of a set.
+    """
+
+    __slots__ = ("_data",)
+
+    def __init__(self, data: Set):
+        self._data = data
+
+    @classmethod
+    def _from_iterable(cls, iterable) -> frozenset:
+        # the results of the set operations are new sets, nothing to be viewed
+        return frozenset(iterable)
+
+    def __contains__(self, item: Any) -> bool:
+        return item in self._data
+
+    def __iter__(self) -> Iterator:
+        return (read_only(item) for item in self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self._data!r})"
+
+    def copy(self) -> Any:
+        """
+        Returns: a mutable deep copy of the viewed set, for the reader that needs to change it.
+        """
+        return copy.deepcopy(self._data)
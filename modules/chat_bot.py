@@ -1,21 +1,37 @@
-from typing import List, NamedTuple, Union, Awaitable, Any
+import time
+from collections import deque
+from typing import List, NamedTuple, Union, Awaitable, Any, Optional, Deque, Dict, Tuple, TypeAlias
 
 from graia.ariadne.app import Ariadne
 from graia.ariadne.connection.config import WebsocketClientConfig
 from graia.ariadne.entry import config
+from graia.ariadne.event.lifecycle import ApplicationShutdown
+from graia.ariadne.event.message import GroupMessage
 from graia.ariadne.message.chain import MessageChain
+from graia.ariadne.message.element import Source
 from graia.ariadne.model import Friend, Member, Stranger
 from graia.ariadne.model.util import AriadneOptions
+from graia.broadcast.exceptions import PropagationCancelled
 
 from modules.auth.core import AuthorizationManager, Root
-from modules.auth.roles import Role
-from modules.auth.users import User
+from modules.circuit_breaker import CircuitBreakerRegistry, CircuitOpenError
 from modules.cmd import NameSpaceNode, set_su_permissions
 from modules.extension_manager import ExtensionManager
+from modules.http_client import HttpClient, HttpClientConfig
 from modules.plugin_base import PluginsView
+from modules.startup_profiler import profiler
 
 HELP_KEYWORD = "doc"
 
+# seconds within which the same message received by another account of the bot is taken as a duplicate
+DUPLICATE_WINDOW: float = 5.0
+
+# the priority of the duplicate filter, which runs before every other listener, the lazy loaders included
+DUPLICATE_FILTER_PRIORITY: int = -1
+
+# the group, the sender, the source time and the text of a group message, the same for the copies of every account
+MessageKey: TypeAlias = Tuple[int, int, float, str]
+
 
 class BotInfo(NamedTuple):
     """
@@ -53,11 +69,23 @@ class BotConfig(NamedTuple):
         auth_config_file_path (str): The file path for the authentication configuration.
         accepted_message_types (List[str], optional): The list of accepted message types.
             Defaults to ["GroupMessage"].
+        http_client_config (HttpClientConfig, optional): The configuration for the shared http client.
+            Defaults to HttpClientConfig().
+        auth_warm_start_path (Optional[str], optional): The path of the auth warm start snapshot,
+            the auth config is always parsed and validated if None. Defaults to None.
+        auth_flush_delay (float, optional): Seconds the auth changes are held before being written together.
+            Defaults to 1.0.
+        auth_trusted_load (bool, optional): Whether to load the auth config without validating it,
+            only for the config written by the bot. Defaults to False.
     """
 
     extension_dir: str
     auth_config_file_path: str
     accepted_message_types: List[str] = ["GroupMessage"]
+    http_client_config: HttpClientConfig = HttpClientConfig()
+    auth_warm_start_path: Optional[str] = None
+    auth_flush_delay: float = 1.0
+    auth_trusted_load: bool = False
 
 
 class ChatBot(object):
@@ -95,17 +123,78 @@ class ChatBot(object):
         """
         return self._auth_manager
 
-    def __init__(self, bot_info: BotInfo, bot_config: BotConfig, bot_connection_config: BotConnectionConfig):
-        self._ariadne_app: Ariadne = Ariadne(
-            config(bot_info.account_id, bot_connection_config.verify_key, bot_connection_config.websocket_config)
-        )
+    @property
+    def http_client(self) -> HttpClient:
+        """
+        Return the pooled http client shared by the bot and all the plugins.
+
+        :return: An instance of HttpClient.
+        :rtype: HttpClient
+        """
+        return self._http_client
+
+    @property
+    def circuit_breakers(self) -> CircuitBreakerRegistry:
+        """
+        Return the circuit breakers of the external backends.
+
+        :return: An instance of CircuitBreakerRegistry.
+        :rtype: CircuitBreakerRegistry
+        """
+        return self._circuit_breakers
+
+    @property
+    def accounts(self) -> List[int]:
+        """
+        Returns the ids of the accounts served by the bot, the default account goes first.
+        """
+        return list(self._apps)
+
+    def __init__(
+        self,
+        bot_info: BotInfo,
+        bot_config: BotConfig,
+        bot_connection_config: BotConnectionConfig,
+        extra_accounts: Optional[Dict[int, BotConnectionConfig]] = None,
+        http_client: Optional[HttpClient] = None,
+    ):
+        """
+        Args:
+            bot_info (BotInfo): The info of the bot, its account is the default account.
+            bot_config (BotConfig): The config of the bot.
+            bot_connection_config (BotConnectionConfig): The connection config of the default account.
+            extra_accounts (Optional[Dict[int, BotConnectionConfig]], optional): The other accounts served by the bot,
+                mapped to their connection configs. Defaults to None.
+            http_client (Optional[HttpClient], optional): The http client shared with the plugins,
+                one is made from the http client config of the bot config if None. Defaults to None.
+
+        Notes:
+            all the accounts share the broadcast, so the plugins, the cmds and the auth state are shared,
+            the cmds are answered by the account that received them
+        """
+        connections: Dict[int, BotConnectionConfig] = {bot_info.account_id: bot_connection_config}
+        connections.update(extra_accounts or {})
+        self._apps: Dict[int, Ariadne] = {
+            account_id: Ariadne(config(account_id, connection.verify_key, connection.websocket_config))
+            for account_id, connection in connections.items()
+        }
+        self._ariadne_app: Ariadne = self._apps[bot_info.account_id]
         Ariadne.options = AriadneOptions(default_account=bot_info.account_id)
+        # the times each account received a recent message, the occurrence n is taken by the first account to reach n
+        self._recent_messages: Dict[MessageKey, Dict[int, int]] = {}
+        # the recent messages in the order they are received, with the time, to expire them past the window
+        self._recent_order: Deque[Tuple[float, MessageKey]] = deque()
         self._bot_name: str = bot_info.bot_name
         self._bot_config: BotConfig = bot_config
 
-        self._auth_manager: AuthorizationManager = AuthorizationManager(
-            **(Root()._asdict()), config_file_path=bot_config.auth_config_file_path
-        )
+        with profiler.phase("auth load"):
+            self._auth_manager: AuthorizationManager = AuthorizationManager(
+                **(Root()._asdict()),
+                config_file_path=bot_config.auth_config_file_path,
+                warm_start_path=bot_config.auth_warm_start_path,
+                flush_delay=bot_config.auth_flush_delay,
+                trusted_load=bot_config.auth_trusted_load,
+            )
 
         set_su_permissions([self._auth_manager.__su_permission__])
         self._root: NameSpaceNode = NameSpaceNode(
@@ -114,61 +203,98 @@ class ChatBot(object):
             f'tips: append "{HELP_KEYWORD}" to the end of the cmd to get help, only works for EXECUTABLE NODES',
         )
         self._extensions: ExtensionManager = ExtensionManager(self._bot_config.extension_dir, [])
-
+        self._http_client: HttpClient = http_client or HttpClient(bot_config.http_client_config)
+        self._circuit_breakers: CircuitBreakerRegistry = CircuitBreakerRegistry()
+
+        if len(self._apps) > 1:
+            # all the accounts share the broadcast, so the copies are dropped before any plugin receives them
+            self._ariadne_app.broadcast.receiver(GroupMessage, priority=DUPLICATE_FILTER_PRIORITY)(
+                self._make_duplicate_filter()
+            )
         for message_type in bot_config.accepted_message_types:
             self._ariadne_app.broadcast.receiver(message_type)(self._make_cmd_interpreter())
+        self._ariadne_app.broadcast.receiver(ApplicationShutdown)(self._http_client.close)
         self._ariadne_app.stop()
         self._is_running: bool = False
 
+    def _is_duplicate(self, account: int, person: Union[Friend, Member], message: MessageChain, source: Source) -> bool:
+        """
+        Check if the group message is already taken by another account of the bot in the group,
+        the first account to receive it takes it.
+
+        Notes:
+            the source time is in seconds and the source id differs between the accounts,
+            so a message sent again within the same second looks the same as a copy. They are told apart by counting:
+            an account receives a resend as one more occurrence, which is taken unless another account is ahead
+        """
+        if len(self._apps) == 1 or not isinstance(person, Member):
+            return False
+        now = time.monotonic()
+        while self._recent_order and now - self._recent_order[0][0] >= DUPLICATE_WINDOW:
+            self._recent_messages.pop(self._recent_order.popleft()[1], None)
+        key = (person.group.id, person.id, source.time.timestamp(), str(message))
+        counts = self._recent_messages.get(key)
+        if counts is None:
+            counts = self._recent_messages[key] = {}
+            self._recent_order.append((now, key))
+        occurrence = counts[account] = counts.get(account, 0) + 1
+        return any(count >= occurrence for other, count in counts.items() if other != account)
+
+    def _make_duplicate_filter(self):
+        async def _drop_duplicate(app: Ariadne, person: Member, message: MessageChain, source: Source):
+            """
+            Stops the propagation of a group message already taken by another account of the bot,
+            so neither the cmds nor the receivers of the plugins get the copy.
+
+            Raises:
+                PropagationCancelled: If the message is a copy.
+            """
+            if self._is_duplicate(app.account, person, message, source):
+                raise PropagationCancelled()
+
+        return _drop_duplicate
+
     def _make_cmd_interpreter(self):
-        async def _cmd_interpret(person: Union[Friend, Member], message: MessageChain):
+        async def _cmd_interpret(app: Ariadne, person: Union[Friend, Member], message: MessageChain):
             """
             Asynchronously calls the bot client with the given target and message.
 
             Args:
+                app (Ariadne): The app of the account that received the message, which also sends the reply.
                 person (Union[Friend, Member, Stranger]): The target of the bot client call.
                 message (MessageChain): The message to be sent.
 
             Returns:
                 None
 
-            Raises:
-                KeyError: If the user is not found.
+            Notes:
+                the cmd is tried with the permissions of each role of the group and the sender in turn,
+                the permissions are resolved once and cached by the auth manager until the users or the roles change
             """
-            stack: List[User] = []
-            group = None
-            if isinstance(person, Member):
-                group = person.group
-
+            # the lazy plugin that owns the cmd has to be installed before the cmd tree is searched
+            await self._extensions.load_lazy_plugin_for_cmd(str(message))
+            # the group pseudo-user goes first, then the sender
+            user_ids = (person.group.id, person.id) if isinstance(person, Member) else (person.id,)
+            group = person.group if isinstance(person, Member) else None
+            for perms in self._auth_manager.resolve_permissions(*user_ids).role_permissions:
                 try:
-                    stack.extend(self._auth_manager.get_user(user_id=group.id))
+                    interpret_result: str | Awaitable[Any] = await self._root.interpret(
+                        str(message), perms, HELP_KEYWORD
+                    )
+                    break
+                except PermissionError:
+                    pass
                 except KeyError:
                     pass
-
-            stack.extend(
-                self._auth_manager.get_user(user_id=person.id)
-            )  # if this fails, then there is no need to go further
-
-            roles_bunch: List[List[Role]] = [user.roles for user in stack]
-            owned_roles: List[Role] = []
-            for role in roles_bunch:
-                owned_roles.extend(role)
-            for role in owned_roles:
-                with role as perms:
-                    try:
-                        interpret_result: str | Awaitable[Any] = await self._root.interpret(
-                            str(message), perms, HELP_KEYWORD
-                        )
-                        break
-                    except PermissionError:
-                        pass
-                    except KeyError:
-                        pass
             else:
                 return
 
-            stdout = interpret_result if isinstance(interpret_result, str) else await interpret_result
-            (await self._ariadne_app.send_message(group or person, message=stdout)) if stdout else None
+            try:
+                stdout = interpret_result if isinstance(interpret_result, str) else await interpret_result
+            except CircuitOpenError as e:
+                # the backend is known to be down, tell the sender instead of letting the handler hang
+                stdout = str(e)
+            (await app.send_message(group or person, message=stdout)) if stdout else None
 
         return _cmd_interpret
 
@@ -181,26 +307,35 @@ class ChatBot(object):
         """
         return self._extensions.plugins_view
 
-    def init_utils(self) -> None:
+    def init_utils(self, recheck_deps: bool = False, install_requirements: bool = True) -> None:
         """
         Initializes the utils for the class.
 
         Args:
             self: The instance of the class.
+            recheck_deps (bool, optional): Whether to check the requirements even if nothing changed.
+                Defaults to False.
+            install_requirements (bool, optional): Whether to install the requirements of the extensions,
+                the extensions whose requirements are missing fail to install if not. Defaults to True.
 
         Returns:
             None.
         """
-        self._extensions.install_all_requirements()
-        self._extensions.install_all_extensions(
-            broadcast=self._ariadne_app.broadcast,
-            root_namespace_node=self._root,
-            proxy=self._extensions.plugins_view,
-            auth_manager=self._auth_manager,
-        )
+        if install_requirements:
+            with profiler.phase("requirements"):
+                self._extensions.install_all_requirements(recheck=recheck_deps)
+        with profiler.phase("extensions"):
+            self._extensions.install_all_extensions(
+                broadcast=self._ariadne_app.broadcast,
+                root_namespace_node=self._root,
+                proxy=self._extensions.plugins_view,
+                auth_manager=self._auth_manager,
+                http_client=self._http_client,
+                circuit_breakers=self._circuit_breakers,
+            )
         # TODO better add a hall perm checker, to eliminate unregistered perm be used
 
-    def run(self, init_utils: bool = True) -> None:
+    def run(self, init_utils: bool = True, recheck_deps: bool = False) -> None:
         """
         Run the application.
 
@@ -209,7 +344,9 @@ class ChatBot(object):
         After the app is stopped, it saves the changes made to the permissions, roles, resources, and users using the AuthManager.
 
         Parameters:
-
+            init_utils (bool, optional): Whether to initialize the utils before launching. Defaults to True.
+            recheck_deps (bool, optional): Whether to check the requirements even if nothing changed.
+                Defaults to False.
 
         Returns:
             None
@@ -217,7 +354,7 @@ class ChatBot(object):
         if self._is_running:
             return
         try:
-            self.init_utils() if init_utils else None
+            self.init_utils(recheck_deps) if init_utils else None
             self._is_running = True
             self._ariadne_app.launch_blocking()
 
@@ -236,7 +373,8 @@ class ChatBot(object):
 
     def save_config(self) -> None:
         print("Saving config...")
-        self._auth_manager.save()
+        # flushed right away, a scheduled flush would never run once the bot stops
+        self._auth_manager.flush()
         for extension in self._extensions.plugins_view.values():
             extension.config_registry.save_config(True, ignore_null=True)
 
@@ -0,0 +1,244 @@
+"""
+circuit_breaker that is used to fail fast on the unavailable external backends
+"""
+import time
+from enum import Enum
+from inspect import isawaitable
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Optional, Tuple, Type
+
+
+class BreakerState(Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+
+class CircuitOpenError(RuntimeError):
+    """
+    Raised when a call is rejected by an open circuit breaker
+    """
+
+
+class CircuitBreaker(object):
+    """
+    A circuit breaker guards the calls to a single backend.
+
+    the breaker opens after `failure_threshold` consecutive failures, and rejects every call while opened,
+    after `recovery_timeout` seconds a single probe call is let through(half-open),
+    the breaker closes if the probe succeeds, opens again otherwise.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        expected_exceptions: Tuple[Type[BaseException], ...] = (Exception,),
+    ):
+        if failure_threshold < 1:
+            raise ValueError("failure_threshold must be positive")
+        self._name: str = name
+        self._failure_threshold: int = failure_threshold
+        self._recovery_timeout: float = recovery_timeout
+        self._expected_exceptions: Tuple[Type[BaseException], ...] = expected_exceptions
+        self._state: BreakerState = BreakerState.CLOSED
+        self._consecutive_failures: int = 0
+        self._opened_at: float = 0.0
+        self._probing: bool = False
+        self._fallback: Optional[Callable] = None
+        self._total_calls: int = 0
+        self._total_failures: int = 0
+        self._total_rejections: int = 0
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def state(self) -> BreakerState:
+        """
+        Returns the current state, an open breaker turns half-open once the recovery timeout elapsed.
+        """
+        if self._state == BreakerState.OPEN and time.monotonic() - self._opened_at >= self._recovery_timeout:
+            self._state = BreakerState.HALF_OPEN
+            self._probing = False
+        return self._state
+
+    @property
+    def fallback(self) -> Optional[Callable]:
+        return self._fallback
+
+    def set_fallback(self, fallback: Optional[Callable]) -> None:
+        """
+        Set the fallback used to answer the rejected and failed calls,
+        it receives the same arguments as the guarded callable.
+
+        Args:
+            fallback (Optional[Callable]): The fallback, may be a coroutine function, None to unset.
+
+        Returns:
+            None
+        """
+        self._fallback = fallback
+
+    def allow_request(self) -> bool:
+        """
+        Check if a call is allowed to reach the backend, reserves the probe slot when half-opened.
+
+        Returns:
+            bool: True if the call is allowed, False otherwise.
+        """
+        state = self.state
+        if state == BreakerState.CLOSED:
+            return True
+        if state == BreakerState.HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self._consecutive_failures = 0
+        self._probing = False
+        self._state = BreakerState.CLOSED
+
+    def record_failure(self) -> None:
+        self._total_failures += 1
+        self._consecutive_failures += 1
+        self._probing = False
+        if self._state == BreakerState.HALF_OPEN or self._consecutive_failures >= self._failure_threshold:
+            self._state = BreakerState.OPEN
+            self._opened_at = time.monotonic()
+
+    def reset(self) -> None:
+        """
+        Force the breaker back to the closed state.
+        """
+        self.record_success()
+
+    async def call(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Call the func through the breaker, the func could be either a normal function or a coroutine function.
+
+        Args:
+            func (Callable): The callable that reaches the backend.
+            *args: Positional arguments passed to the func and the fallback.
+            **kwargs: Keyword arguments passed to the func and the fallback.
+
+        Returns:
+            Any: The result of the func, or the result of the fallback if the call is rejected or failed.
+
+        Raises:
+            CircuitOpenError: If the call is rejected and there is no fallback.
+        """
+        self._total_calls += 1
+        if not self.allow_request():
+            self._total_rejections += 1
+            if self._fallback is None:
+                raise CircuitOpenError(f"Circuit [{self._name}] is open, call rejected")
+            return await self._call_fallback(*args, **kwargs)
+        try:
+            result = func(*args, **kwargs)
+            result = await result if isawaitable(result) else result
+        except self._expected_exceptions:
+            self.record_failure()
+            if self._fallback is None:
+                raise
+            return await self._call_fallback(*args, **kwargs)
+        except BaseException:
+            # unexpected exceptions release the probe slot, but are not counted as backend failures
+            self._probing = False
+            raise
+        self.record_success()
+        return result
+
+    async def _call_fallback(self, *args, **kwargs) -> Any:
+        result = self._fallback(*args, **kwargs)
+        return await result if isawaitable(result) else result
+
+    def export(self) -> Dict[str, Any]:
+        return {
+            "state": self.state.value,
+            "consecutive_failures": self._consecutive_failures,
+            "calls": self._total_calls,
+            "failures": self._total_failures,
+            "rejections": self._total_rejections,
+        }
+
+
+class CircuitBreakerRegistry(object):
+    """
+    Registry of the circuit breakers, keyed by the backend name
+    """
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self._failure_threshold: int = failure_threshold
+        self._recovery_timeout: float = recovery_timeout
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    @property
+    def breakers(self) -> MappingProxyType[str, CircuitBreaker]:
+        return MappingProxyType(self._breakers)
+
+    def get(self, backend: str, **breaker_kwargs) -> CircuitBreaker:
+        """
+        Get the breaker of the backend, creates one using the registry defaults if not exists.
+
+        Args:
+            backend (str): The name of the backend.
+            **breaker_kwargs: Override the defaults when the breaker is created.
+
+        Returns:
+            CircuitBreaker: The breaker of the backend.
+        """
+        if backend not in self._breakers:
+            breaker_kwargs.setdefault("failure_threshold", self._failure_threshold)
+            breaker_kwargs.setdefault("recovery_timeout", self._recovery_timeout)
+            self._breakers[backend] = CircuitBreaker(backend, **breaker_kwargs)
+        return self._breakers[backend]
+
+    def register_fallback(self, backend: str, fallback: Callable) -> None:
+        """
+        Register the fallback of the backend.
+
+        Args:
+            backend (str): The name of the backend.
+            fallback (Callable): The fallback used when a call to the backend is rejected or failed.
+
+        Returns:
+            None
+        """
+        self.get(backend).set_fallback(fallback)
+
+    async def call(self, backend: str, func: Callable, *args, **kwargs) -> Any:
+        """
+        Call the func through the breaker of the backend.
+        """
+        return await self.get(backend).call(func, *args, **kwargs)
+
+    def reset(self, backend: str) -> bool:
+        """
+        Reset the breaker of the backend.
+
+        Returns:
+            bool: True if the breaker exists, False otherwise.
+        """
+        if backend not in self._breakers:
+            return False
+        self._breakers[backend].reset()
+        return True
+
+    def status(self) -> str:
+        """
+        Returns a human-readable status table of all the breakers.
+        """
+        if not self._breakers:
+            return "No circuit breaker registered"
+        lines = [f"|{'Backend':^16}|{'State':^10}|{'Fails':^6}|{'Calls':^8}|{'Rejects':^8}|"]
+        for name, breaker in sorted(self._breakers.items()):
+            info = breaker.export()
+            lines.append(
+                f"|{name:<16}|{info['state']:<10}|{info['consecutive_failures']:<6}|"
+                f"{info['calls']:<8}|{info['rejections']:<8}|"
+            )
+        return "\n".join(lines)
@@ -1,5 +1,6 @@
 import re
 from abc import abstractmethod
+from contextvars import ContextVar
 from enum import Enum
 from inspect import iscoroutinefunction
 from itertools import zip_longest
@@ -17,16 +18,17 @@ from typing import (
     Awaitable,
     TypeAlias,
     Set,
+    Optional,
+    Tuple,
 )
 
-from pydantic import BaseModel, Field, root_validator, validator
+from pydantic import BaseModel, Field, PrivateAttr, root_validator, validator
 
 from constant import Value
 from modules.auth import Permission, auth_check, RequiredPermission
 from modules.config_utils import (
     get_signature_with_annotations,
 )
-from modules.file_manager import generate_random_string
 
 
 def make_regex_part_from_enum(enum: Enum) -> str:
@@ -79,6 +81,9 @@ def tokenize_cmd(cmd: str) -> List[str]:
 
     # Replace matched substrings with random tokens
     repl_tokens_table: Dict[str, str] = {}
+    if matched:
+        # imported on demand, the file utils pull in the whole http stack
+        from modules.file_manager import generate_random_string
     for match in matched:
         repl_token: str = generate_random_string(10)
         cmd = cmd.replace(match, repl_token)
@@ -340,6 +345,9 @@ class CmdBuilder(object):
 
 __su_permissions__: List[Permission] = []
 
+# the name of the plugin being installed, the nodes added meanwhile are owned by it
+node_owner: ContextVar[Optional[str]] = ContextVar("node_owner", default=None)
+
 
 def set_su_permissions(permissions: Iterable[Permission]) -> None:
     """
@@ -377,6 +385,14 @@ class BaseCmdNode(BaseModel):
     aliases: List[str] = Field(default_factory=list, unique_items=True)
     help_message: str = Field(default="no help provided")
     required_permissions: RequiredPermission = Field(default_factory=RequiredPermission)
+    _owner: Optional[str] = PrivateAttr(default=None)
+
+    @property
+    def owner(self) -> Optional[str]:
+        """
+        Returns: the name of the plugin that added the node, None for the built-in nodes.
+        """
+        return self._owner
 
     @root_validator
     def name_and_aliases(cls, values) -> Dict[str, Any]:
@@ -694,6 +710,7 @@ class NameSpaceNode(BaseCmdNode):
                 if has_identifier_collision(self.children_node):
                     self.children_node.pop()
                     raise KeyError(f"Node with name {node.name} already exists")
+                node._owner = node._owner or node_owner.get()
                 return
             raise KeyError(f"Node with name {node.name} already exists")
         raise PermissionError("Illegal Modify operation, insufficient permissions")
@@ -818,6 +835,78 @@ def has_identifier_collision(children_node: List[T_CmdNode]) -> List[T_CmdNode]:
     return []
 
 
+# a check on the way to a node, the required permissions and the super permissions that bypass them
+PermissionCheck: TypeAlias = Tuple[List[Permission], List[Permission]]
+
+
+def path_checks(root: "NameSpaceNode", chain: List[str]) -> List[PermissionCheck]:
+    """
+    Collect the permission checks interpreting the chain goes through, the same ones as NameSpaceNode.interpret.
+
+    Args:
+        root (NameSpaceNode): The root node the chain starts from.
+        chain (List[str]): The names or aliases of the nodes on the path.
+
+    Returns:
+        List[PermissionCheck]: The read checks of the namespaces on the way,
+            followed by the execute check if the path ends with an executable node.
+
+    Raises:
+        KeyError: If the chain is empty or any node on the path is not found.
+    """
+    global __su_permissions__
+    if not chain:
+        raise KeyError("The chain is empty")
+    checks: List[PermissionCheck] = []
+    node: BaseCmdNode = root
+    for name in chain:
+        if not isinstance(node, NameSpaceNode):
+            raise KeyError(f"{node.name} has no children")
+        checks.append((node.required_permissions.read, __su_permissions__ + node.required_permissions.super))
+        found = [child for child in node.children_node if child.name == name or name in child.aliases]
+        if len(found) != 1:
+            raise KeyError(f"No node with name {name} found")
+        node = found[0]
+    if isinstance(node, ExecutableNode):
+        checks.append((node.required_permissions.execute, __su_permissions__ + node.required_permissions.super))
+    return checks
+
+
+def list_accessible_paths(root: "NameSpaceNode", permission_sets: Iterable[Iterable[Permission]]) -> List[str]:
+    """
+    List the paths of the executable nodes that could be run with any one of the permission sets.
+
+    Args:
+        root (NameSpaceNode): The root node to walk from.
+        permission_sets (Iterable[Iterable[Permission]]): The permission sets tried in turn, like the roles
+            of a user on interpreting.
+
+    Returns:
+        List[str]: The accessible paths sorted, each one the node names joined by spaces.
+    """
+    global __su_permissions__
+
+    def _passes(required: List[Permission], node: BaseCmdNode, permissions: Iterable[Permission]) -> bool:
+        return auth_check(required, permissions, optional_super=__su_permissions__ + node.required_permissions.super)
+
+    accessible: Dict[str, None] = {}
+    for permissions in permission_sets:
+        # the namespaces are only walked into when readable, so the unreadable subtrees are pruned
+        stack: List[Tuple[NameSpaceNode, List[str]]] = [(root, [])]
+        found: List[str] = []
+        while stack:
+            namespace, path = stack.pop()
+            if not _passes(namespace.required_permissions.read, namespace, permissions):
+                continue
+            for child in reversed(namespace.children_node):
+                if isinstance(child, NameSpaceNode):
+                    stack.append((child, path + [child.name]))
+                elif _passes(child.required_permissions.execute, child, permissions):
+                    found.append(" ".join(path + [child.name]))
+        accessible.update(dict.fromkeys(found))
+    return sorted(accessible)
+
+
 class EnumCMD(Enum):
     def export(self) -> Dict[str, Any]:
         """
@@ -1,17 +1,48 @@
+import asyncio
+import importlib
 import pathlib
+import sys
+import time
+from enum import Enum
 from importlib import import_module
+from inspect import iscoroutinefunction
 from types import MappingProxyType
-from typing import List, Dict, Type, Sequence, Optional
+from typing import List, Dict, Type, Sequence, Optional, Any, NamedTuple, Coroutine, Set, Tuple
 
 from colorama import Fore, Back, Style
 from graia.broadcast import Broadcast
+from graia.broadcast.entities.listener import Listener
 
-from constant import REQUIREMENTS_FILE_NAME
+from constant import (
+    REQUIREMENTS_FILE_NAME,
+    EXTENSION_CONFIG_DIR,
+    EXTENSION_MANIFEST_CACHE_PATH,
+    REQUIREMENTS_FINGERPRINT_PATH,
+)
 from modules.auth.core import AuthorizationManager
-from modules.cmd import NameSpaceNode
-from modules.file_manager import get_all_sub_dirs
-from modules.launch_utils import install_requirements, merge_requirements
+from modules.circuit_breaker import CircuitBreakerRegistry
+from modules.cmd import NameSpaceNode, node_owner, T_CmdNode
+from modules.file_manager import fingerprint_sources, get_all_sub_dirs
+from modules.http_client import HttpClient
+from modules.launch_utils import (
+    install_requirements,
+    merge_requirements,
+    requirements_fingerprint,
+    load_fingerprint_record,
+    save_fingerprint_record,
+    resolve_installed_versions,
+)
 from modules.plugin_base import AbstractPlugin, PluginsView
+from modules.plugin_host import isolated_plugin
+from modules.startup_profiler import profiler
+from modules.plugin_manifest import (
+    ManifestCache,
+    ManifestError,
+    ExtensionManifest,
+    PluginManifest,
+    parse_extension,
+    stamp_file,
+)
 
 
 def stdout_decoration(txt_color: str, line_wrap: bool, line_color: str, title: Optional[str] = None):
@@ -30,12 +61,54 @@ def stdout_decoration(txt_color: str, line_wrap: bool, line_color: str, title: O
     return wrapper
 
 
+class InstallStatus(Enum):
+    OK = "ok"
+    FAILED = "failed"
+    TIMEOUT = "timeout"
+    SKIPPED = "skipped"
+
+
+class InstallRecord(NamedTuple):
+    """
+    A finished plugin install on the startup timeline.
+
+    Attributes:
+        plugin (str): The plugin name.
+        wave (int): The index of the topological wave the plugin is installed in.
+        start (float): Seconds from the beginning of the installation to the start of the install.
+        duration (float): Seconds the install took.
+        status (InstallStatus): The result of the install.
+    """
+
+    plugin: str
+    wave: int
+    start: float
+    duration: float
+    status: InstallStatus
+
+
 class ExtensionManager:
-    def __init__(self, extension_dir: str, black_list: List[str]):
+    def __init__(
+        self,
+        extension_dir: str,
+        black_list: List[str],
+        manifest_cache_path: Optional[str] = None,
+        install_timeout: Optional[float] = 60.0,
+    ):
         self._plugins: Dict[str, AbstractPlugin] = {}
         self._black_list: List[str] = black_list
         pathlib.Path(extension_dir).mkdir(parents=True, exist_ok=True)
         self._extension_dir: str = extension_dir
+        self._manifest_cache: ManifestCache = ManifestCache(manifest_cache_path or EXTENSION_MANIFEST_CACHE_PATH)
+        self._lazy_plugins: Dict[str, PluginManifest] = {}
+        self._lazy_command_index: Dict[str, str] = {}
+        # the lazy plugin name to the load that is installing it, awaited by the callers coming meanwhile
+        self._lazy_loads: Dict[str, asyncio.Task] = {}
+        self._install_context: Dict[str, Any] = {}
+        self._enable_plugins: bool = True
+        self._install_timeout: Optional[float] = install_timeout
+        self._timeline: List[InstallRecord] = []
+        self._background_tasks: Set[asyncio.Task] = set()
 
     @property
     def plugins(self) -> Dict[str, AbstractPlugin]:
@@ -64,6 +137,8 @@ class ExtensionManager:
         proxy: PluginsView,
         auth_manager: AuthorizationManager,
         enable_plugins: bool = True,
+        http_client: Optional[HttpClient] = None,
+        circuit_breakers: Optional[CircuitBreakerRegistry] = None,
     ) -> None:
         """
         Installs all extensions.
@@ -74,21 +149,72 @@ class ExtensionManager:
             proxy (PluginsView): The plugins view.
             auth_manager (AuthorizationManager): The authorization manager.
             enable_plugins (bool, optional): Whether to enable plugins. Defaults to True.
+            http_client (Optional[HttpClient], optional): The shared http client. Defaults to None.
+            circuit_breakers (Optional[CircuitBreakerRegistry], optional): The shared circuit breakers.
+                Defaults to None.
 
         Returns:
             None
+
+        Notes:
+            blocks until all the installs are finished, must not be called inside a running event loop,
+            see install_all_extensions_async
+        """
+        self._run_until_complete(
+            self.install_all_extensions_async(
+                broadcast=broadcast,
+                root_namespace_node=root_namespace_node,
+                proxy=proxy,
+                auth_manager=auth_manager,
+                enable_plugins=enable_plugins,
+                http_client=http_client,
+                circuit_breakers=circuit_breakers,
+            )
+        )
+
+    async def install_all_extensions_async(
+        self,
+        broadcast: Broadcast,
+        root_namespace_node: NameSpaceNode,
+        proxy: PluginsView,
+        auth_manager: AuthorizationManager,
+        enable_plugins: bool = True,
+        http_client: Optional[HttpClient] = None,
+        circuit_breakers: Optional[CircuitBreakerRegistry] = None,
+    ) -> None:
         """
-        detected_plugins = self._detect_plugins()
+        Installs all extensions, the plugins are installed in topological waves of their dependencies,
+        the async installs inside a wave run concurrently.
+
+        Args:
+            broadcast (Broadcast): The broadcast object.
+            root_namespace_node (NameSpaceNode): The root namespace node.
+            proxy (PluginsView): The plugins view.
+            auth_manager (AuthorizationManager): The authorization manager.
+            enable_plugins (bool, optional): Whether to enable plugins. Defaults to True.
+            http_client (Optional[HttpClient], optional): The shared http client. Defaults to None.
+            circuit_breakers (Optional[CircuitBreakerRegistry], optional): The shared circuit breakers.
+                Defaults to None.
+
+        Returns:
+            None
+
+        Notes:
+            the lazy plugins whose command roots and events are already recorded in the manifest cache
+            are not imported here, they are imported and installed on the first use instead.
+        """
+        with profiler.phase("discover manifests"):
+            manifests = self.detect_manifests()
         string_buffer = "\n".join(
             [
-                f"{Fore.YELLOW}{Back.BLACK}|{plugin.get_plugin_name():<16}|"
-                f"{plugin.get_plugin_version():<8}|"
-                f"{plugin.get_plugin_author():<10}|"
-                f"{plugin.get_plugin_description():<80}|{Style.RESET_ALL}"
-                for plugin in detected_plugins
+                f"{Fore.YELLOW}{Back.BLACK}|{manifest.name:<16}|"
+                f"{manifest.version:<8}|"
+                f"{manifest.author:<10}|"
+                f"{manifest.description:<80}|{Style.RESET_ALL}"
+                for manifest in manifests
             ]
         )
-        print(Fore.GREEN + Back.RED + f"Detected {len(detected_plugins)} plugins: " + Style.RESET_ALL)
+        print(Fore.GREEN + Back.RED + f"Detected {len(manifests)} plugins: " + Style.RESET_ALL)
         labels = ["Extension", "Version", "Author", "Description"]
         print(
             Fore.CYAN
@@ -98,21 +224,577 @@ class ExtensionManager:
         )
         print(string_buffer)
         print(Fore.LIGHTRED_EX)
-        for plugin in detected_plugins:
-            if plugin.get_plugin_name() in self._black_list:
+        self.bind_install_context(broadcast, root_namespace_node, proxy, auth_manager, http_client, circuit_breakers)
+        self._enable_plugins = enable_plugins
+        eager_manifests: Dict[str, List[PluginManifest]] = {}
+        for manifest in manifests:
+            if manifest.name in self._black_list:
+                continue
+            if manifest.lazy and manifest.learned:
+                self._defer_plugin(manifest)
                 continue
+            # lazy plugins without a recorded manifest are installed once to record their command roots and events
+            eager_manifests.setdefault(manifest.extension, []).append(manifest)
 
-            self.load_plugin(
-                plugin=plugin,
-                broadcast=broadcast,
-                root_namespace_node=root_namespace_node,
-                proxy=proxy,
-                auth_manager=auth_manager,
-            )
-        for plugin_name in self.plugins:
-            self.install_plugin(plugin_name, enable_plugins)
+        for extension, extension_manifests in eager_manifests.items():
+            for plugin in self._plugin_classes(extension_manifests):
+                self.load_plugin(plugin=plugin, **self._install_context)
+        await self.install_plugins(list(self.plugins) + await self._undefer_dependencies(list(self.plugins)))
+        if self._lazy_plugins:
+            print(f"{Fore.CYAN}Deferred {len(self._lazy_plugins)} lazy plugins: {', '.join(self._lazy_plugins)}")
+        self._register_event_triggers(broadcast)
+        self._manifest_cache.save()
         print(Fore.RESET)
 
+    def bind_install_context(
+        self,
+        broadcast: Broadcast,
+        root_namespace_node: NameSpaceNode,
+        proxy: PluginsView,
+        auth_manager: AuthorizationManager,
+        http_client: Optional[HttpClient] = None,
+        circuit_breakers: Optional[CircuitBreakerRegistry] = None,
+    ) -> None:
+        """
+        Sets what the plugins are loaded and installed with by install_plugins, the lazy loads and the reloads,
+        install_all_extensions_async sets it too, so it is only needed to install the plugins loaded one by one.
+
+        Args:
+            broadcast (Broadcast): The broadcast object.
+            root_namespace_node (NameSpaceNode): The root namespace node.
+            proxy (PluginsView): The plugins view.
+            auth_manager (AuthorizationManager): The authorization manager.
+            http_client (Optional[HttpClient], optional): The shared http client. Defaults to None.
+            circuit_breakers (Optional[CircuitBreakerRegistry], optional): The shared circuit breakers.
+                Defaults to None.
+        """
+        self._install_context = dict(
+            broadcast=broadcast,
+            root_namespace_node=root_namespace_node,
+            proxy=proxy,
+            auth_manager=auth_manager,
+            http_client=http_client,
+            circuit_breakers=circuit_breakers,
+        )
+
+    def detect_manifests(self) -> List[PluginManifest]:
+        """
+        Detects the manifests of the plugins in the extension directory,
+        the manifests are read from the cache if the extension sources are unchanged, parsed from the sources otherwise.
+        Only the extensions that can not be resolved statically are imported.
+
+        Returns:
+            List[PluginManifest]: The manifests of all the detected plugins.
+        """
+        manifests: List[PluginManifest] = []
+        for sub_dir in get_all_sub_dirs(self._extension_dir):
+            for plugin_manifest in self._extension_manifest(sub_dir).plugins:
+                if plugin_manifest.learned and plugin_manifest.config_stamp != self._config_stamp(plugin_manifest):
+                    # the config may rename the commands, the roots have to be recorded again
+                    plugin_manifest.learned = False
+                manifests.append(plugin_manifest)
+        return manifests
+
+    def _extension_manifest(self, sub_dir: str) -> ExtensionManifest:
+        """
+        Get the manifest of the extension in the sub dir, rebuilds and caches it if the sources changed.
+        """
+        extension: str = f"{self._extension_dir}.{sub_dir}"
+        extension_path = pathlib.Path(self._extension_dir, sub_dir)
+        fingerprint = fingerprint_sources(extension_path)
+        cached = self._manifest_cache.get(extension, fingerprint)
+        if cached is not None:
+            return cached
+        try:
+            plugin_manifests = parse_extension(extension_path, extension)
+        except ManifestError as e:
+            print(f"{Fore.YELLOW}Fallback to import {extension}, {e}{Fore.RESET}")
+            plugin_manifests = [
+                PluginManifest(
+                    extension=extension,
+                    class_name=plugin.__name__,
+                    name=plugin.get_plugin_name(),
+                    version=plugin.get_plugin_version(),
+                    author=plugin.get_plugin_author(),
+                    description=plugin.get_plugin_description(),
+                    isolated=plugin.Isolated,
+                    benchmarked=plugin.benchmark_scenarios is not AbstractPlugin.benchmark_scenarios,
+                )
+                for plugin in self._import_plugin(extension)
+            ]
+        cached = ExtensionManifest(extension=extension, fingerprint=fingerprint, plugins=plugin_manifests)
+        self._manifest_cache.put(cached)
+        return cached
+
+    @property
+    def lazy_plugins(self) -> MappingProxyType[str, PluginManifest]:
+        """
+        Returns a read-only view of the manifests of the lazy plugins that are not installed yet.
+        """
+        return MappingProxyType(self._lazy_plugins)
+
+    @property
+    def install_timeline(self) -> List[InstallRecord]:
+        """
+        Returns the records of all the finished installs, in the order they finished.
+        """
+        return list(self._timeline)
+
+    async def load_lazy_plugin(self, plugin_name: str) -> bool:
+        """
+        Imports, loads and installs a deferred lazy plugin, along with its deferred dependencies.
+
+        Args:
+            plugin_name (str): The name of the lazy plugin.
+
+        Returns:
+            bool: True if the plugin is installed, False if it is not deferred or failed to install.
+
+        Notes:
+            the callers coming while the plugin is being installed, e.g. a second cmd of the same root,
+            wait for the same install instead of finding the plugin neither deferred nor installed
+        """
+        load = self._lazy_loads.get(plugin_name)
+        if load is None:
+            if plugin_name not in self._lazy_plugins:
+                return False
+            load = asyncio.ensure_future(self._load_lazy(plugin_name))
+            self._lazy_loads[plugin_name] = load
+            load.add_done_callback(self._forget_lazy_load)
+        # the install goes on even if the handler that started it is cancelled
+        results = await asyncio.shield(load)
+        return results.get(plugin_name, False)
+
+    async def _load_lazy(self, plugin_name: str) -> Dict[str, bool]:
+        """
+        Undefers and installs the lazy plugin along with its deferred dependencies, run as the load of them all.
+
+        Returns:
+            Dict[str, bool]: The plugin name to whether it is installed successfully.
+        """
+        load = asyncio.current_task()
+        if not await self._undefer(plugin_name, load):
+            return {}
+        results = await self.install_plugins([plugin_name] + await self._undefer_dependencies([plugin_name], load))
+        self._manifest_cache.save()
+        return results
+
+    def _forget_lazy_load(self, load: asyncio.Task) -> None:
+        """
+        Removes the finished load along with the command roots of the plugins it installed.
+        """
+        plugin_names = [name for name, task in self._lazy_loads.items() if task is load]
+        for plugin_name in plugin_names:
+            del self._lazy_loads[plugin_name]
+        for root in [root for root, name in self._lazy_command_index.items() if name in plugin_names]:
+            del self._lazy_command_index[root]
+
+    async def load_lazy_plugin_for_cmd(self, cmd: str) -> bool:
+        """
+        Installs the deferred lazy plugin that owns the root of the cmd.
+
+        Args:
+            cmd (str): The cmd string to be interpreted.
+
+        Returns:
+            bool: True if a lazy plugin is installed, False otherwise.
+        """
+        if not self._lazy_command_index:
+            return False
+        tokens = cmd.split(maxsplit=1)
+        if not tokens or tokens[0] not in self._lazy_command_index:
+            return False
+        return await self.load_lazy_plugin(self._lazy_command_index[tokens[0]])
+
+    async def install_plugins(self, plugin_names: List[str]) -> Dict[str, bool]:
+        """
+        Installs the loaded plugins in topological waves of their dependencies.
+
+        A wave contains the plugins whose dependencies are all installed, the sync installs run one by one,
+        the async installs of the wave run concurrently, each of them is limited by the install timeout.
+        The plugins whose dependencies failed, or that are in a dependency cycle, are skipped.
+
+        Args:
+            plugin_names (List[str]): The names of the loaded plugins to install.
+
+        Returns:
+            Dict[str, bool]: The plugin name to whether it is installed successfully.
+        """
+        begin = time.perf_counter()
+        records_offset = len(self._timeline)
+        dependencies: Dict[str, List[str]] = {}
+        for plugin_name in plugin_names:
+            dependencies[plugin_name] = []
+            for dependency in self._plugins[plugin_name].Dependencies:
+                if dependency in plugin_names:
+                    dependencies[plugin_name].append(dependency)
+                elif dependency not in self._plugins:
+                    print(f"{Fore.YELLOW}{plugin_name} depends on {dependency}, which is not loaded{Fore.RESET}")
+
+        results: Dict[str, bool] = {}
+        pending: Dict[str, List[str]] = dict(dependencies)
+        wave = 0
+        while pending:
+            ready = [name for name, deps in pending.items() if all(dep in results for dep in deps)]
+            if not ready:
+                print(f"{Fore.RED}Circular dependencies among {', '.join(pending)}, skipped{Fore.RESET}")
+                ready = list(pending)
+            for name in ready:
+                del pending[name]
+            runnable = [name for name in ready if all(results.get(dep, False) for dep in dependencies[name])]
+            for name in ready:
+                if name not in runnable:
+                    results[name] = False
+                    self._timeline.append(
+                        InstallRecord(name, wave, time.perf_counter() - begin, 0.0, InstallStatus.SKIPPED)
+                    )
+            concurrent = [name for name in runnable if iscoroutinefunction(self._plugins[name].install)]
+            for name in runnable:
+                if name not in concurrent:
+                    results[name] = await self._timed_install(name, wave, begin)
+            outcomes = await asyncio.gather(*(self._timed_install(name, wave, begin) for name in concurrent))
+            results.update(zip(concurrent, outcomes))
+            wave += 1
+        self._print_timeline(self._timeline[records_offset:], time.perf_counter() - begin)
+        return results
+
+    async def _undefer(self, plugin_name: str, load: Optional[asyncio.Task] = None) -> Optional[AbstractPlugin]:
+        """
+        Imports and loads a deferred lazy plugin, without installing it.
+
+        Args:
+            plugin_name (str): The name of the lazy plugin.
+            load (Optional[asyncio.Task], optional): The load that installs the plugin, its command roots stay
+                indexed until the load is finished. Defaults to None, which removes them at once.
+
+        Returns:
+            Optional[AbstractPlugin]: The loaded plugin, None if the extension does not export it.
+
+        Notes:
+            the extension is imported in a worker thread, so importing a heavy one on the first use
+            does not stall the handlers of the other messages
+        """
+        manifest = self._lazy_plugins.pop(plugin_name)
+        if load is None:
+            for root in manifest.command_roots:
+                self._lazy_command_index.pop(root, None)
+        else:
+            self._lazy_loads[plugin_name] = load
+        plugins = await asyncio.to_thread(self._plugin_classes, [manifest])
+        if not plugins:
+            print(f"{Fore.RED}Lazy plugin {plugin_name} not found in {manifest.extension}{Fore.RESET}")
+            return None
+        self.load_plugin(plugin=plugins[0], **self._install_context)
+        return self._plugins[plugin_name]
+
+    async def _undefer_dependencies(self, plugin_names: List[str], load: Optional[asyncio.Task] = None) -> List[str]:
+        """
+        Imports and loads the deferred lazy plugins the plugins depend on, transitively.
+
+        Args:
+            plugin_names (List[str]): The names of the loaded plugins.
+            load (Optional[asyncio.Task], optional): The load that installs the plugins. Defaults to None.
+
+        Returns:
+            List[str]: The names of the plugins that are loaded.
+        """
+        loaded: List[str] = []
+        stack = list(plugin_names)
+        while stack:
+            for dependency in self._plugins[stack.pop()].Dependencies:
+                if dependency in self._lazy_plugins and await self._undefer(dependency, load):
+                    loaded.append(dependency)
+                    stack.append(dependency)
+        return loaded
+
+    async def _timed_install(self, plugin_name: str, wave: int, begin: float) -> bool:
+        start = time.perf_counter()
+        status = await self._install_and_record(plugin_name)
+        self._timeline.append(InstallRecord(plugin_name, wave, start - begin, time.perf_counter() - start, status))
+        return status == InstallStatus.OK
+
+    @staticmethod
+    def _print_timeline(records: List[InstallRecord], total: float, width: int = 40) -> None:
+        """
+        Prints the startup timeline, each install is drawn as a bar positioned by its start and duration.
+        """
+        if not records:
+            return
+        total = max(total, 1e-6)
+        print(f"{Fore.CYAN}Installed {len(records)} plugins in {total:.3f}s")
+        print(f"|{'Plugin':^16}|{'Wave':^6}|{'Start':^8}|{'Cost':^8}|{'Status':^8}|{'Timeline':^{width}}|")
+        for record in sorted(records, key=lambda x: (x.wave, x.start)):
+            offset = min(int(record.start / total * width), width - 1)
+            length = max(1, min(int(record.duration / total * width), width - offset))
+            bar = " " * offset + "#" * length
+            print(
+                f"|{record.plugin:<16}|{record.wave:^6}|{record.start:>8.3f}|{record.duration:>8.3f}|"
+                f"{record.status.value:<8}|{bar:<{width}}|"
+            )
+        print(Fore.RESET, end="")
+
+    def _run_until_complete(self, coroutine: Coroutine) -> Any:
+        """
+        Runs the coroutine in the event loop shared with the broadcast, blocks until it is finished.
+
+        Raises:
+            RuntimeError: If called inside a running event loop.
+        """
+        from creart import it
+
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return it(asyncio.AbstractEventLoop).run_until_complete(coroutine)
+        coroutine.close()
+        raise RuntimeError("Can not block inside a running event loop, await the async variant instead")
+
+    def _defer_plugin(self, manifest: PluginManifest) -> None:
+        self._lazy_plugins[manifest.name] = manifest
+        for root in manifest.command_roots:
+            self._lazy_command_index[root] = manifest.name
+
+    def _config_stamp(self, manifest: PluginManifest) -> str:
+        return stamp_file(f"{EXTENSION_CONFIG_DIR}/{manifest.name}.json")
+
+    async def _install_and_record(self, plugin_name: str) -> InstallStatus:
+        """
+        Installs a loaded plugin, records the command roots and the events it installed into its manifest.
+
+        Notes:
+            the nodes added during the install are owned by the plugin, which tells the command roots apart
+            even if the plugins are installed concurrently, so a plugin that fails or times out is detached
+            along with the nodes and the listeners it added before, instead of serving a part of its cmds
+        """
+        broadcast: Broadcast = self._install_context["broadcast"]
+        token = node_owner.set(plugin_name)
+        try:
+            with profiler.phase(f"{plugin_name}:install", "plugin"):
+                status = await self.install_plugin_async(plugin_name, self._enable_plugins, self._install_timeout)
+        finally:
+            node_owner.reset(token)
+        if status != InstallStatus.OK:
+            self._detach_plugin(plugin_name)
+            return status
+        plugin = self._plugins[plugin_name]
+        command_roots: List[str] = []
+        for node in self._owned_nodes(plugin_name):
+            command_roots.extend([node.name, *node.aliases])
+        events: List[str] = []
+        for listener in broadcast.listeners:
+            if listener.namespace is plugin.namespace:
+                events.extend(event.__name__ for event in listener.listening_events if event.__name__ not in events)
+        for manifest in self._manifest_cache.plugins_of(plugin_name):
+            self._manifest_cache.update_plugin(
+                manifest.copy(
+                    update=dict(
+                        learned=True,
+                        command_roots=command_roots,
+                        events=events,
+                        config_stamp=self._config_stamp(manifest),
+                    )
+                )
+            )
+        return status
+
+    def _register_event_triggers(self, broadcast: Broadcast) -> None:
+        """
+        Registers a loader for each event the deferred lazy plugins listen to,
+        the loader installs the plugins on the first event, then replays the event to them.
+        """
+        event_plugins: Dict[str, List[str]] = {}
+        for manifest in self._lazy_plugins.values():
+            for event_name in manifest.events:
+                event_plugins.setdefault(event_name, []).append(manifest.name)
+
+        for event_name, plugin_names in event_plugins.items():
+            event_type = broadcast.findEvent(event_name)
+            if event_type is None:
+                continue
+
+            def _make_loader(names: List[str]):
+                async def _lazy_loader():
+                    event = broadcast.event_ctx.get()
+                    # the plugins being installed by a former event are waited for, then the event is replayed too
+                    pending = [name for name in names if name in self._lazy_plugins or name in self._lazy_loads]
+                    installed = [self._plugins[name] for name in pending if await self.load_lazy_plugin(name)]
+                    listener = broadcast.getListener(_lazy_loader)
+                    if listener and not any(name in self._lazy_plugins for name in names):
+                        broadcast.removeListener(listener)
+                    if installed:
+                        await broadcast.layered_scheduler(
+                            listener_generator=[
+                                listener
+                                for listener in broadcast.listeners
+                                if any(listener.namespace is plugin.namespace for plugin in installed)
+                                and not listener.namespace.disabled
+                                and event.__class__ in listener.listening_events
+                            ],
+                            event=event,
+                        )
+
+                return _lazy_loader
+
+            broadcast.receiver(event_type, priority=0)(_make_loader(plugin_names))
+
+    async def reload_plugin(self, plugin_name: str) -> bool:
+        """
+        Reloads an installed plugin in place, along with the installed plugins that depend on it,
+        the other plugins keep serving meanwhile.
+
+        The modules of its extension are re-imported and the new plugin classes are resolved first,
+        the old plugins keep serving if that fails. Then the old plugins are detached, their listeners and
+        the command nodes they added to the root are removed, and the new ones are constructed and installed,
+        the config is loaded from the config file again. If any new one fails to construct or install,
+        the old plugins are attached back with their listeners and nodes.
+
+        Args:
+            plugin_name (str): The name of the plugin to reload.
+
+        Returns:
+            bool: True if the plugins are installed again, False if it is not installed or failed to reload.
+
+        Notes:
+            the events that were already posted, like ApplicationLaunch, are not posted again to the new plugins,
+            the extra uninstalls of the old plugins run only once the new ones are installed.
+            The dependents are constructed again from their current classes, unless they are exported
+            by the reloaded extension, so they do not keep what they took from the old plugin at the install
+        """
+        if plugin_name not in self._plugins:
+            return False
+        extension = self._extension_of(self._plugins[plugin_name])
+        reloading = self._installed_dependents(plugin_name)
+        try:
+            self._reload_modules(extension)
+            manifests = [
+                manifest
+                for manifest in self._extension_manifest(extension.rsplit(".", 1)[-1]).plugins
+                if manifest.name in reloading
+            ]
+            reloaded = {plugin.get_plugin_name(): plugin for plugin in self._plugin_classes(manifests)}
+        except Exception as e:
+            import traceback
+
+            traceback.print_exc()
+            print(f"{Fore.RED}Failed to reload {extension}, {plugin_name} keeps serving: {e}{Fore.RESET}")
+            return False
+        if plugin_name not in reloaded:
+            print(f"{Fore.RED}Plugin {plugin_name} not found in {extension} after reloading{Fore.RESET}")
+            return False
+        classes = [reloaded.get(name, type(self._plugins[name])) for name in reloading]
+        if len(reloading) > 1:
+            print(f"{Fore.YELLOW}Reloading {', '.join(reloading[1:])} along with {plugin_name}{Fore.RESET}")
+
+        old_plugins = {name: self._plugins[name] for name in reloading}
+        enabled = {name: not plugin.namespace.disabled for name, plugin in old_plugins.items()}
+        detached = {name: self._detach_plugin(name) for name in reloading}
+        try:
+            for plugin in classes:
+                self.load_plugin(plugin=plugin, **self._install_context)
+            results = await self.install_plugins(reloading)
+        except Exception as e:
+            import traceback
+
+            traceback.print_exc()
+            print(f"{Fore.RED}Failed to construct the reloaded {plugin_name}: {e}{Fore.RESET}")
+            results = {}
+        if not all(results.get(name, False) for name in reloading):
+            for name, plugin in old_plugins.items():
+                self._attach_plugin(plugin, *detached[name], enabled[name])
+            print(f"{Fore.YELLOW}Restored the former {', '.join(reloading)}{Fore.RESET}")
+            return False
+        for name, plugin in old_plugins.items():
+            plugin.extra_uninstall()
+            self._plugins[name].disable() if not enabled[name] else None
+        self._manifest_cache.save()
+        return True
+
+    def _installed_dependents(self, plugin_name: str) -> List[str]:
+        """
+        Returns: the name of the plugin followed by the names of the installed plugins depending on it, transitively.
+        """
+        names = [plugin_name]
+        for name in names:
+            for dependent, plugin in self._plugins.items():
+                if name in plugin.Dependencies and dependent not in names:
+                    names.append(dependent)
+        return names
+
+    def _detach_plugin(self, plugin_name: str) -> Tuple[List[Listener], List[T_CmdNode]]:
+        """
+        Removes an installed plugin along with its namespace, its listeners and the command nodes it added,
+        without its extra uninstall, so it could be attached back.
+
+        Returns:
+            Tuple[List[Listener], List[T_CmdNode]]: The removed listeners and nodes.
+        """
+        root_namespace_node: NameSpaceNode = self._install_context["root_namespace_node"]
+        broadcast: Broadcast = self._install_context["broadcast"]
+        plugin = self._plugins.pop(plugin_name)
+        plugin.disable()
+        broadcast.removeNamespace(plugin.namespace.name)
+        listeners = [listener for listener in broadcast.listeners if listener.namespace is plugin.namespace]
+        broadcast.listeners[:] = [listener for listener in broadcast.listeners if listener not in listeners]
+        nodes = self._owned_nodes(plugin_name)
+        for node in nodes:
+            root_namespace_node.children_node.remove(node)
+        return listeners, nodes
+
+    def _attach_plugin(
+        self, plugin: AbstractPlugin, listeners: List[Listener], nodes: List[T_CmdNode], enabled: bool
+    ) -> None:
+        """
+        Attaches back a plugin removed by _detach_plugin, whatever a failed replacement left is removed first.
+        """
+        plugin_name = plugin.get_plugin_name()
+        root_namespace_node: NameSpaceNode = self._install_context["root_namespace_node"]
+        broadcast: Broadcast = self._install_context["broadcast"]
+        if plugin_name in self._plugins:
+            self._detach_plugin(plugin_name)
+        if broadcast.containNamespace(plugin.namespace.name):
+            broadcast.removeNamespace(plugin.namespace.name)
+        broadcast.namespaces.append(plugin.namespace)
+        broadcast.listeners.extend(listeners)
+        root_namespace_node.children_node.extend(nodes)
+        self._plugins[plugin_name] = plugin
+        plugin.enable() if enabled else None
+
+    def _plugin_classes(self, manifests: List[PluginManifest]) -> List[Type[AbstractPlugin]]:
+        """
+        Get the classes of the plugins of the manifests, which must be exported by the same extension.
+        The isolated plugins are made from their manifests, the extension is imported only for the others.
+        """
+        classes: List[Type[AbstractPlugin]] = [isolated_plugin(manifest) for manifest in manifests if manifest.isolated]
+        names = [manifest.name for manifest in manifests if not manifest.isolated]
+        if names:
+            classes.extend(
+                plugin for plugin in self._import_plugin(manifests[0].extension) if plugin.get_plugin_name() in names
+            )
+        return classes
+
+    def _extension_of(self, plugin: AbstractPlugin) -> str:
+        """
+        Returns the attr chain of the extension that exports the plugin.
+        """
+        manifests = self._manifest_cache.plugins_of(plugin.get_plugin_name())
+        if manifests:
+            return manifests[0].extension
+        # the extension package is the first two parts of the module, like extensions.sys_info.plugin
+        return ".".join(type(plugin).__module__.split(".")[:2])
+
+    def _owned_nodes(self, plugin_name: str) -> List[T_CmdNode]:
+        root_namespace_node: NameSpaceNode = self._install_context["root_namespace_node"]
+        return [node for node in root_namespace_node.children_node if node.owner == plugin_name]
+
+    @staticmethod
+    def _reload_modules(extension: str) -> None:
+        """
+        Re-imports the imported modules of the extension, the sub modules go before the package that imports them.
+        """
+        modules = [name for name in sys.modules if name == extension or name.startswith(f"{extension}.")]
+        for name in sorted(modules, key=lambda x: x.count("."), reverse=True):
+            importlib.reload(sys.modules[name])
+
     def uninstall_all_extensions(self):
         for plugin_name in list(self.plugins.keys()):
             self.uninstall_plugin(plugin_name)
@@ -148,6 +830,8 @@ class ExtensionManager:
         root_namespace_node: NameSpaceNode,
         proxy: PluginsView,
         auth_manager: AuthorizationManager,
+        http_client: Optional[HttpClient] = None,
+        circuit_breakers: Optional[CircuitBreakerRegistry] = None,
     ) -> None:
         """
         Installs a plugin into the system.
@@ -158,6 +842,9 @@ class ExtensionManager:
             root_namespace_node (NameSpaceNode): The root namespace node.
             proxy (PluginsView): The plugins view.
             auth_manager (AuthorizationManager): The authorization manager.
+            http_client (Optional[HttpClient], optional): The shared http client. Defaults to None.
+            circuit_breakers (Optional[CircuitBreakerRegistry], optional): The shared circuit breakers.
+                Defaults to None.
 
 
         Raises:
@@ -169,7 +856,8 @@ class ExtensionManager:
         """
         if plugin.get_plugin_name in self._plugins:
             raise ValueError("Plugin already registered")
-        plugin_instance = plugin(proxy, root_namespace_node, broadcast, auth_manager)
+        with profiler.phase(f"{plugin.get_plugin_name()}:construct", "plugin"):
+            plugin_instance = plugin(proxy, root_namespace_node, broadcast, auth_manager, http_client, circuit_breakers)
 
         self._plugins[plugin.get_plugin_name()] = plugin_instance
         print(f"{Fore.GREEN}Loaded {plugin.get_plugin_name()}")
@@ -177,6 +865,9 @@ class ExtensionManager:
     @stdout_decoration(Fore.YELLOW, True, Fore.YELLOW)
     def install_plugin(self, plugin_name: str, enable: bool = True) -> bool:
         plugin_instance = self.plugins.get(plugin_name)
+        if iscoroutinefunction(plugin_instance.install):
+            print(f"{Fore.RED}{plugin_name} has an async install, use install_plugin_async{Fore.RESET}")
+            return False
         try:
             print(f"Installing {plugin_instance.get_plugin_name()}")
             plugin_instance.install()
@@ -189,6 +880,40 @@ class ExtensionManager:
             return False
         return True
 
+    async def install_plugin_async(
+        self, plugin_name: str, enable: bool = True, timeout: Optional[float] = None
+    ) -> InstallStatus:
+        """
+        Installs a loaded plugin, the install could be either a normal method or a coroutine method.
+
+        Args:
+            plugin_name (str): The name of the plugin to install.
+            enable (bool, optional): Whether to enable the plugin after the install. Defaults to True.
+            timeout (Optional[float], optional): Seconds an async install is allowed to take,
+                the sync installs can not be interrupted. Defaults to None.
+
+        Returns:
+            InstallStatus: The result of the install, the plugin stays disabled unless it is OK,
+                install_plugins detaches it then, along with what it registered before failing.
+        """
+        plugin_instance = self.plugins.get(plugin_name)
+        if not iscoroutinefunction(plugin_instance.install):
+            return InstallStatus.OK if self.install_plugin(plugin_name, enable) else InstallStatus.FAILED
+        print(f"{Fore.YELLOW}Installing {plugin_name} asynchronously{Fore.RESET}")
+        try:
+            await asyncio.wait_for(plugin_instance.install(), timeout)
+        except asyncio.TimeoutError:
+            print(f"{Fore.RED}Failed to install {plugin_name}: timed out after {timeout}s{Fore.RESET}")
+            return InstallStatus.TIMEOUT
+        except Exception as e:
+            import traceback
+
+            traceback.print_exc()
+            print(f"{Fore.RED}Failed to install {plugin_name}: {e}{Fore.RESET}")
+            return InstallStatus.FAILED
+        plugin_instance.enable() if enable else plugin_instance.disable()
+        return InstallStatus.OK
+
     def disable_plugin(self, plugin_name: str) -> bool:
         """
         Uninstalls a plugin with the given name.
@@ -205,47 +930,52 @@ class ExtensionManager:
         return False
 
     def enable_plugin(self, plugin_name: str) -> bool:
+        if plugin_name in self._lazy_plugins:
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                return self._run_until_complete(self.load_lazy_plugin(plugin_name))
+            # called from a running handler, the install finishes in the background
+            task = asyncio.ensure_future(self.load_lazy_plugin(plugin_name))
+            self._background_tasks.add(task)
+            task.add_done_callback(self._background_tasks.discard)
+            return True
         if plugin_name in self._plugins:
             self._plugins.get(plugin_name).enable()
             return True
         return False
 
-    def install_all_requirements(self):
+    def install_all_requirements(self, recheck: bool = False):
         """
         Install all the detected requirements.
 
         This function detects the requirement files and installs the packages specified in each file.
+        The whole step is skipped if the requirement files and the python environment are unchanged
+        since the last successful check.
 
         Parameters:
             self (ExtensionManager): The instance of the class.
+            recheck (bool, optional): Whether to check the requirements even if nothing changed. Defaults to False.
 
         Returns:
             None
         """
         detected_requirements = self._detect_requirements()
         req_paths = list(map(lambda x: pathlib.Path(x), detected_requirements))
+        record_path = pathlib.Path(REQUIREMENTS_FINGERPRINT_PATH)
+        if not recheck and load_fingerprint_record(record_path).get("fingerprint") == requirements_fingerprint(
+            req_paths
+        ):
+            print(f"{Fore.GREEN}Requirements unchanged since the last check, skipped{Fore.RESET}")
+            return
         output_req = "./requirements_extensions.txt"
         merge_requirements(req_paths, pathlib.Path(output_req))
 
         install_requirements(output_req)
-
-    def _detect_plugins(self) -> List[Type[AbstractPlugin]]:
-        """
-        Generates the list of detected plugins by searching for subdirectories in the extension directory,
-        importing and adding each plugin found.
-
-        Returns:
-            A list of types representing the detected plugins.
-
-        Raises:
-            None.
-        """
-        sub_dirs: List[str] = get_all_sub_dirs(self._extension_dir)
-        detected_plugins: List[Type[AbstractPlugin]] = []
-        for sub_dir in sub_dirs:
-            extension_attr_chain: str = f"{self._extension_dir}.{sub_dir}"
-            detected_plugins.extend(self._import_plugin(extension_attr_chain))
-        return detected_plugins
+        # the install may change the environment, so the fingerprint is taken afterwards
+        save_fingerprint_record(
+            record_path, requirements_fingerprint(req_paths), resolve_installed_versions(output_req)
+        )
 
     def _detect_requirements(self) -> List[str]:
         """
@@ -265,20 +995,22 @@ class ExtensionManager:
         return detected_requirements
 
     @staticmethod
-    def _import_plugin(extension_attr_chain: str) -> Sequence[Type[AbstractPlugin]]:
+    def import_extension(extension_attr_chain: str) -> List[Type[AbstractPlugin]]:
         """
-        Import a plugin from the specified extension attribute chain.
+        Import an extension and get the plugins it exports, the isolated ones are imported in process too.
 
         Args:
-            extension_attr_chain (str): The chain of attributes specifying the location of the plugin.
+            extension_attr_chain (str): The chain of attributes specifying the location of the extension.
 
         Returns:
-            Sequence[Type[AbstractPlugin]]: A sequence of plugin classes that are subclasses of AbstractPlugin.
+            List[Type[AbstractPlugin]]: The plugin classes exported by the extension, empty if it exports none.
+
+        Raises:
+            ImportError: If the extension or any module it imports fails to import,
+                like a requirement that is not installed.
         """
-        try:
+        with profiler.phase(f"{extension_attr_chain}:import", "plugin"):
             module = import_module(extension_attr_chain)  # load extension
-        except ModuleNotFoundError:
-            return []
         plugins: List[Type[AbstractPlugin]] = []  # init yield list
         if not hasattr(module, "__all__"):
             return []
@@ -294,3 +1026,20 @@ class ExtensionManager:
                 plugins.append(plugin)
 
         return plugins
+
+    @staticmethod
+    def _import_plugin(extension_attr_chain: str) -> Sequence[Type[AbstractPlugin]]:
+        """
+        Import a plugin from the specified extension attribute chain.
+
+        Args:
+            extension_attr_chain (str): The chain of attributes specifying the location of the plugin.
+
+        Returns:
+            Sequence[Type[AbstractPlugin]]: A sequence of plugin classes that are subclasses of AbstractPlugin,
+                empty if a module is not found.
+        """
+        try:
+            return ExtensionManager.import_extension(extension_attr_chain)
+        except ModuleNotFoundError:
+            return []
@@ -11,7 +11,7 @@ import time
 from functools import singledispatch
 from json import JSONDecodeError
 from pathlib import Path
-from typing import List, Sequence, Any, Dict, TypeVar
+from typing import List, Sequence, Any, Dict, TypeVar, Optional
 from typing import Tuple
 
 import aiohttp
@@ -19,6 +19,8 @@ from PIL import Image
 from aiohttp import ClientResponse
 from pydantic import BaseModel, Field
 
+from modules.http_client import HttpClient
+
 
 class PersistentDict(BaseModel):
     class Config:
@@ -151,7 +153,9 @@ T_Generic = TypeVar("T_Generic")
 
 
 @singledispatch
-async def download_file(url: T_Generic, save_dir: str, force_download: bool = False) -> T_Generic:
+async def download_file(
+    url: T_Generic, save_dir: str, force_download: bool = False, client: Optional[HttpClient] = None
+) -> T_Generic:
     """
     Downloads a file from the given URL and saves it to the specified directory.
 
@@ -159,6 +163,8 @@ async def download_file(url: T_Generic, save_dir: str, force_download: bool = Fa
         url (str): The URL of the file to download.
         save_dir (str): The directory to save the downloaded file.
         force_download (bool, optional): Whether to force re-download it even it already exists.Defaults to False.
+        client (Optional[HttpClient], optional): The shared http client to use,
+            a temporary one is used if not provided. Defaults to None.
 
 
     Returns:
@@ -167,7 +173,9 @@ async def download_file(url: T_Generic, save_dir: str, force_download: bool = Fa
 
 
 @download_file.register(str)
-async def download_sigle_file(url: str, save_dir: str, force_download: bool = False) -> str:
+async def download_sigle_file(
+    url: str, save_dir: str, force_download: bool = False, client: Optional[HttpClient] = None
+) -> str:
     # Generate the file name using the MD5 hash of the URL
     url_hash = sha256_string(url)
 
@@ -177,18 +185,23 @@ async def download_sigle_file(url: str, save_dir: str, force_download: bool = Fa
     if not force_download and path.exists():
         return str(path)
 
-    # Download the file using aiohttp
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as response:
-            if response.status != 200:
-                raise aiohttp.ClientResponseError(response.request_info, history=response.history)
-            with open(path, "wb") as f:
-                f.write(await response.read())
+    # Download the file using the pooled client
+    http_client = client or HttpClient()
+    try:
+        response: ClientResponse = await http_client.get(url)
+    finally:
+        await http_client.close() if client is None else None
+    if response.status != 200:
+        raise aiohttp.ClientResponseError(response.request_info, history=response.history)
+    with open(path, "wb") as f:
+        f.write(await response.read())
     return str(path)
 
 
 @download_file.register(list)
-async def download_list(urls: List[str], save_dir: str, force_download: bool = False) -> List[str]:
+async def download_list(
+    urls: List[str], save_dir: str, force_download: bool = False, client: Optional[HttpClient] = None
+) -> List[str]:
     """
     该函数用于下载列表中所有URL对应的文件并保存到指定目录。
 
@@ -196,6 +209,7 @@ async def download_list(urls: List[str], save_dir: str, force_download: bool = F
     - url: 待下载文件的URL列表。
     - save_dir: 下载后保存文件的目录。
     - force_download: 是否强制下载文件，默认为False。
+    - client: 共享的HttpClient，未提供时使用临时客户端。
 
     返回值：
     - 下载完成后对应的文件路径列表。
@@ -211,15 +225,18 @@ async def download_list(urls: List[str], save_dir: str, force_download: bool = F
         if  pack ==[]:
             return original_file_list
         urls, file_list = zip(*pack)
-    async with aiohttp.ClientSession() as session:
-        responses: Tuple[ClientResponse] = await asyncio.gather(*[session.get(url_string) for url_string in urls])
-        for response, save_path in zip(responses, file_list):
-            response: ClientResponse
-            save_path: str
-            if response.status != 200:
-                raise aiohttp.ClientResponseError(response.request_info, history=response.history)
-            with open(save_path, "wb") as f:
-                f.write(await response.content.read())
+    http_client = client or HttpClient()
+    try:
+        responses: Tuple[ClientResponse] = await asyncio.gather(*[http_client.get(url_string) for url_string in urls])
+    finally:
+        await http_client.close() if client is None else None
+    for response, save_path in zip(responses, file_list):
+        response: ClientResponse
+        save_path: str
+        if response.status != 200:
+            raise aiohttp.ClientResponseError(response.request_info, history=response.history)
+        with open(save_path, "wb") as f:
+            f.write(await response.read())
     return original_file_list
 
 
@@ -347,6 +364,26 @@ def sha256_string(s: str) -> str:
     return hashlib.sha256(s.encode("utf-8")).hexdigest()
 
 
+def fingerprint_sources(directory: str | pathlib.Path) -> str:
+    """
+    Fingerprint the python sources under a directory by their paths, sizes and modification times.
+
+    Args:
+        directory (str | pathlib.Path): The directory of the sources.
+
+    Returns:
+        str: The hex digest of the fingerprint.
+    """
+    directory = pathlib.Path(directory)
+    digest = hashlib.sha1()
+    for source in sorted(directory.rglob("*.py")):
+        if "__pycache__" in source.parts:
+            continue
+        stat = source.stat()
+        digest.update(f"{source.relative_to(directory).as_posix()}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()
+
+
 def rename_image_with_hash(image_path: str) -> str:
     """
     Renames the image file at the specified path by appending a 6-character hash value
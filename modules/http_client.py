@@ -0,0 +1,195 @@
+"""
+http_client that is shared among the bot core and all the plugins
+"""
+import asyncio
+import time
+from typing import Any, Dict, NamedTuple, Optional, Tuple, Type
+from urllib.parse import urlsplit
+
+import aiohttp
+from aiohttp import ClientResponse, ClientSession, ClientTimeout, TCPConnector
+
+RETRY_STATUS: Tuple[int, ...] = (429, 500, 502, 503, 504)
+IDEMPOTENT_METHODS: Tuple[str, ...] = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+RETRY_EXCEPTIONS: Tuple[Type[Exception], ...] = (aiohttp.ClientConnectionError, asyncio.TimeoutError)
+
+
+class HttpClientConfig(NamedTuple):
+    """
+    Configuration settings for the shared http client.
+
+    Attributes:
+        limit (int, optional): The max count of simultaneous connections. Defaults to 100.
+        limit_per_host (int, optional): The max count of simultaneous connections to a single host. Defaults to 8.
+        keepalive_timeout (float, optional): Seconds an idle connection is kept alive. Defaults to 30.
+        timeout (float, optional): Seconds a whole request is allowed to take. Defaults to 30.
+        connect_timeout (float, optional): Seconds the connection establishment is allowed to take. Defaults to 10.
+        retries (int, optional): The max count of retries of a failed request. Defaults to 2.
+        backoff_factor (float, optional): The base of the exponential backoff between retries. Defaults to 0.5.
+        retry_non_idempotent (bool, optional): Whether to retry methods like POST. Defaults to False.
+    """
+
+    limit: int = 100
+    limit_per_host: int = 8
+    keepalive_timeout: float = 30
+    timeout: float = 30
+    connect_timeout: float = 10
+    retries: int = 2
+    backoff_factor: float = 0.5
+    retry_non_idempotent: bool = False
+
+
+class HostMetrics(object):
+    """
+    Request metrics collected for a single host
+    """
+
+    __slots__ = ("requests", "failures", "retries", "total_latency", "max_latency")
+
+    def __init__(self):
+        self.requests: int = 0
+        self.failures: int = 0
+        self.retries: int = 0
+        self.total_latency: float = 0.0
+        self.max_latency: float = 0.0
+
+    @property
+    def mean_latency(self) -> float:
+        return self.total_latency / self.requests if self.requests else 0.0
+
+    def record(self, latency: float, failed: bool) -> None:
+        """
+        Record a finished request.
+
+        Args:
+            latency (float): The seconds the request took, retries included.
+            failed (bool): Whether the request finally failed.
+
+        Returns:
+            None
+        """
+        self.requests += 1
+        self.failures += int(failed)
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+
+    def export(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "failures": self.failures,
+            "retries": self.retries,
+            "mean_latency": round(self.mean_latency, 4),
+            "max_latency": round(self.max_latency, 4),
+        }
+
+
+class HttpClient(object):
+    """
+    A pooled http client with keep-alive, per-host connection limits, timeouts, retries and metrics.
+
+    Notes:
+        the underlying session is created lazily inside the running event loop,
+        the responses returned are already read, so the body accessors can be used after the connection is released
+    """
+
+    def __init__(self, config: Optional[HttpClientConfig] = None):
+        self._config: HttpClientConfig = config or HttpClientConfig()
+        self._session: Optional[ClientSession] = None
+        self._metrics: Dict[str, HostMetrics] = {}
+
+    @property
+    def config(self) -> HttpClientConfig:
+        return self._config
+
+    @property
+    def closed(self) -> bool:
+        return self._session is None or self._session.closed
+
+    @property
+    def session(self) -> ClientSession:
+        """
+        Returns the underlying session, creates one if there is no open session.
+
+        Notes:
+            must be called inside a running event loop
+        """
+        if self.closed:
+            self._session = ClientSession(
+                connector=TCPConnector(
+                    limit=self._config.limit,
+                    limit_per_host=self._config.limit_per_host,
+                    keepalive_timeout=self._config.keepalive_timeout,
+                ),
+                timeout=ClientTimeout(total=self._config.timeout, connect=self._config.connect_timeout),
+            )
+        return self._session
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the request metrics of every requested host.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: host to its metrics
+        """
+        return {host: metric.export() for host, metric in self._metrics.items()}
+
+    async def request(
+        self, method: str, url: str, retries: Optional[int] = None, raise_for_status: bool = False, **kwargs
+    ) -> ClientResponse:
+        """
+        Send a request, retry it with exponential backoff on connection errors, timeouts and retryable status.
+
+        Args:
+            method (str): The http method.
+            url (str): The url to request.
+            retries (Optional[int], optional): Override the configured retry count. Defaults to None.
+            raise_for_status (bool, optional): Whether to raise on the 4xx and 5xx status. Defaults to False.
+            **kwargs: Extra params passed to aiohttp.ClientSession.request.
+
+        Returns:
+            ClientResponse: The response with its body already read.
+
+        Raises:
+            aiohttp.ClientError: If the request still fails after all the retries.
+            asyncio.TimeoutError: If the request still times out after all the retries.
+        """
+        method = method.upper()
+        if retries is None:
+            retries = self._config.retries if method in IDEMPOTENT_METHODS or self._config.retry_non_idempotent else 0
+        metric = self._metrics.setdefault(urlsplit(url).netloc, HostMetrics())
+        start = time.perf_counter()
+        attempt = 0
+        while True:
+            try:
+                async with self.session.request(method, url, **kwargs) as response:
+                    await response.read()
+                if response.status in RETRY_STATUS and attempt < retries:
+                    raise aiohttp.ClientResponseError(
+                        response.request_info, response.history, status=response.status, message=response.reason
+                    )
+                if raise_for_status:
+                    response.raise_for_status()
+                metric.record(time.perf_counter() - start, failed=response.status >= 400)
+                return response
+            except (*RETRY_EXCEPTIONS, aiohttp.ClientResponseError) as e:
+                retryable = isinstance(e, RETRY_EXCEPTIONS) or e.status in RETRY_STATUS
+                if not retryable or attempt >= retries:
+                    metric.record(time.perf_counter() - start, failed=True)
+                    raise
+                attempt += 1
+                metric.retries += 1
+                await asyncio.sleep(self._config.backoff_factor * (2 ** (attempt - 1)))
+
+    async def get(self, url: str, **kwargs) -> ClientResponse:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> ClientResponse:
+        return await self.request("POST", url, **kwargs)
+
+    async def close(self) -> None:
+        """
+        Close the underlying session and release all the pooled connections.
+        """
+        if not self.closed:
+            await self._session.close()
+        self._session = None
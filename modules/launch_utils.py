@@ -1,9 +1,14 @@
+import hashlib
 import importlib.metadata
+import json
 import os
 import re
+import site
 import subprocess
+import sys
+import sysconfig
 from pathlib import Path
-from typing import List, Set
+from typing import List, Set, Dict, Optional, Any
 
 from packaging import version
 
@@ -46,6 +51,91 @@ def requirements_met(requirements_file: str) -> bool:
     return True
 
 
+def resolve_installed_versions(requirements_file: str) -> Dict[str, Optional[str]]:
+    """
+    Resolve the installed versions of the packages listed in a requirements.txt file.
+
+    Args:
+        requirements_file (str): The path to the requirements.txt file.
+
+    Returns:
+        Dict[str, Optional[str]]: The package name to its installed version, None if not installed.
+    """
+    installed: Dict[str, Optional[str]] = {}
+    with open(requirements_file, "r", encoding="utf8") as file:
+        for line in file:
+            m = re.match(re_requirement, line)
+            if line.strip() == "" or m is None:
+                continue
+            try:
+                installed[m.group(1).strip()] = importlib.metadata.version(m.group(1).strip())
+            except ImportError:
+                installed[m.group(1).strip()] = None
+    return installed
+
+
+def environment_stamp() -> str:
+    """
+    Stamp the python environment by the interpreter and the modification times of the site-packages dirs,
+    installing or removing a package changes the modification time of the dir it lives in.
+
+    Returns:
+        str: The stamp of the environment.
+    """
+    site_dirs = {sysconfig.get_paths()["purelib"], sysconfig.get_paths()["platlib"], site.getusersitepackages()}
+    stamps = [sys.executable, sys.version]
+    for site_dir in sorted(site_dirs):
+        if os.path.isdir(site_dir):
+            stamps.append(f"{site_dir}:{os.stat(site_dir).st_mtime_ns}")
+    return "|".join(stamps)
+
+
+def requirements_fingerprint(req_files: List[Path]) -> str:
+    """
+    Fingerprint the requirements files along with the python environment they are checked against.
+
+    Args:
+        req_files (List[Path]): The requirements files.
+
+    Returns:
+        str: The hex digest of the fingerprint.
+    """
+    digest = hashlib.sha256(environment_stamp().encode())
+    for req_file in sorted(req_files):
+        digest.update(str(req_file).encode())
+        digest.update(req_file.read_bytes() if req_file.is_file() else b"")
+    return digest.hexdigest()
+
+
+def load_fingerprint_record(record_path: Path) -> Dict[str, Any]:
+    """
+    Load the record of the last successful requirements check, an empty dict if missing or broken.
+    """
+    try:
+        return json.loads(record_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def save_fingerprint_record(record_path: Path, fingerprint: str, installed: Dict[str, Optional[str]]) -> None:
+    """
+    Save the record of a successful requirements check.
+
+    Args:
+        record_path (Path): The path of the record file.
+        fingerprint (str): The fingerprint of the checked requirements and environment.
+        installed (Dict[str, Optional[str]]): The resolved installed versions of the required packages.
+
+    Returns:
+        None
+    """
+    record_path.parent.mkdir(parents=True, exist_ok=True)
+    record_path.write_text(
+        json.dumps({"fingerprint": fingerprint, "installed": installed}, indent=2, ensure_ascii=False),
+        encoding="utf-8",
+    )
+
+
 def merge_requirements(req_files: List[Path], output_path: Path):
     # 确保输出路径的父目录存在
     output_path.parent.mkdir(parents=True, exist_ok=True)
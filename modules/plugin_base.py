@@ -4,7 +4,7 @@ plugin_base that is used in create a standard plugin
 from abc import ABC, abstractmethod
 from functools import partial
 from types import MappingProxyType
-from typing import final, Callable, Type, List, Dict, TypeAlias, TypeVar
+from typing import final, Any, Callable, Type, List, Dict, NamedTuple, Sequence, TypeAlias, TypeVar, Optional
 
 from graia.broadcast import Namespace, BaseDispatcher, Decorator, Dispatchable, Broadcast
 
@@ -12,13 +12,37 @@ from constant import Value, EXTENSION_CONFIG_DIR
 from modules.auth.core import AuthorizationManager
 from modules.auth.permissions import Permission, PermissionCode
 from modules.auth.resources import required_perm_generator, RequiredPermission
+from modules.circuit_breaker import CircuitBreakerRegistry
 from modules.cmd import NameSpaceNode
 from modules.config_utils import ConfigRegistry
+from modules.http_client import HttpClient
+from modules.startup_profiler import profiler
 
 Plugin: TypeAlias = TypeVar("Plugin", bound="AbstractPlugin")
 PluginsView: TypeAlias = MappingProxyType[str, Plugin]
 
 
+class BenchScenario(NamedTuple):
+    """
+    A hot path of a plugin to benchmark, run by benchmarks.plugin_bench once the plugin is installed.
+
+    Attributes:
+        name (str): The name of the scenario, unique within the plugin.
+        operation (Callable[[Any], Any]): The operation, called with the data made by the setup,
+            could be a coroutine function.
+        setup (Optional[Callable[[int], Any]]): Makes the data of a size, its time is not counted,
+            the operation is called with the size itself if None. Defaults to None.
+        sizes (Sequence[int]): The data sizes the scenario is run with. Defaults to (1,).
+        number (int): The operations per timing. Defaults to 100.
+    """
+
+    name: str
+    operation: Callable[[Any], Any]
+    setup: Optional[Callable[[int], Any]] = None
+    sizes: Sequence[int] = (1,)
+    number: int = 100
+
+
 class AbstractPlugin(ABC):
     """
     Abstract plugin class
@@ -26,6 +50,17 @@ class AbstractPlugin(ABC):
 
     DefaultConfig: Dict[str, Value] = {}
 
+    # lazy plugins are imported and installed on the first use of their commands or events,
+    # must be assigned with a literal in the class body, since it is read from the source without importing
+    LazyLoad: bool = False
+
+    # isolated plugins run in a worker process, only their cmds and events are bridged to the bot,
+    # must be assigned with a literal in the class body, since it is read from the source without importing
+    Isolated: bool = False
+
+    # names of the plugins that must be installed before this one
+    Dependencies: List[str] = []
+
     @final
     @property
     def config_registry(self) -> ConfigRegistry:
@@ -54,6 +89,22 @@ class AbstractPlugin(ABC):
     def root_namespace_node(self) -> NameSpaceNode:
         return self._root_namespace_node
 
+    @final
+    @property
+    def http_client(self) -> HttpClient:
+        """
+        Returns: the pooled http client shared by the bot core and all the plugins.
+        """
+        return self._http_client
+
+    @final
+    @property
+    def circuit_breakers(self) -> CircuitBreakerRegistry:
+        """
+        Returns: the circuit breakers of the external backends, shared by the bot core and all the plugins.
+        """
+        return self._circuit_breakers
+
     @final
     @property
     def required_permission(self) -> RequiredPermission:
@@ -82,8 +133,24 @@ class AbstractPlugin(ABC):
         root_namespace_node: NameSpaceNode,
         broadcast: Broadcast,
         auth_manager: AuthorizationManager,
+        http_client: Optional[HttpClient] = None,
+        circuit_breakers: Optional[CircuitBreakerRegistry] = None,
     ):
+        """
+        Args:
+            plugins_viewer (PluginsView): The read-only view of the loaded plugins.
+            root_namespace_node (NameSpaceNode): The root of the cmd tree the plugin installs its nodes into.
+            broadcast (Broadcast): The broadcast the plugin listens to the events on.
+            auth_manager (AuthorizationManager): The authorization manager.
+            http_client (Optional[HttpClient], optional): The shared http client, owned and closed by the caller.
+                Defaults to None, only meant for the tests, which get a private client nobody closes.
+            circuit_breakers (Optional[CircuitBreakerRegistry], optional): The shared circuit breakers.
+                Defaults to None.
+        """
         self._auth_manager = auth_manager
+        # the fallback client is private to the plugin and never closed, the bot and the workers always pass theirs
+        self._http_client: HttpClient = http_client or HttpClient()
+        self._circuit_breakers: CircuitBreakerRegistry = circuit_breakers or CircuitBreakerRegistry()
         self._receiver = broadcast.receiver
         self._namespace: Namespace = broadcast.createNamespace(name=self.get_plugin_name(), disabled=True)
         self._namespace_uninstaller = broadcast.removeNamespace
@@ -91,8 +158,9 @@ class AbstractPlugin(ABC):
         self._plugin_view: PluginsView = plugins_viewer
         self._config_registry: ConfigRegistry = ConfigRegistry(f"{EXTENSION_CONFIG_DIR}/{self.get_plugin_name()}.json")
         self._root_namespace_node: NameSpaceNode = root_namespace_node
-        self.__register_default_config()
-        self._config_registry.load_config()
+        with profiler.phase(f"{self.get_plugin_name()}:config", "plugin"):
+            self.__register_default_config()
+            self._config_registry.load_config()
         self._su_perm = Permission(
             id=PermissionCode.SuperPermission.value,
             name=self.get_plugin_name(),
@@ -191,7 +259,7 @@ class AbstractPlugin(ABC):
     @abstractmethod
     def install(self):
         """
-        Install the plugin
+        Install the plugin, could be overridden with a coroutine method to install without blocking the others
         """
         pass
 
@@ -220,3 +288,10 @@ class AbstractPlugin(ABC):
         A description of the extra_uninstall function.
         """
         pass
+
+    def benchmark_scenarios(self) -> List[BenchScenario]:
+        """
+        Returns: the hot paths of the plugin to benchmark, asked for after the install, none by default.
+            The runner works in a temporary directory, so the relative paths written by the scenarios are discarded.
+        """
+        return []
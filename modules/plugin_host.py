@@ -0,0 +1,408 @@
+"""
+plugin_host that is used to run the isolated plugins in worker processes
+"""
+import asyncio
+import itertools
+import multiprocessing
+import pathlib
+import pickle
+import shutil
+import tempfile
+import threading
+from importlib import import_module
+from inspect import isawaitable, iscoroutinefunction
+from multiprocessing.connection import Connection
+from types import MappingProxyType
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from colorama import Fore
+from creart import it
+from graia.broadcast import Broadcast
+
+from modules.auth.core import AuthorizationManager, Root
+from modules.auth.permissions import Permission
+from modules.circuit_breaker import CircuitBreakerRegistry
+from modules.cmd import NameSpaceNode, ExecutableNode, T_CmdNode, set_su_permissions
+from modules.http_client import HttpClient
+from modules.plugin_base import AbstractPlugin, PluginsView
+from modules.plugin_manifest import PluginManifest
+
+# seconds a worker is allowed to take to import and install its plugin
+WORKER_START_TIMEOUT: float = 120.0
+
+
+class PluginWorkerError(RuntimeError):
+    """
+    Raised when a plugin worker fails to start, or dies while serving a call
+    """
+
+
+def export_node(node: T_CmdNode) -> Dict[str, Any]:
+    """
+    Export a cmd node as a picklable spec, the sources of the executable nodes are left out.
+
+    Args:
+        node (T_CmdNode): The node to export.
+
+    Returns:
+        Dict[str, Any]: The spec of the node, the children are exported recursively.
+    """
+    spec = {
+        "name": node.name,
+        "aliases": list(node.aliases),
+        "help_message": node.help_message,
+        "required_permissions": node.required_permissions,
+    }
+    if isinstance(node, NameSpaceNode):
+        spec["children"] = [export_node(child) for child in node.children_node]
+    else:
+        spec["doc"] = node.source.__doc__ if node.source else None
+    return spec
+
+
+async def _install(plugin: AbstractPlugin) -> None:
+    await plugin.install() if iscoroutinefunction(plugin.install) else plugin.install()
+
+
+async def _serve_execute(root: NameSpaceNode, permissions: List[Permission], path: List[str], args: List[str]) -> Any:
+    result = await root.get_node(path, permissions).get_execute(permissions, *args)
+    return await result if isawaitable(result) else result
+
+
+def _reply(conn: Connection, lock: threading.Lock, call_id: int, future) -> None:
+    try:
+        message = ("result", call_id, future.result())
+    except BaseException as e:
+        # the exceptions defined by the plugin can not be unpickled by the host, which never imports the plugin
+        message = ("error", call_id, e if type(e).__module__ == "builtins" else PluginWorkerError(f"{e!r}"))
+    with lock:
+        try:
+            conn.send(message)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            # the result or the exception can not cross the process boundary, send its text instead
+            kind, _, payload = message
+            conn.send((kind, call_id, str(payload) if kind == "result" else PluginWorkerError(repr(payload))))
+
+
+def _close_client(http_client: HttpClient, loop: asyncio.AbstractEventLoop, timeout: float = 5.0) -> None:
+    """
+    Close the http client of the worker in its loop, whether the loop is already served by its thread or not.
+    """
+    try:
+        if loop.is_running():
+            asyncio.run_coroutine_threadsafe(http_client.close(), loop).result(timeout)
+        else:
+            loop.run_until_complete(http_client.close())
+    except Exception as e:
+        print(f"{Fore.RED}Failed to close the http client of the worker: {e!r}{Fore.RESET}")
+
+
+def _worker_main(conn: Connection, extension: str, class_name: str, auth_config_path: str) -> None:
+    """
+    The entry of the worker process, installs the plugin then serves the calls until the pipe is closed.
+
+    Notes:
+        the worker works on a copy of the auth config, so it never writes the config of the bot
+    """
+    temp_dir = tempfile.mkdtemp(prefix="plugin_worker_")
+    # the suffix selects the storage of the auth config
+    auth_copy = pathlib.Path(temp_dir, f"auth{pathlib.Path(auth_config_path).suffix}")
+    if pathlib.Path(auth_config_path).exists():
+        shutil.copy(auth_config_path, auth_copy)
+    loop = it(asyncio.AbstractEventLoop)
+    # one client shared by the plugin, closed along with the worker
+    http_client = HttpClient()
+    try:
+        broadcast = Broadcast()
+        auth_manager = AuthorizationManager(**Root()._asdict(), config_file_path=auth_copy)
+        su_permissions = [auth_manager.__su_permission__]
+        set_su_permissions(su_permissions)
+        root = NameSpaceNode(name="root")
+        plugin_type: Type[AbstractPlugin] = getattr(import_module(extension), class_name)
+        plugin = plugin_type(MappingProxyType({}), root, broadcast, auth_manager, http_client, CircuitBreakerRegistry())
+        threading.Thread(target=loop.run_forever, daemon=True).start()
+        asyncio.run_coroutine_threadsafe(_install(plugin), loop).result()
+        plugin.enable()
+        events = sorted(
+            {
+                event.__name__
+                for listener in broadcast.listeners
+                if listener.namespace is plugin.namespace
+                for event in listener.listening_events
+            }
+        )
+        conn.send(("ready", 0, ([export_node(node) for node in root.children_node], events)))
+    except BaseException as e:
+        conn.send(("failed", 0, f"{type(e).__name__}: {e}"))
+        _close_client(http_client, loop)
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        return
+
+    lock = threading.Lock()
+    while True:
+        try:
+            kind, call_id, payload = conn.recv()
+        except (EOFError, OSError):
+            break
+        if kind == "stop":
+            break
+        if kind == "execute":
+            future = asyncio.run_coroutine_threadsafe(_serve_execute(root, su_permissions, *payload), loop)
+            future.add_done_callback(lambda done, call=call_id: _reply(conn, lock, call, done))
+        elif kind == "event":
+            loop.call_soon_threadsafe(broadcast.postEvent, payload)
+    plugin.uninstall()
+    _close_client(http_client, loop)
+    shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+class PluginWorker(object):
+    """
+    The host side of a worker process that runs a single plugin, the calls are sent over a pipe.
+
+    Notes:
+        the worker is spawned, so the plugin is imported only in the worker,
+        a dead worker fails all the pending calls and is spawned again on the next call
+    """
+
+    def __init__(self, extension: str, class_name: str, auth_config_path: str, call_timeout: float = 60.0):
+        self._target: Tuple[str, str, str] = (extension, class_name, auth_config_path)
+        self._call_timeout: float = call_timeout
+        self._context = multiprocessing.get_context("spawn")
+        self._process: Optional[multiprocessing.Process] = None
+        self._conn: Optional[Connection] = None
+        self._send_lock: threading.Lock = threading.Lock()
+        self._call_ids = itertools.count(1)
+        self._pending: Dict[int, Tuple[asyncio.AbstractEventLoop, asyncio.Future, Connection]] = {}
+        # set by the reply reader once the pipe is closed, which is noticed sooner than the exit of the process
+        self._exited: threading.Event = threading.Event()
+
+    @property
+    def alive(self) -> bool:
+        return self._process is not None and not self._exited.is_set() and self._process.is_alive()
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self._process.pid if self._process else None
+
+    def start(self) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """
+        Spawn the worker and wait for its plugin to be installed.
+
+        Returns:
+            Tuple[List[Dict[str, Any]], List[str]]: The specs of the root cmd nodes the plugin installed,
+                and the names of the events it listens to.
+
+        Raises:
+            PluginWorkerError: If the plugin fails to install, or the worker does not get ready in time.
+        """
+        self.stop()
+        host_conn, worker_conn = self._context.Pipe()
+        process = self._context.Process(target=_worker_main, args=(worker_conn, *self._target), daemon=True)
+        process.start()
+        worker_conn.close()
+        try:
+            if not host_conn.poll(WORKER_START_TIMEOUT):
+                raise PluginWorkerError(f"{self._target[1]} worker did not get ready in {WORKER_START_TIMEOUT}s")
+            kind, _, payload = host_conn.recv()
+        except (EOFError, OSError, PluginWorkerError) as e:
+            process.kill()
+            raise PluginWorkerError(f"{self._target[1]} worker died while starting: {e}") from e
+        if kind != "ready":
+            process.join(5)
+            raise PluginWorkerError(f"{self._target[1]} failed to install in the worker: {payload}")
+        self._process, self._conn, self._exited = process, host_conn, threading.Event()
+        threading.Thread(target=self._read_replies, args=(host_conn, self._exited), daemon=True).start()
+        return payload
+
+    def stop(self) -> None:
+        """
+        Stop the worker, waits a moment for it to uninstall the plugin before killing it.
+        """
+        if self._process is None:
+            return
+        try:
+            with self._send_lock:
+                self._conn.send(("stop", 0, None))
+        except (OSError, ValueError):
+            pass
+        self._process.join(5)
+        if self._process.is_alive():
+            self._process.kill()
+        self._conn.close()
+        self._process, self._conn = None, None
+
+    async def execute(self, path: List[str], args: List[str]) -> Any:
+        """
+        Execute the cmd node of the path in the worker, spawns the worker again if it is dead.
+
+        Args:
+            path (List[str]): The names from the root of the worker to the executable node.
+            args (List[str]): The arguments of the cmd.
+
+        Returns:
+            Any: The result of the cmd, its text if the result can not be pickled.
+
+        Raises:
+            PluginWorkerError: If the worker dies while executing.
+            asyncio.TimeoutError: If the cmd takes longer than the call timeout.
+        """
+        if not self.alive:
+            await asyncio.to_thread(self.start)
+        call_id = next(self._call_ids)
+        future = asyncio.get_running_loop().create_future()
+        try:
+            try:
+                self._send_call(call_id, future, path, args)
+            except OSError:
+                # the worker died after the liveness check
+                await asyncio.to_thread(self.start)
+                self._send_call(call_id, future, path, args)
+            return await asyncio.wait_for(future, self._call_timeout)
+        finally:
+            self._pending.pop(call_id, None)
+
+    def _send_call(self, call_id: int, future: asyncio.Future, path: List[str], args: List[str]) -> None:
+        with self._send_lock:
+            # the call is bound to the pipe it is sent through, only the reader of that pipe fails it
+            self._pending[call_id] = (future.get_loop(), future, self._conn)
+            self._conn.send(("execute", call_id, (path, args)))
+
+    def post_event(self, event: Any) -> bool:
+        """
+        Forward the event to the broadcast of the worker, returns False if the worker is dead or it can not be pickled.
+        """
+        if not self.alive:
+            return False
+        try:
+            with self._send_lock:
+                self._conn.send(("event", 0, event))
+        except (pickle.PicklingError, TypeError, AttributeError, OSError):
+            return False
+        return True
+
+    def _read_replies(self, conn: Connection, exited: threading.Event) -> None:
+        while True:
+            try:
+                kind, call_id, payload = conn.recv()
+            except (EOFError, OSError):
+                break
+            except Exception as e:
+                # a reply that can not be unpickled is dropped, its call times out
+                print(f"{Fore.RED}Dropped a reply of the {self._target[1]} worker: {e!r}{Fore.RESET}")
+                continue
+            if call_id in self._pending:
+                loop, future, _ = self._pending[call_id]
+                loop.call_soon_threadsafe(self._resolve, future, kind, payload)
+        # the worker is gone, nothing pending will ever be answered
+        exited.set()
+        for loop, future, _ in [pending for pending in list(self._pending.values()) if pending[2] is conn]:
+            loop.call_soon_threadsafe(
+                self._resolve, future, "error", PluginWorkerError(f"{self._target[1]} worker exited")
+            )
+
+    @staticmethod
+    def _resolve(future: asyncio.Future, kind: str, payload: Any) -> None:
+        if future.done():
+            return
+        future.set_result(payload) if kind == "result" else future.set_exception(payload)
+
+
+class IsolatedPlugin(AbstractPlugin):
+    """
+    The host side of a plugin that runs in a worker process, made from the manifest of the plugin.
+
+    The cmd nodes the plugin installs in the worker are mirrored under the root of the bot,
+    executing them calls the worker. The events the plugin listens to are forwarded to the worker,
+    the receivers can not reply through the ariadne app of the bot, so the cmds are the way to reply.
+    """
+
+    Manifest: PluginManifest
+
+    def __init__(
+        self,
+        plugins_viewer: PluginsView,
+        root_namespace_node: NameSpaceNode,
+        broadcast: Broadcast,
+        auth_manager: AuthorizationManager,
+        http_client: Optional[HttpClient] = None,
+        circuit_breakers: Optional[CircuitBreakerRegistry] = None,
+    ):
+        super().__init__(plugins_viewer, root_namespace_node, broadcast, auth_manager, http_client, circuit_breakers)
+        self._broadcast: Broadcast = broadcast
+        self._worker: PluginWorker = PluginWorker(
+            self.Manifest.extension, self.Manifest.class_name, self.auth_manager.config_file_path
+        )
+
+    @property
+    def worker(self) -> PluginWorker:
+        return self._worker
+
+    @classmethod
+    def get_plugin_name(cls) -> str:
+        return cls.Manifest.name
+
+    @classmethod
+    def get_plugin_description(cls) -> str:
+        return cls.Manifest.description
+
+    @classmethod
+    def get_plugin_version(cls) -> str:
+        return cls.Manifest.version
+
+    @classmethod
+    def get_plugin_author(cls) -> str:
+        return cls.Manifest.author
+
+    async def install(self):
+        node_specs, events = await asyncio.to_thread(self._worker.start)
+        for spec in node_specs:
+            self.root_namespace_node.add_node(self._make_node(spec, []))
+        for event_name in events:
+            event_type = self._broadcast.findEvent(event_name)
+            if event_type is None:
+                print(f"{Fore.YELLOW}{self.get_plugin_name()} listens to unknown event {event_name}{Fore.RESET}")
+                continue
+            self.receiver(event_type)(self._make_forwarder())
+
+    def extra_uninstall(self):
+        self._worker.stop()
+
+    def _make_node(self, spec: Dict[str, Any], parent_path: List[str]) -> T_CmdNode:
+        path = parent_path + [spec["name"]]
+        self.auth_manager.add_perm_from_req(spec["required_permissions"])
+        common = dict(
+            name=spec["name"],
+            aliases=spec["aliases"],
+            help_message=spec["help_message"],
+            required_permissions=spec["required_permissions"],
+        )
+        if "children" in spec:
+            return NameSpaceNode(**common, children_node=[self._make_node(child, path) for child in spec["children"]])
+        return ExecutableNode(**common, source=self._make_proxy(path, spec["doc"]))
+
+    def _make_proxy(self, path: List[str], doc: Optional[str]):
+        async def _proxy(*args):
+            return await self._worker.execute(path, [str(arg) for arg in args])
+
+        _proxy.__doc__ = doc
+        return _proxy
+
+    def _make_forwarder(self):
+        async def _forward():
+            self._worker.post_event(self._broadcast.event_ctx.get())
+
+        return _forward
+
+
+def isolated_plugin(manifest: PluginManifest) -> Type[IsolatedPlugin]:
+    """
+    Make the host side class of an isolated plugin from its manifest, the plugin itself is not imported.
+
+    Args:
+        manifest (PluginManifest): The manifest of the isolated plugin.
+
+    Returns:
+        Type[IsolatedPlugin]: The class to load in place of the plugin.
+    """
+    return type(manifest.class_name, (IsolatedPlugin,), {"Manifest": manifest})
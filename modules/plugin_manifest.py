@@ -0,0 +1,248 @@
+"""
+plugin_manifest that is used to discover the plugins without importing them
+"""
+import ast
+import json
+import pathlib
+from typing import List, Dict, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+META_METHODS: Tuple[str, ...] = (
+    "get_plugin_name",
+    "get_plugin_version",
+    "get_plugin_author",
+    "get_plugin_description",
+)
+LAZY_FLAG: str = "LazyLoad"
+# the method the plugins declare their benchmark scenarios with
+BENCHMARK_METHOD: str = "benchmark_scenarios"
+ISOLATED_FLAG: str = "Isolated"
+
+
+class ManifestError(ValueError):
+    """
+    Raised when the manifest of an extension can not be resolved statically
+    """
+
+
+class PluginManifest(BaseModel):
+    """
+    Static description of a single plugin.
+
+    Attributes:
+        extension (str): The attr chain of the extension that exports the plugin.
+        class_name (str): The name under which the extension exports the plugin.
+        name (str): The plugin name.
+        version (str): The plugin version.
+        author (str): The plugin author.
+        description (str): The plugin description.
+        lazy (bool): Whether the plugin is imported and installed on first use.
+        isolated (bool): Whether the plugin runs in a worker process.
+        learned (bool): Whether the command roots and the events are recorded from a finished install.
+        command_roots (List[str]): The names and aliases of the root commands the plugin installs.
+        events (List[str]): The names of the events the plugin listens to.
+        config_stamp (str): The stamp of the plugin config file when the plugin was installed.
+        benchmarked (bool): Whether the plugin declares benchmark scenarios.
+    """
+
+    extension: str
+    class_name: str
+    name: str
+    version: str = ""
+    author: str = ""
+    description: str = ""
+    lazy: bool = False
+    isolated: bool = False
+    learned: bool = False
+    command_roots: List[str] = Field(default_factory=list)
+    events: List[str] = Field(default_factory=list)
+    config_stamp: str = ""
+    benchmarked: bool = False
+
+
+class ExtensionManifest(BaseModel):
+    """
+    The manifests of all the plugins exported by an extension, with the fingerprint of its sources.
+    """
+
+    extension: str
+    fingerprint: str
+    plugins: List[PluginManifest] = Field(default_factory=list)
+
+
+def stamp_file(file_path: str | pathlib.Path) -> str:
+    """
+    Stamp a file by its size and modification time, an empty string if the file does not exist.
+    """
+    path = pathlib.Path(file_path)
+    if not path.exists():
+        return ""
+    stat = path.stat()
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def _literal(node: Optional[ast.AST]):
+    try:
+        return ast.literal_eval(node)
+    except (ValueError, TypeError, SyntaxError):
+        return None
+
+
+def _parse_source(source_path: pathlib.Path) -> ast.Module:
+    try:
+        return ast.parse(source_path.read_text(encoding="utf-8"), filename=str(source_path))
+    except (OSError, SyntaxError, UnicodeDecodeError) as e:
+        raise ManifestError(f"Can not parse {source_path}: {e}") from e
+
+
+def _exported_names(tree: ast.Module) -> List[str]:
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(
+            isinstance(target, ast.Name) and target.id == "__all__" for target in node.targets
+        ):
+            names = _literal(node.value)
+            if not isinstance(names, (list, tuple)) or not all(isinstance(name, str) for name in names):
+                raise ManifestError("__all__ must be a literal sequence of strings")
+            return list(names)
+    return []
+
+
+def _find_class(tree: ast.Module, class_name: str, package_path: pathlib.Path, depth: int = 0) -> ast.ClassDef:
+    """
+    Find the class definition of the name, follows the relative imports inside the extension package.
+    """
+    if depth > 8:
+        raise ManifestError(f"Too deep relative imports while resolving {class_name}")
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef) and node.name == class_name:
+            return node
+        if isinstance(node, ast.ImportFrom) and node.level == 1 and node.module:
+            for alias in node.names:
+                if (alias.asname or alias.name) != class_name:
+                    continue
+                module_path = package_path.joinpath(*node.module.split("."))
+                source_path = module_path / "__init__.py" if module_path.is_dir() else module_path.with_suffix(".py")
+                return _find_class(_parse_source(source_path), alias.name, source_path.parent, depth + 1)
+    raise ManifestError(f"Can not resolve the definition of {class_name} statically")
+
+
+def _class_meta(class_def: ast.ClassDef) -> Dict[str, object]:
+    meta: Dict[str, object] = {LAZY_FLAG: False, ISOLATED_FLAG: False, BENCHMARK_METHOD: False}
+    for node in class_def.body:
+        if isinstance(node, ast.FunctionDef) and node.name == BENCHMARK_METHOD:
+            meta[BENCHMARK_METHOD] = True
+        if isinstance(node, ast.FunctionDef) and node.name in META_METHODS:
+            returns = [sub.value for sub in ast.walk(node) if isinstance(sub, ast.Return)]
+            value = _literal(returns[0]) if len(returns) == 1 else None
+            if not isinstance(value, str):
+                raise ManifestError(f"{class_def.name}.{node.name} must return a literal string")
+            meta[node.name] = value
+        elif isinstance(node, ast.Assign):
+            for target in node.targets:
+                if isinstance(target, ast.Name) and target.id in (LAZY_FLAG, ISOLATED_FLAG):
+                    meta[target.id] = bool(_literal(node.value))
+        elif isinstance(node, ast.AnnAssign) and isinstance(node.target, ast.Name):
+            if node.target.id in (LAZY_FLAG, ISOLATED_FLAG):
+                meta[node.target.id] = bool(_literal(node.value))
+    if "get_plugin_name" not in meta:
+        raise ManifestError(f"{class_def.name} does not define get_plugin_name")
+    return meta
+
+
+def parse_extension(extension_path: pathlib.Path, extension: str) -> List[PluginManifest]:
+    """
+    Build the manifests of the plugins exported by an extension, by parsing its sources without importing them.
+
+    Args:
+        extension_path (pathlib.Path): The directory of the extension.
+        extension (str): The attr chain used to import the extension.
+
+    Returns:
+        List[PluginManifest]: The manifests of the exported plugins, empty if the extension is not a package.
+
+    Raises:
+        ManifestError: If any exported plugin can not be resolved statically.
+    """
+    init_path = extension_path / "__init__.py"
+    if not init_path.exists():
+        return []
+    tree = _parse_source(init_path)
+    manifests: List[PluginManifest] = []
+    for class_name in _exported_names(tree):
+        meta = _class_meta(_find_class(tree, class_name, extension_path))
+        manifests.append(
+            PluginManifest(
+                extension=extension,
+                class_name=class_name,
+                name=meta["get_plugin_name"],
+                version=meta.get("get_plugin_version", ""),
+                author=meta.get("get_plugin_author", ""),
+                description=meta.get("get_plugin_description", ""),
+                lazy=meta[LAZY_FLAG],
+                isolated=meta[ISOLATED_FLAG],
+                benchmarked=meta[BENCHMARK_METHOD],
+            )
+        )
+    return manifests
+
+
+class ManifestCache(object):
+    """
+    The json file that caches the manifests of the extensions, keyed by the extension attr chain
+    """
+
+    def __init__(self, cache_path: str | pathlib.Path):
+        self._cache_path: pathlib.Path = pathlib.Path(cache_path)
+        self._manifests: Dict[str, ExtensionManifest] = {}
+        self._dirty: bool = False
+        self.load()
+
+    def load(self) -> None:
+        if not self._cache_path.exists():
+            return
+        try:
+            raw: Dict[str, Dict] = json.loads(self._cache_path.read_text(encoding="utf-8"))
+            self._manifests = {key: ExtensionManifest.parse_obj(value) for key, value in raw.items()}
+        except (OSError, ValueError):
+            # a broken cache is simply rebuilt
+            self._manifests = {}
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        self._cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self._cache_path, "w", encoding="utf-8") as f:
+            json.dump({key: value.dict() for key, value in self._manifests.items()}, f, indent=2, ensure_ascii=False)
+        self._dirty = False
+
+    def get(self, extension: str, fingerprint: str) -> Optional[ExtensionManifest]:
+        """
+        Get the cached manifest of the extension, None if missing or the fingerprint does not match.
+        """
+        cached = self._manifests.get(extension)
+        return cached if cached is not None and cached.fingerprint == fingerprint else None
+
+    def put(self, manifest: ExtensionManifest) -> None:
+        self._manifests[manifest.extension] = manifest
+        self._dirty = True
+
+    def plugins_of(self, plugin_name: str) -> List[PluginManifest]:
+        """
+        Get the cached manifests of the plugin with the name.
+        """
+        return [
+            plugin for manifest in self._manifests.values() for plugin in manifest.plugins if plugin.name == plugin_name
+        ]
+
+    def update_plugin(self, plugin_manifest: PluginManifest) -> None:
+        """
+        Replace the cached manifest of a single plugin, ignored if its extension is not cached.
+        """
+        cached = self._manifests.get(plugin_manifest.extension)
+        if cached is None:
+            return
+        cached.plugins = [
+            plugin_manifest if plugin.name == plugin_manifest.name else plugin for plugin in cached.plugins
+        ]
+        self._dirty = True
@@ -1,4 +1,5 @@
 from .auth.core import Permission, Resource, User, RequiredPermission, Role, PermissionCode, required_perm_generator
+from .circuit_breaker import CircuitBreaker, CircuitBreakerRegistry, CircuitOpenError
 from .cmd import (
     NameSpaceNode,
     ExecutableNode,
@@ -27,10 +28,12 @@ from .file_manager import (
     PersistentDict,
     sha256_string,
 )
-from .plugin_base import AbstractPlugin
+from .http_client import HttpClient, HttpClientConfig
+from .plugin_base import AbstractPlugin, BenchScenario
 
 __all__ = [
     "AbstractPlugin",
+    "BenchScenario",
     "Permission",
     "PermissionCode",
     "required_perm_generator",
@@ -62,4 +65,9 @@ __all__ = [
     "assemble_cmd_regex_parts",
     "EnumCMD",
     "dict_to_markdown_table_complex",
+    "HttpClient",
+    "HttpClientConfig",
+    "CircuitBreaker",
+    "CircuitBreakerRegistry",
+    "CircuitOpenError",
 ]
@@ -0,0 +1,153 @@
+"""
+startup_profiler that is used to find out where the cold start goes
+"""
+import json
+import pathlib
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import List, NamedTuple, Iterator, Dict, Any
+
+
+class ProfileRecord(NamedTuple):
+    """
+    A finished phase of the startup.
+
+    Attributes:
+        name (str): The name of the phase, the plugin phases are named like "<plugin>:<step>".
+        category (str): The category of the phase, "phase" for the core phases, "plugin" for the plugin steps.
+        start (float): Seconds from the enabling of the profiler to the start of the phase.
+        duration (float): Seconds the phase took.
+        memory (int): Bytes allocated and still held at the end of the phase.
+        depth (int): The nesting depth of the phase.
+    """
+
+    name: str
+    category: str
+    start: float
+    duration: float
+    memory: int
+    depth: int
+
+
+class StartupProfiler(object):
+    """
+    Records the wall time and the allocated memory of the startup phases.
+
+    Notes:
+        does nothing until enabled, so the phases could be left in place at no cost,
+        the memory of the phases running concurrently are counted into each other
+    """
+
+    def __init__(self):
+        self._enabled: bool = False
+        self._origin: float = 0.0
+        self._depth: int = 0
+        self._records: List[ProfileRecord] = []
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    @property
+    def records(self) -> List[ProfileRecord]:
+        return list(self._records)
+
+    def enable(self) -> None:
+        """
+        Start profiling, the memory is traced from now on.
+        """
+        if self._enabled:
+            return
+        self._enabled = True
+        self._origin = time.perf_counter()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def disable(self) -> None:
+        self._enabled = False
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    @contextmanager
+    def phase(self, name: str, category: str = "phase") -> Iterator[None]:
+        """
+        Record the phase run inside the context.
+
+        Args:
+            name (str): The name of the phase.
+            category (str, optional): The category of the phase. Defaults to "phase".
+        """
+        if not self._enabled:
+            yield
+            return
+        start = time.perf_counter()
+        memory = tracemalloc.get_traced_memory()[0]
+        depth = self._depth
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth = depth
+            self._records.append(
+                ProfileRecord(
+                    name=name,
+                    category=category,
+                    start=start - self._origin,
+                    duration=time.perf_counter() - start,
+                    memory=tracemalloc.get_traced_memory()[0] - memory,
+                    depth=depth,
+                )
+            )
+
+    def report(self) -> str:
+        """
+        Returns a table of all the recorded phases, sorted by the time they took.
+        """
+        if not self._records:
+            return "No startup phase recorded"
+        lines = [f"|{'Phase':<40}|{'Category':^10}|{'Time(s)':^10}|{'Memory(KiB)':^12}|"]
+        for record in sorted(self._records, key=lambda x: x.duration, reverse=True):
+            lines.append(
+                f"|{record.name:<40}|{record.category:^10}|{record.duration:>10.4f}|{record.memory / 1024:>12.1f}|"
+            )
+        return "\n".join(lines)
+
+    def export(self) -> Dict[str, Any]:
+        """
+        Export the records in the chrome trace event format, with the memory attached as args.
+        """
+        return {
+            "displayTimeUnit": "ms",
+            "traceEvents": [
+                {
+                    "name": record.name,
+                    "cat": record.category,
+                    "ph": "X",
+                    "ts": round(record.start * 1e6),
+                    "dur": round(record.duration * 1e6),
+                    "pid": 0,
+                    "tid": 0,
+                    "args": {"memory": record.memory, "depth": record.depth},
+                }
+                for record in self._records
+            ],
+        }
+
+    def dump(self, trace_path: str | pathlib.Path) -> None:
+        """
+        Write the json trace, could be loaded by chrome://tracing or compared between releases.
+
+        Args:
+            trace_path (str | pathlib.Path): The path to write the trace to.
+
+        Returns:
+            None
+        """
+        path = pathlib.Path(trace_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.export(), f, indent=2)
+
+
+profiler: StartupProfiler = StartupProfiler()
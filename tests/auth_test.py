@@ -1,17 +1,25 @@
 import asyncio
+import gc
 import json
 import pathlib
+import sqlite3
+import threading
 import unittest
+from types import SimpleNamespace
+from typing import List
+from unittest import mock
 from colorama import Fore, Back
 
 from constant import CONFIG_DIR
+from launch import make_can_cmd
 from modules.auth.core import AuthorizationManager
-from modules.auth.permissions import Permission
+from modules.auth.permissions import Permission, PermissionInterner
+from modules.auth.records import UserRecord, RoleRecord
 from modules.auth.resources import Resource, RequiredPermission, required_perm_generator, ResourceManager
-from modules.auth.roles import Role
+from modules.auth.roles import Role, RoleCycleError, resolve_role_closure
 from modules.auth.users import User, UserManager
 from modules.auth.utils import make_label, extract_label
-from modules.cmd import NameSpaceNode, ExecutableNode
+from modules.cmd import NameSpaceNode, ExecutableNode, path_checks, list_accessible_paths
 
 
 def hello_world():
@@ -128,6 +136,61 @@ class ToolsTest(unittest.TestCase):
         print(src.get_read([self.su]))
 
 
+class ReadViewTest(unittest.TestCase):
+    def setUp(self):
+        self.su = Permission(id=32, name="su")
+        self.source = {"words": ["a", "b"], "meta": {"tags": {"x"}}}
+        self.resource = Resource(
+            source=self.source,
+            id=1,
+            name="corpus",
+            required_permissions=required_perm_generator(target_resource_name="corpus", super_permissions=[self.su]),
+        )
+
+    def test_view(self):
+        view = self.resource.get_read([self.su])
+        self.assertEqual(["a", "b"], view["words"])
+        self.assertIn("x", view["meta"]["tags"])
+        with self.assertRaises(TypeError):
+            view["words"] = []
+        with self.assertRaises(AttributeError):
+            view["words"].append("c")
+        # the view follows the source
+        self.source["words"].append("c")
+        self.assertEqual(3, len(view["words"]))
+
+    def test_deep_copy(self):
+        copied = self.resource.get_read([self.su], deep_copy=True)
+        copied["words"].append("c")
+        self.assertEqual(["a", "b"], self.source["words"])
+
+
+class PermissionInternTest(unittest.TestCase):
+    def setUp(self):
+        self.interner = Permission.__interner__
+        Permission.__interner__ = PermissionInterner(maxsize=2)
+
+    def tearDown(self):
+        Permission.__interner__ = self.interner
+
+    def test_intern(self):
+        read = Permission(id=1, name="intern")
+        # keyed by the full name, so the suffixed name takes the same instance
+        self.assertIs(read, Permission(id=1, name="internReadPermission"))
+        execute = Permission(id=2, name="intern")
+        self.assertIsNot(read, execute)
+        self.assertIs(read, Role(id=1, name="holder", permissions=[read]).permissions[0])
+        self.assertEqual(1, Permission.intern_stats().hits)
+
+        # the table is full
+        Permission(id=4, name="intern")
+        self.assertEqual(1, Permission.intern_stats().overflows)
+
+        del read, execute
+        gc.collect()
+        self.assertEqual(0, Permission.intern_stats().size)
+
+
 class ResourceManagerTest(unittest.TestCase):
     def setUp(self):
         self._config_file_path = f"../{CONFIG_DIR}/test.json"
@@ -323,5 +386,370 @@ class CmdNodeTest(unittest.TestCase):
             self.root.get_node(["perm_test", "modify_test", "empty", "i am empty"], [su_perm] + test_req_perm.read)
 
 
+class WarmStartTest(unittest.TestCase):
+    def setUp(self):
+        self.config_file_path = f"{CONFIG_DIR}/warm_start_test.json"
+        self.snapshot_path = f"{CONFIG_DIR}/warm_start_test.pickle"
+        manager = AuthorizationManager(id=1, name="authManager", config_file_path=self.config_file_path)
+        manager.add_perm_from_info(1, "hall")
+        manager.add_role(role_id=1, role_name="hall", role_perms=["1-hallReadPermission"])
+        manager.add_user(user_id=5, user_name="warm", user_roles=["1-hall"])
+
+    def tearDown(self):
+        pathlib.Path(self.config_file_path).unlink(missing_ok=True)
+        pathlib.Path(self.snapshot_path).unlink(missing_ok=True)
+
+    def _load(self) -> AuthorizationManager:
+        return AuthorizationManager(
+            id=1, name="authManager", config_file_path=self.config_file_path, warm_start_path=self.snapshot_path
+        )
+
+    def test_warm_start(self):
+        cold = self._load()
+        self.assertTrue(pathlib.Path(self.snapshot_path).exists())
+        warm = self._load()
+        self.assertEqual(set(cold._users.object_dict), set(warm._users.object_dict))
+        self.assertEqual(cold.dict(), warm.dict())
+        self.assertEqual(
+            ["1-hallReadPermission"], [perm.unique_label for perm in warm.get_user(5)[0].roles[0].permissions]
+        )
+
+    def test_stale_snapshot(self):
+        self._load()
+        stale = AuthorizationManager(id=1, name="authManager", config_file_path=self.config_file_path)
+        stale.add_user(user_id=6, user_name="late")
+        self.assertEqual(1, len(self._load().get_user(6)))
+
+    def test_broken_snapshot(self):
+        pathlib.Path(self.snapshot_path).write_bytes(b"broken")
+        self.assertEqual(1, len(self._load().get_user(5)))
+
+
+class SingleParseLoadTest(unittest.TestCase):
+    def setUp(self):
+        self.config_file_path = f"{CONFIG_DIR}/single_parse_load_test.json"
+        manager = AuthorizationManager(id=1, name="authManager", config_file_path=self.config_file_path)
+        manager.add_resource(resource_id=2, resource_name="res", source=None)
+        manager.add_role(role_id=3, role_name="member", role_perms=["2-resExecutePermission"])
+        manager.add_user(user_id=10, user_name="loaded", user_roles=["3-member"])
+
+    def tearDown(self):
+        pathlib.Path(self.config_file_path).unlink(missing_ok=True)
+
+    def _dump(self, manager: AuthorizationManager) -> List[str]:
+        return sorted(
+            str(obj.dict()) for obj in manager.users + manager.roles + manager.permissions + manager.resources
+        )
+
+    def test_single_parse(self):
+        with mock.patch("modules.auth.storage.json.load", wraps=json.load) as parse:
+            validated = AuthorizationManager(id=1, name="authManager", config_file_path=self.config_file_path)
+        self.assertEqual(1, parse.call_count)
+
+        trusted = AuthorizationManager(
+            id=1, name="authManager", config_file_path=self.config_file_path, trusted_load=True
+        )
+        self.assertEqual(self._dump(validated), self._dump(trusted))
+        self.assertIsInstance(trusted.get_user(user_id=10)[0].roles[0], Role)
+
+
+class RecordTest(unittest.TestCase):
+    def test_records(self):
+        read = Permission(id=1, name="record")
+        member = Role(id=3, name="member", permissions=[read])
+        users = [User(id=user_id, name="recorded", roles=[member]) for user_id in (10, 11)]
+        memo = {}
+        records = [UserRecord.from_model(user, memo) for user in users]
+
+        # the role shared by the users is recorded once
+        self.assertIs(records[0].roles[0], records[1].roles[0])
+        self.assertIn(read, records[0].roles[0])
+        self.assertIn(member, records[0])
+        self.assertEqual(frozenset([read]), records[0].permissions)
+        with self.assertRaises(AttributeError):
+            records[0].name = "changed"
+
+        self.assertEqual(users[0].dict(), records[0].to_model().dict())
+        self.assertEqual(member, RoleRecord.from_model(member).to_model())
+
+
+class EffectivePermissionsTest(unittest.TestCase):
+    def setUp(self):
+        self.config_file_path = f"{CONFIG_DIR}/effective_permissions_test.json"
+        self.manager = AuthorizationManager(id=1, name="authManager", config_file_path=self.config_file_path)
+        self.manager.add_perm_from_info(perm_id=2, perm_name="echo")
+        self.manager.add_role(role_id=3, role_name="member")
+        self.manager.add_user(user_id=10, user_name="sender")
+        self.manager.add_user(user_id=20, user_name="group", user_roles=["3-member"])
+
+    def tearDown(self):
+        pathlib.Path(self.config_file_path).unlink(missing_ok=True)
+
+    def test_cache_and_invalidation(self):
+        effective = self.manager.resolve_permissions(20, 10)
+        self.assertIs(effective, self.manager.resolve_permissions(20, 10))
+        self.assertEqual((frozenset(),), effective.role_permissions)
+
+        self.manager.grant_perm_to_role("2-echoExecutePermission", "3-member")
+        effective = self.manager.resolve_permissions(20, 10)
+        self.assertIn(Permission(id=2, name="echo"), effective.permissions)
+
+        self.manager.grant_role_to_user("0-root", "10-sender")
+        self.assertEqual(2, len(self.manager.resolve_permissions(20, 10).role_permissions))
+
+        self.manager.remove_user(user_id=20, user_name="group")
+        self.assertNotIn(Permission(id=2, name="echo"), self.manager.resolve_permissions(20, 10).permissions)
+        self.assertEqual(frozenset(), self.manager.resolve_permissions(30).permissions)
+
+
+class AuthTablesTest(unittest.TestCase):
+    def setUp(self):
+        self.config_file_path = f"{CONFIG_DIR}/auth_tables_test.json"
+        self.manager = AuthorizationManager(id=1, name="authManager", config_file_path=self.config_file_path)
+        for perm_name in ("chat", "ban"):
+            self.manager.add_perm_from_info(perm_id=2, perm_name=perm_name)
+        self.manager.add_role(role_id=3, role_name="member", role_perms=["2-chatExecutePermission"])
+        self.manager.add_user(user_id=10, user_name="alice", user_roles=["3-member"])
+        self.chat = Permission(id=2, name="chatExecutePermission")
+        self.ban = Permission(id=2, name="banExecutePermission")
+
+    def tearDown(self):
+        pathlib.Path(self.config_file_path).unlink(missing_ok=True)
+
+    def test_published_tables(self):
+        tables = self.manager.tables()
+        self.assertIs(tables, self.manager.tables())
+        self.manager.grant_perm_to_role("2-banExecutePermission", "3-member")
+
+        # the tables held by a reader are never changed
+        self.assertNotIn(self.ban, tables.resolve(10).permissions)
+        self.assertIsNot(tables, self.manager.tables())
+        self.assertIn(self.ban, self.manager.resolve_permissions(10).permissions)
+        with self.assertRaises(TypeError):
+            tables.closure["3-member"] = frozenset()
+
+    def test_incremental_tables(self):
+        tables = self.manager.tables()
+        self.manager.add_user(user_id=11, user_name="bob", user_roles=["3-member"])
+        self.manager.remove_user(user_id=1, user_name="authManager")
+
+        # the records of the users unchanged are shared with the former tables
+        self.assertIs(tables.user_records(10)[0], self.manager.get_user_records(10)[0])
+        self.assertIn(self.chat, self.manager.resolve_permissions(11).permissions)
+        self.assertEqual((), self.manager.get_user_records(1))
+
+    def test_batch_is_atomic(self):
+        with self.manager.batch():
+            self.manager.add_role(role_id=4, role_name="admin", role_perms=["2-banExecutePermission"])
+            self.manager.grant_role_to_user("4-admin", "10-alice")
+            self.assertNotIn(self.ban, self.manager.resolve_permissions(10).permissions)
+        self.assertIn(self.ban, self.manager.resolve_permissions(10).permissions)
+
+    def test_reader_does_not_block(self):
+        entered, release = threading.Event(), threading.Event()
+
+        def _write():
+            with self.manager.batch():
+                self.manager.grant_perm_to_role("2-banExecutePermission", "3-member")
+                entered.set()
+                release.wait(5)
+
+        writer = threading.Thread(target=_write)
+        writer.start()
+        try:
+            self.assertTrue(entered.wait(5))
+            # the writer holds the lock, the reader takes the tables published before the batch
+            self.assertEqual(frozenset([self.chat]), self.manager.resolve_permissions(10).permissions)
+        finally:
+            release.set()
+            writer.join()
+        self.assertIn(self.ban, self.manager.resolve_permissions(10).permissions)
+
+
+class RoleInheritanceTest(unittest.TestCase):
+    def setUp(self):
+        self.config_file_path = f"{CONFIG_DIR}/role_inheritance_test.json"
+        self.manager = AuthorizationManager(id=1, name="authManager", config_file_path=self.config_file_path)
+        for perm_name in ("chat", "mute", "ban"):
+            self.manager.add_perm_from_info(perm_id=2, perm_name=perm_name)
+        self.manager.add_role(role_id=3, role_name="member", role_perms=["2-chatExecutePermission"])
+        self.manager.add_role(role_id=4, role_name="moderator", role_perms=["2-muteExecutePermission"])
+        self.manager.add_role(role_id=5, role_name="admin", role_perms=["2-banExecutePermission"])
+        self.manager.grant_parent_to_role("3-member", "4-moderator")
+        self.manager.grant_parent_to_role("4-moderator", "5-admin")
+        self.manager.add_user(user_id=10, user_name="admin", user_roles=["5-admin"])
+
+    def tearDown(self):
+        pathlib.Path(self.config_file_path).unlink(missing_ok=True)
+        pathlib.Path(self.config_file_path).with_suffix(".db").unlink(missing_ok=True)
+
+    def test_closure(self):
+        chat = Permission(id=2, name="chat")
+        self.assertIn(chat, self.manager.role_closure()["5-admin"])
+        self.assertIn(chat, self.manager.resolve_permissions(10).permissions)
+
+        self.manager.revoke_parent_from_role("4-moderator", "5-admin")
+        self.assertNotIn(chat, self.manager.resolve_permissions(10).permissions)
+
+    def test_cycle(self):
+        with self.assertRaises(RoleCycleError):
+            self.manager.grant_parent_to_role("5-admin", "3-member")
+        with self.assertRaises(RoleCycleError):
+            self.manager.grant_parent_to_role("3-member", "3-member")
+        roles = {role.unique_label: role for role in self.manager.roles}
+        self.assertEqual([], roles["3-member"].parents)
+
+        roles["3-member"].parents.append("5-admin")
+        with self.assertRaises(RoleCycleError):
+            resolve_role_closure(roles, strict=True)
+        with self.assertWarns(UserWarning):
+            resolve_role_closure(roles)
+
+    def test_stored(self):
+        for path in (self.config_file_path, pathlib.Path(self.config_file_path).with_suffix(".db")):
+            reloaded = AuthorizationManager(id=1, name="authManager", config_file_path=path)
+            self.assertIn(Permission(id=2, name="chat"), reloaded.resolve_permissions(10).permissions)
+            reloaded._storage.close() if hasattr(reloaded._storage, "close") else None
+
+
+class PermissionIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.config_file_path = f"{CONFIG_DIR}/permission_index_test.json"
+        self.manager = AuthorizationManager(id=1, name="authManager", config_file_path=self.config_file_path)
+        for perm_name in ("chat", "ban"):
+            self.manager.add_perm_from_info(perm_id=2, perm_name=perm_name)
+        self.manager.add_role(role_id=3, role_name="member", role_perms=["2-chatExecutePermission"])
+        self.manager.add_role(role_id=4, role_name="admin", role_perms=["2-banExecutePermission"])
+        self.manager.grant_parent_to_role("3-member", "4-admin")
+        self.manager.add_user(user_id=10, user_name="alice", user_roles=["3-member"])
+        self.manager.add_user(user_id=11, user_name="bob", user_roles=["4-admin"])
+        self.chat = Permission(id=2, name="chatExecutePermission")
+        self.ban = Permission(id=2, name="banExecutePermission")
+        self.root = NameSpaceNode(
+            name="root",
+            children_node=[
+                ExecutableNode(
+                    name="say", source=lambda: "", required_permissions=RequiredPermission(execute=[self.chat])
+                ),
+                NameSpaceNode(
+                    name="mod",
+                    required_permissions=RequiredPermission(read=[self.ban]),
+                    children_node=[ExecutableNode(name="kick", source=lambda: "")],
+                ),
+            ],
+        )
+
+    def tearDown(self):
+        pathlib.Path(self.config_file_path).unlink(missing_ok=True)
+
+    def _who(self, *path: str) -> List[str]:
+        return [user.unique_label for user in self.manager.who_can(path_checks(self.root, list(path)))]
+
+    def test_who(self):
+        self.assertEqual(["10-alice", "11-bob"], self._who("say"))
+        self.assertEqual(["11-bob"], self._who("mod", "kick"))
+        with self.assertRaises(KeyError):
+            self._who("mod", "ban")
+
+    def test_incremental(self):
+        index = self.manager.permission_index()
+        with mock.patch.object(index, "clear_users", wraps=index.clear_users) as clear_users:
+            self.manager.add_user(user_id=12, user_name="carol")
+            self.assertEqual(["10-alice", "11-bob"], self._who("say"))
+            self.manager.grant_role_to_user("4-admin", "12-carol")
+            self.assertEqual(["11-bob", "12-carol"], self._who("mod", "kick"))
+            self.manager.remove_user(user_id=11, user_name="bob")
+            self.assertEqual(["12-carol"], self._who("mod", "kick"))
+        clear_users.assert_not_called()
+
+        self.manager.revoke_parent_from_role("3-member", "4-admin")
+        self.assertEqual(["10-alice"], self._who("say"))
+
+    def test_can(self):
+        role_permissions = self.manager.resolve_permissions(10).role_permissions
+        self.assertEqual(["say"], list_accessible_paths(self.root, role_permissions))
+        role_permissions = self.manager.resolve_permissions(11).role_permissions
+        self.assertEqual(["mod kick", "say"], list_accessible_paths(self.root, role_permissions))
+
+    def test_can_cmd(self):
+        can = make_can_cmd(SimpleNamespace(auth_manager=self.manager, root=self.root))
+        # the pseudo-user of a group that grants the admin role to its members
+        self.manager.add_user(user_id=20, user_name="group", user_roles=["4-admin"])
+        self.assertEqual("say", can("10"))
+        self.assertEqual("mod kick\nsay", can("10", "20"))
+        self.assertTrue(can("alice").startswith("Invalid user id"))
+        self.assertTrue(can("10", "group").startswith("Invalid user id"))
+
+
+class BatchSaveTest(unittest.TestCase):
+    def setUp(self):
+        self.config_file_path = f"{CONFIG_DIR}/batch_save_test.json"
+        self.manager = AuthorizationManager(id=1, name="authManager", config_file_path=self.config_file_path)
+        self.manager.flush()
+
+    def tearDown(self):
+        pathlib.Path(self.config_file_path).unlink(missing_ok=True)
+
+    def _saved_users(self) -> List[str]:
+        with open(self.config_file_path, "r", encoding="utf-8") as f:
+            return [make_label(user["id"], user["name"]) for user in json.load(f)["Users"]]
+
+    def test_batch(self):
+        with self.manager.batch():
+            for user_id in range(10, 20):
+                self.manager.add_user(user_id=user_id, user_name="batch")
+            self.assertNotIn("10-batch", self._saved_users())
+        self.assertIn("19-batch", self._saved_users())
+        self.assertFalse(pathlib.Path(f"{self.config_file_path}.tmp").exists())
+        # nothing changed since the last write
+        self.assertFalse(self.manager.flush())
+
+    def test_debounced_flush(self):
+        self.manager.flush_delay = 0.05
+
+        async def _mutate():
+            self.manager.add_user(user_id=10, user_name="debounced")
+            self.manager.grant_role_to_user("0-root", "10-debounced")
+            self.assertNotIn("10-debounced", self._saved_users())
+            await asyncio.sleep(0.1)
+            self.assertIn("10-debounced", self._saved_users())
+
+        asyncio.run(_mutate())
+
+
+class SqliteStorageTest(unittest.TestCase):
+    def setUp(self):
+        self.json_path = f"{CONFIG_DIR}/sqlite_storage_test.json"
+        self.db_path = f"{CONFIG_DIR}/sqlite_storage_test.db"
+        manager = AuthorizationManager(id=1, name="authManager", config_file_path=self.json_path)
+        manager.add_role(role_id=3, role_name="member")
+        manager.add_user(user_id=10, user_name="migrated", user_roles=["3-member"])
+
+    def tearDown(self):
+        for path in (self.json_path, self.db_path):
+            pathlib.Path(path).unlink(missing_ok=True)
+
+    def _make_manager(self) -> AuthorizationManager:
+        return AuthorizationManager(id=1, name="authManager", config_file_path=self.db_path)
+
+    def test_migrate_and_upsert(self):
+        manager = self._make_manager()
+        self.assertEqual(["3-member"], [role.unique_label for role in manager.get_user(user_id=10)[0].roles])
+
+        manager.add_user(user_id=11, user_name="added")
+        manager.grant_role_to_user("3-member", "11-added")
+        manager.remove_user(user_id=10, user_name="migrated")
+        # the database is not migrated again once created
+        pathlib.Path(self.json_path).unlink()
+
+        reloaded = self._make_manager()
+        self.assertEqual([], reloaded.get_user(user_id=10))
+        self.assertEqual(["3-member"], [role.unique_label for role in reloaded.get_user(user_id=11)[0].roles])
+        reloaded._storage.close()
+        manager._storage.close()
+        with sqlite3.connect(self.db_path) as conn:
+            self.assertEqual(1, conn.execute("SELECT COUNT(*) FROM user_roles WHERE user_id = 11").fetchone()[0])
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,44 @@
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from launch import Bootstrap, DefaultConfig
+
+
+class BootstrapTest(unittest.TestCase):
+    def setUp(self):
+        # the runtime config of the developer is never read nor written
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_import_builds_nothing(self):
+        script = (
+            "import sys, launch\n"
+            "assert 'modules.chat_bot' not in sys.modules\n"
+            "assert 'graia.ariadne' not in sys.modules\n"
+        )
+        result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True)
+        self.assertEqual(0, result.returncode, result.stderr)
+
+    def test_config_without_bot(self):
+        bootstrap = Bootstrap("Mieka", config_dir=self.temp_dir)
+        self.assertIsNotNone(bootstrap.config.get_config(DefaultConfig.ACCOUNT_ID.name))
+        self.assertEqual(
+            f"{self.temp_dir}/auth_manager.json", bootstrap.config.get_config(DefaultConfig.AUTH_CONFIG_FILE_NAME.name)
+        )
+        self.assertFalse(bootstrap.bot_built)
+
+    def test_build_bot(self):
+        bootstrap = Bootstrap("Mieka", config_dir=self.temp_dir)
+        bot = bootstrap.bot
+        self.assertTrue(bootstrap.bot_built)
+        self.assertIs(bot, bootstrap.bot)
+        self.assertEqual("version", bot.root.get_node(["bot", "version"]).name)
+
+
+if __name__ == "__main__":
+    unittest.main()
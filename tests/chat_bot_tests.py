@@ -0,0 +1,115 @@
+import asyncio
+import datetime
+import pathlib
+import tempfile
+import time
+import unittest
+
+from graia.ariadne.context import enter_context
+from graia.ariadne.event.message import GroupMessage
+from graia.ariadne.message.chain import MessageChain
+from graia.ariadne.message.element import Source
+from graia.ariadne.model import Friend, Group, Member, MemberPerm
+
+from modules.chat_bot import ChatBot, BotInfo, BotConfig, BotConnectionConfig, DUPLICATE_WINDOW
+
+
+class ShardingTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.mkdtemp()
+        cls.bot = ChatBot(
+            bot_info=BotInfo(account_id=11, bot_name="shard"),
+            bot_config=BotConfig(extension_dir="extensions", auth_config_file_path=f"{cls.temp_dir}/auth.json"),
+            bot_connection_config=BotConnectionConfig(verify_key="key"),
+            extra_accounts={12: BotConnectionConfig(verify_key="key")},
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        for path in pathlib.Path(cls.temp_dir).iterdir():
+            path.unlink()
+        pathlib.Path(cls.temp_dir).rmdir()
+
+    def test_accounts(self):
+        self.assertEqual([11, 12], self.bot.accounts)
+
+    def setUp(self):
+        self.bot._recent_messages.clear()
+        self.bot._recent_order.clear()
+
+    def _member(self) -> Member:
+        group = Group(id=100, name="group", permission=MemberPerm.Member)
+        return Member(id=5, memberName="member", permission=MemberPerm.Member, group=group)
+
+    def test_duplicate_group_message(self):
+        member = self._member()
+        message = MessageChain("bot version")
+        # the source is internal to ariadne, so it is constructed without validation
+        source = Source.construct(id=1, time=datetime.datetime.now())
+        self.assertFalse(self.bot._is_duplicate(11, member, message, source))
+        # the copy received by the other account, with its own source id
+        self.assertTrue(self.bot._is_duplicate(12, member, message, Source.construct(id=2, time=source.time)))
+        # sent again later
+        later = Source.construct(id=3, time=source.time + datetime.timedelta(seconds=1))
+        self.assertFalse(self.bot._is_duplicate(12, member, message, later))
+        self.assertTrue(self.bot._is_duplicate(11, member, message, Source.construct(id=4, time=later.time)))
+
+    def test_resend_within_a_second(self):
+        member = self._member()
+        message = MessageChain("1")
+        now = datetime.datetime.now().replace(microsecond=0)
+        # the same text sent twice within the second the source time is rounded to
+        self.assertFalse(self.bot._is_duplicate(11, member, message, Source.construct(id=1, time=now)))
+        self.assertFalse(self.bot._is_duplicate(11, member, message, Source.construct(id=2, time=now)))
+        # the copies of both received by the other account
+        self.assertTrue(self.bot._is_duplicate(12, member, message, Source.construct(id=7, time=now)))
+        self.assertTrue(self.bot._is_duplicate(12, member, message, Source.construct(id=8, time=now)))
+        # a third one reaching the other account first is taken there
+        self.assertFalse(self.bot._is_duplicate(12, member, message, Source.construct(id=9, time=now)))
+        self.assertTrue(self.bot._is_duplicate(11, member, message, Source.construct(id=3, time=now)))
+
+    def test_expired_messages_pruned(self):
+        member = self._member()
+        source = Source.construct(id=1, time=datetime.datetime.now())
+        self.assertFalse(self.bot._is_duplicate(11, member, MessageChain("hi"), source))
+        expired = time.monotonic() - DUPLICATE_WINDOW
+        self.bot._recent_order[0] = (expired, self.bot._recent_order[0][1])
+        self.assertFalse(
+            self.bot._is_duplicate(12, member, MessageChain("hi"), Source.construct(id=2, time=source.time))
+        )
+        self.assertEqual(1, len(self.bot._recent_messages))
+        self.assertEqual(1, len(self.bot._recent_order))
+
+    def test_plugin_receiver_gets_one_copy(self):
+        broadcast = self.bot._ariadne_app.broadcast
+        namespace = broadcast.createNamespace("duplicate_test")
+        received = []
+
+        @broadcast.receiver(GroupMessage, namespace=namespace)
+        async def _plugin_receiver(message: MessageChain):
+            received.append(str(message))
+
+        member = self._member()
+        now = datetime.datetime.now()
+        try:
+            # the same message received by both accounts, then sent again and received by the second one first
+            for account, source_id, time_shift in ((11, 1, 0), (12, 2, 0), (12, 3, 1), (11, 4, 1)):
+                source = Source.construct(id=source_id, time=now + datetime.timedelta(seconds=time_shift))
+                event = GroupMessage.construct(message_chain=MessageChain("hi"), sender=member, source=source)
+                with enter_context(self.bot._apps[account], event):
+                    asyncio.run(broadcast.layered_scheduler(broadcast.default_listener_generator(GroupMessage), event))
+        finally:
+            broadcast.removeListener(broadcast.getListener(_plugin_receiver))
+            broadcast.removeNamespace("duplicate_test")
+        self.assertEqual(["hi", "hi"], received)
+
+    def test_friend_message_never_duplicate(self):
+        friend = Friend(id=5, nickname="friend", remark="")
+        source = Source.construct(id=1, time=datetime.datetime.now())
+        self.assertFalse(self.bot._is_duplicate(11, friend, MessageChain("hi"), source))
+        self.assertFalse(self.bot._is_duplicate(12, friend, MessageChain("hi"), source))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import time
+import unittest
+
+from modules.circuit_breaker import BreakerState, CircuitBreakerRegistry, CircuitOpenError
+
+
+class TestCircuitBreaker(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.registry = CircuitBreakerRegistry(failure_threshold=2, recovery_timeout=0.05)
+        self.calls = 0
+
+    async def _down(self):
+        self.calls += 1
+        raise ConnectionError("backend down")
+
+    async def _up(self):
+        self.calls += 1
+        return "ok"
+
+    async def test_open_after_consecutive_failures(self):
+        for _ in range(2):
+            with self.assertRaises(ConnectionError):
+                await self.registry.call("test", self._down)
+        self.assertEqual(BreakerState.OPEN, self.registry.get("test").state)
+        with self.assertRaises(CircuitOpenError):
+            await self.registry.call("test", self._down)
+        # rejected calls never reach the backend
+        self.assertEqual(2, self.calls)
+
+    async def test_half_open_probe(self):
+        for _ in range(2):
+            with self.assertRaises(ConnectionError):
+                await self.registry.call("test", self._down)
+        time.sleep(0.06)
+        breaker = self.registry.get("test")
+        self.assertEqual(BreakerState.HALF_OPEN, breaker.state)
+        self.assertEqual("ok", await breaker.call(self._up))
+        self.assertEqual(BreakerState.CLOSED, breaker.state)
+
+    async def test_failed_probe_reopens(self):
+        for _ in range(2):
+            with self.assertRaises(ConnectionError):
+                await self.registry.call("test", self._down)
+        time.sleep(0.06)
+        with self.assertRaises(ConnectionError):
+            await self.registry.call("test", self._down)
+        self.assertEqual(BreakerState.OPEN, self.registry.get("test").state)
+
+    async def test_fallback(self):
+        self.registry.register_fallback("test", lambda *_: "fallback")
+        self.assertEqual("fallback", await self.registry.call("test", self._down))
+        self.assertEqual("fallback", await self.registry.call("test", self._down))
+        self.assertEqual("fallback", await self.registry.call("test", self._down))
+        self.assertEqual(2, self.calls)
+
+    def test_reset(self):
+        self.assertFalse(self.registry.reset("missing"))
+        breaker = self.registry.get("test")
+        breaker.record_failure()
+        breaker.record_failure()
+        self.assertEqual(BreakerState.OPEN, breaker.state)
+        self.assertTrue(self.registry.reset("test"))
+        self.assertEqual(BreakerState.CLOSED, breaker.state)
+        status = self.registry.status()
+        self.assertIn("test", status)
+        self.assertIn(BreakerState.CLOSED.value, status)
+
+
+if __name__ == "__main__":
+    unittest.main()
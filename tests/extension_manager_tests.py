@@ -0,0 +1,121 @@
+import asyncio
+import shutil
+import tempfile
+import unittest
+from typing import List
+
+from graia.ariadne.event.lifecycle import ApplicationLaunch
+from graia.broadcast import Broadcast
+
+from modules.auth.core import AuthorizationManager, Root
+from modules.cmd import NameSpaceNode, ExecutableNode
+from modules.extension_manager import ExtensionManager, InstallStatus
+from modules.plugin_base import AbstractPlugin
+
+INSTALL_LOG: List[str] = []
+
+
+def make_plugin(name: str, dependencies: List[str] = (), delay: float = 0.0, fail: bool = False, partial: bool = False):
+    class _Plugin(AbstractPlugin):
+        Dependencies = list(dependencies)
+
+        @classmethod
+        def get_plugin_name(cls) -> str:
+            return name
+
+        @classmethod
+        def get_plugin_description(cls) -> str:
+            return "install test plugin"
+
+        @classmethod
+        def get_plugin_version(cls) -> str:
+            return "0.0.1"
+
+        @classmethod
+        def get_plugin_author(cls) -> str:
+            return "test"
+
+        async def install(self):
+            INSTALL_LOG.append(f"{name}:start")
+            if partial:
+                # a part of the cmds and listeners is registered before the install gets stuck
+                self.root_namespace_node.add_node(ExecutableNode(name=f"{name.lower()}_part", source=lambda: name))
+                self.receiver(ApplicationLaunch)(lambda: None)
+            await asyncio.sleep(delay)
+            if fail:
+                raise RuntimeError("install failed")
+            self.root_namespace_node.add_node(ExecutableNode(name=name.lower(), source=lambda: name))
+            INSTALL_LOG.append(f"{name}:end")
+
+    return _Plugin
+
+
+class InstallWavesTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        INSTALL_LOG.clear()
+        self.temp_dir = tempfile.mkdtemp()
+        self.manager = ExtensionManager(
+            self.temp_dir, [], manifest_cache_path=f"{self.temp_dir}/manifests.json", install_timeout=0.2
+        )
+        self.broadcast = Broadcast()
+        self.context = dict(
+            broadcast=self.broadcast,
+            root_namespace_node=NameSpaceNode(name="root"),
+            proxy=self.manager.plugins_view,
+            auth_manager=AuthorizationManager(**Root()._asdict(), config_file_path=f"{self.temp_dir}/auth.json"),
+        )
+        self.manager.bind_install_context(**self.context)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _load(self, *plugins):
+        for plugin in plugins:
+            self.manager.load_plugin(plugin=plugin, **self.context)
+
+    async def test_waves(self):
+        self._load(make_plugin("A", delay=0.05), make_plugin("B", delay=0.05), make_plugin("C", ["A", "B"]))
+        results = await self.manager.install_plugins(["C", "A", "B"])
+        self.assertEqual({"A": True, "B": True, "C": True}, results)
+        # A and B are independent, so they run concurrently, C waits for both
+        self.assertEqual(["A:start", "B:start"], sorted(INSTALL_LOG[:2]))
+        self.assertEqual("C:start", INSTALL_LOG[4])
+        waves = {record.plugin: record.wave for record in self.manager.install_timeline}
+        self.assertEqual({"A": 0, "B": 0, "C": 1}, waves)
+        self.assertFalse(self.broadcast.getNamespace("C").disabled)
+        # the nodes added by the concurrent installs are told apart by their owners
+        owners = {node.name: node.owner for node in self.context["root_namespace_node"].children_node}
+        self.assertEqual({"a": "A", "b": "B", "c": "C"}, owners)
+
+    async def test_timeout_and_failed_dependency(self):
+        self._load(make_plugin("Slow", delay=1), make_plugin("Broken", fail=True), make_plugin("Child", ["Broken"]))
+        results = await self.manager.install_plugins(["Slow", "Broken", "Child"])
+        self.assertEqual({"Slow": False, "Broken": False, "Child": False}, results)
+        status = {record.plugin: record.status for record in self.manager.install_timeline}
+        self.assertEqual(InstallStatus.TIMEOUT, status["Slow"])
+        self.assertEqual(InstallStatus.FAILED, status["Broken"])
+        self.assertEqual(InstallStatus.SKIPPED, status["Child"])
+        self.assertNotIn("Child:start", INSTALL_LOG)
+        self.assertNotIn("Slow", self.manager.plugins)
+        self.assertFalse(self.broadcast.containNamespace("Slow"))
+        self.assertFalse(self.manager.enable_plugin("Slow"))
+
+    async def test_partial_install_detached(self):
+        self._load(make_plugin("Stuck", delay=1, partial=True), make_plugin("Fine"))
+        listener_count = len(self.broadcast.listeners)
+        results = await self.manager.install_plugins(["Stuck", "Fine"])
+        self.assertEqual({"Stuck": False, "Fine": True}, results)
+        # the node and the listener the timed out install registered are gone along with the plugin
+        names = [node.name for node in self.context["root_namespace_node"].children_node]
+        self.assertEqual(["fine"], names)
+        self.assertEqual(listener_count, len(self.broadcast.listeners))
+        self.assertNotIn("Stuck", self.manager.plugins)
+
+    async def test_cycle(self):
+        self._load(make_plugin("X", ["Y"]), make_plugin("Y", ["X"]), make_plugin("Z"))
+        results = await self.manager.install_plugins(["X", "Y", "Z"])
+        self.assertEqual({"X": False, "Y": False, "Z": True}, results)
+
+
+if __name__ == "__main__":
+    unittest.main()
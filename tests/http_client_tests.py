@@ -0,0 +1,63 @@
+import unittest
+
+from aiohttp import web
+
+from modules.http_client import HttpClient, HttpClientConfig
+
+
+class TestHttpClient(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.flaky_calls = 0
+
+        async def hello(request: web.Request) -> web.Response:
+            return web.json_response({"hello": "world"})
+
+        async def flaky(request: web.Request) -> web.Response:
+            self.flaky_calls += 1
+            if self.flaky_calls < 3:
+                return web.Response(status=503)
+            return web.Response(text="ok")
+
+        app = web.Application()
+        app.router.add_get("/hello", hello)
+        app.router.add_get("/flaky", flaky)
+        app.router.add_post("/flaky", flaky)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        self.base = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+        self.client = HttpClient(HttpClientConfig(retries=2, backoff_factor=0.01))
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        await self.runner.cleanup()
+
+    async def test_session_reused(self):
+        self.assertEqual({"hello": "world"}, await (await self.client.get(f"{self.base}/hello")).json())
+        session = self.client.session
+        await self.client.get(f"{self.base}/hello")
+        self.assertIs(session, self.client.session)
+
+    async def test_retry_with_backoff(self):
+        response = await self.client.get(f"{self.base}/flaky")
+        self.assertEqual(200, response.status)
+        self.assertEqual("ok", await response.text())
+        metric = list(self.client.metrics().values())[0]
+        self.assertEqual(1, metric["requests"])
+        self.assertEqual(2, metric["retries"])
+        self.assertEqual(0, metric["failures"])
+
+    async def test_no_retry_for_post(self):
+        response = await self.client.post(f"{self.base}/flaky")
+        self.assertEqual(503, response.status)
+        self.assertEqual(1, self.flaky_calls)
+
+    async def test_close(self):
+        await self.client.get(f"{self.base}/hello")
+        await self.client.close()
+        self.assertTrue(self.client.closed)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import pathlib
+import shutil
+import tempfile
+import unittest
+
+from modules.launch_utils import (
+    requirements_fingerprint,
+    load_fingerprint_record,
+    save_fingerprint_record,
+    resolve_installed_versions,
+)
+
+
+class RequirementsFingerprintTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = pathlib.Path(tempfile.mkdtemp())
+        self.req_file = self.temp_dir / "requirements.txt"
+        self.req_file.write_text("pydantic\nnot-a-real-package-xyz==1.0\n", encoding="utf-8")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_fingerprint_follows_requirements(self):
+        fingerprint = requirements_fingerprint([self.req_file])
+        self.assertEqual(fingerprint, requirements_fingerprint([self.req_file]))
+        self.req_file.write_text("pydantic\n", encoding="utf-8")
+        self.assertNotEqual(fingerprint, requirements_fingerprint([self.req_file]))
+
+    def test_record(self):
+        record_path = self.temp_dir / "record.json"
+        self.assertEqual({}, load_fingerprint_record(record_path))
+        installed = resolve_installed_versions(str(self.req_file))
+        self.assertIsNotNone(installed["pydantic"])
+        self.assertIsNone(installed["not-a-real-package-xyz"])
+        save_fingerprint_record(record_path, "abc", installed)
+        self.assertEqual({"fingerprint": "abc", "installed": installed}, load_fingerprint_record(record_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
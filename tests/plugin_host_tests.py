@@ -0,0 +1,101 @@
+import os
+import pathlib
+import shutil
+import sys
+import tempfile
+import unittest
+
+from graia.broadcast import Broadcast
+
+from modules.auth.core import AuthorizationManager, Root
+from modules.cmd import NameSpaceNode
+from modules.extension_manager import ExtensionManager
+from modules.plugin_host import IsolatedPlugin, PluginWorkerError
+
+PLUGIN_SOURCE = '''
+import os
+
+from modules.plugin_base import AbstractPlugin
+from modules.cmd import ExecutableNode, NameSpaceNode
+
+
+def pid():
+    """the pid of the worker"""
+    return os.getpid()
+
+
+class Heavy(AbstractPlugin):
+    Isolated = True
+
+    @classmethod
+    def get_plugin_name(cls) -> str:
+        return "Heavy"
+
+    @classmethod
+    def get_plugin_description(cls) -> str:
+        return "isolated test plugin"
+
+    @classmethod
+    def get_plugin_version(cls) -> str:
+        return "0.0.1"
+
+    @classmethod
+    def get_plugin_author(cls) -> str:
+        return "test"
+
+    def install(self):
+        self.root_namespace_node.add_node(
+            NameSpaceNode(
+                name="heavy",
+                children_node=[
+                    ExecutableNode(name="pid", source=pid),
+                    ExecutableNode(name="add", source=lambda a, b: int(a) + int(b)),
+                    ExecutableNode(name="crash", source=lambda: os._exit(1)),
+                ],
+            )
+        )
+'''
+
+
+class PluginHostTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.ext_dir = tempfile.mkdtemp(prefix="tmp_ext_", dir=".")
+        self.ext_name = pathlib.Path(self.ext_dir).name
+        plugin_dir = pathlib.Path(self.ext_dir, "heavy")
+        plugin_dir.mkdir()
+        plugin_dir.joinpath("plugin.py").write_text(PLUGIN_SOURCE, encoding="utf-8")
+        plugin_dir.joinpath("__init__.py").write_text('from .plugin import Heavy\n\n__all__ = ["Heavy"]\n')
+        self.auth_path = f"{self.ext_dir}/auth.json"
+
+    def tearDown(self):
+        for plugin in self.manager.plugins.values():
+            plugin.uninstall()
+        shutil.rmtree(self.ext_dir, ignore_errors=True)
+
+    async def test_isolated(self):
+        self.manager = ExtensionManager(self.ext_name, [], manifest_cache_path=f"{self.ext_dir}/manifests.json")
+        root = NameSpaceNode(name="root")
+        await self.manager.install_all_extensions_async(
+            broadcast=Broadcast(),
+            root_namespace_node=root,
+            proxy=self.manager.plugins_view,
+            auth_manager=AuthorizationManager(**Root()._asdict(), config_file_path=self.auth_path),
+        )
+        plugin = self.manager.plugins["Heavy"]
+        self.assertIsInstance(plugin, IsolatedPlugin)
+        # the host never imports the isolated plugin
+        self.assertNotIn(f"{self.ext_name}.heavy", sys.modules)
+        self.assertIn("the pid of the worker", root.get_node(["heavy", "pid"]).__doc__())
+
+        worker_pid = await (await root.interpret("heavy pid"))
+        self.assertNotEqual(os.getpid(), worker_pid)
+        self.assertEqual(5, await (await root.interpret("heavy add 2 3")))
+
+        with self.assertRaises(PluginWorkerError):
+            await (await root.interpret("heavy crash"))
+        # the dead worker is spawned again on the next call
+        self.assertNotEqual(worker_pid, await (await root.interpret("heavy pid")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,244 @@
+import asyncio
+import pathlib
+import shutil
+import sys
+import tempfile
+import unittest
+
+from graia.broadcast import Broadcast
+
+from modules.auth.core import AuthorizationManager, Root
+from modules.cmd import NameSpaceNode
+from modules.extension_manager import ExtensionManager
+from modules.plugin_manifest import ManifestCache, ManifestError, parse_extension
+
+PLUGIN_SOURCE = """
+from modules.plugin_base import AbstractPlugin
+from modules.cmd import ExecutableNode
+from graia.ariadne.event.lifecycle import ApplicationLaunch
+
+
+class Lazy(AbstractPlugin):
+    LazyLoad = True
+
+    @classmethod
+    def get_plugin_name(cls) -> str:
+        return "LazyOne"
+
+    @classmethod
+    def get_plugin_description(cls) -> str:
+        return "lazy test plugin"
+
+    @classmethod
+    def get_plugin_version(cls) -> str:
+        return "0.0.1"
+
+    @classmethod
+    def get_plugin_author(cls) -> str:
+        return "test"
+
+    def install(self):
+        self.root_namespace_node.add_node(ExecutableNode(name="lz", aliases=["lazy"], source=lambda: "lazy"))
+
+        @self.receiver(ApplicationLaunch)
+        async def _launch():
+            pass
+"""
+
+DEPENDENT_SOURCE = """
+from modules.plugin_base import AbstractPlugin
+
+
+class Dependent(AbstractPlugin):
+    Dependencies = ["LazyOne"]
+
+    @classmethod
+    def get_plugin_name(cls) -> str:
+        return "Dependent"
+
+    @classmethod
+    def get_plugin_description(cls) -> str:
+        return "dependent test plugin"
+
+    @classmethod
+    def get_plugin_version(cls) -> str:
+        return "0.0.1"
+
+    @classmethod
+    def get_plugin_author(cls) -> str:
+        return "test"
+
+    def install(self):
+        self.dependency = self.plugin_view["LazyOne"]
+
+
+__all__ = ["Dependent"]
+"""
+
+
+class ManifestTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.ext_dir = tempfile.mkdtemp(prefix="tmp_ext_", dir=".")
+        self.ext_name = pathlib.Path(self.ext_dir).name
+        plugin_dir = pathlib.Path(self.ext_dir, "lazy_one")
+        plugin_dir.mkdir()
+        plugin_dir.joinpath("plugin.py").write_text(PLUGIN_SOURCE, encoding="utf-8")
+        plugin_dir.joinpath("__init__.py").write_text('from .plugin import Lazy\n\n__all__ = ["Lazy"]\n')
+        self.cache_path = f"{self.ext_dir}/manifests.json"
+        self.auth_path = f"{self.ext_dir}/auth.json"
+
+    def tearDown(self):
+        shutil.rmtree(self.ext_dir, ignore_errors=True)
+        for module in [name for name in sys.modules if name.startswith(self.ext_name)]:
+            del sys.modules[module]
+
+    async def _install(self) -> (ExtensionManager, NameSpaceNode):
+        manager = ExtensionManager(self.ext_name, [], manifest_cache_path=self.cache_path)
+        root = NameSpaceNode(name="root")
+        await manager.install_all_extensions_async(
+            broadcast=Broadcast(),
+            root_namespace_node=root,
+            proxy=manager.plugins_view,
+            auth_manager=AuthorizationManager(**Root()._asdict(), config_file_path=self.auth_path),
+        )
+        return manager, root
+
+    def test_parse_without_import(self):
+        manifests = parse_extension(pathlib.Path(self.ext_dir, "lazy_one"), f"{self.ext_name}.lazy_one")
+        self.assertEqual(1, len(manifests))
+        self.assertEqual("LazyOne", manifests[0].name)
+        self.assertTrue(manifests[0].lazy)
+        self.assertFalse(manifests[0].benchmarked)
+        self.assertNotIn(f"{self.ext_name}.lazy_one", sys.modules)
+
+    def test_benchmarked_failing_import(self):
+        plugin_path = pathlib.Path(self.ext_dir, "lazy_one", "plugin.py")
+        benchmarked = PLUGIN_SOURCE.replace(
+            "    def install(self):", "    def benchmark_scenarios(self):\n        return []\n\n    def install(self):"
+        )
+        plugin_path.write_text("import not_installed_module\n" + benchmarked, encoding="utf-8")
+        manifests = parse_extension(pathlib.Path(self.ext_dir, "lazy_one"), f"{self.ext_name}.lazy_one")
+        self.assertTrue(manifests[0].benchmarked)
+        # the failing import is raised to the caller, instead of the plugin vanishing without a word
+        with self.assertRaises(ModuleNotFoundError):
+            ExtensionManager.import_extension(f"{self.ext_name}.lazy_one")
+
+    def test_unresolvable(self):
+        pathlib.Path(self.ext_dir, "lazy_one", "__init__.py").write_text("__all__ = [name for name in 'ab']\n")
+        with self.assertRaises(ManifestError):
+            parse_extension(pathlib.Path(self.ext_dir, "lazy_one"), f"{self.ext_name}.lazy_one")
+
+    async def test_lazy_install_on_cmd(self):
+        # the first boot installs the plugin to record its roots and events
+        manager, root = await self._install()
+        self.assertIn("LazyOne", manager.plugins)
+        recorded = ManifestCache(self.cache_path).plugins_of("LazyOne")[0]
+        self.assertTrue(recorded.learned)
+        self.assertEqual(["lz", "lazy"], recorded.command_roots)
+        self.assertEqual(["ApplicationLaunch"], recorded.events)
+
+        for module in [name for name in sys.modules if name.startswith(self.ext_name)]:
+            del sys.modules[module]
+        manager, root = await self._install()
+        self.assertNotIn("LazyOne", manager.plugins)
+        self.assertIn("LazyOne", manager.lazy_plugins)
+        self.assertNotIn(f"{self.ext_name}.lazy_one", sys.modules)
+
+        self.assertFalse(await manager.load_lazy_plugin_for_cmd("unknown cmd"))
+        self.assertTrue(await manager.load_lazy_plugin_for_cmd("lazy"))
+        self.assertIn("LazyOne", manager.plugins)
+        self.assertNotIn("LazyOne", manager.lazy_plugins)
+        self.assertEqual("lz", root.get_node(["lz"]).name)
+
+    async def test_concurrent_lazy_install(self):
+        await self._install()
+        for module in [name for name in sys.modules if name.startswith(self.ext_name)]:
+            del sys.modules[module]
+        manager, root = await self._install()
+        self.assertIn("LazyOne", manager.lazy_plugins)
+
+        # the cmds coming while the plugin is being installed wait for the same install
+        results = await asyncio.gather(*(manager.load_lazy_plugin_for_cmd(cmd) for cmd in ("lazy", "lz", "lazy")))
+        self.assertEqual([True, True, True], results)
+        self.assertEqual(["lz"], [node.name for node in root.children_node])
+        self.assertEqual({}, manager._lazy_command_index)
+        self.assertFalse(await manager.load_lazy_plugin_for_cmd("lazy"))
+
+    async def test_reload(self):
+        manager, root = await self._install()
+        broadcast = manager._install_context["broadcast"]
+        old_plugin = manager.plugins["LazyOne"]
+        listener_count = len(broadcast.listeners)
+
+        plugin_path = pathlib.Path(self.ext_dir, "lazy_one", "plugin.py")
+        plugin_path.write_text(PLUGIN_SOURCE.replace('name="lz"', 'name="lz_new"'), encoding="utf-8")
+        self.assertTrue(await manager.reload_plugin("LazyOne"))
+        self.assertIsNot(old_plugin, manager.plugins["LazyOne"])
+        self.assertEqual(["lz_new"], [node.name for node in root.children_node])
+        self.assertEqual(listener_count, len(broadcast.listeners))
+        self.assertFalse(await manager.reload_plugin("NotInstalled"))
+
+    async def test_reload_dependents(self):
+        dependent_dir = pathlib.Path(self.ext_dir, "dependent")
+        dependent_dir.mkdir()
+        dependent_dir.joinpath("__init__.py").write_text(DEPENDENT_SOURCE, encoding="utf-8")
+        manager, root = await self._install()
+        old_dependent = manager.plugins["Dependent"]
+        self.assertIs(manager.plugins["LazyOne"], old_dependent.dependency)
+
+        # the dependent is installed again, instead of keeping the old plugin it took at the install
+        self.assertTrue(await manager.reload_plugin("LazyOne"))
+        self.assertIsNot(old_dependent, manager.plugins["Dependent"])
+        self.assertIs(manager.plugins["LazyOne"], manager.plugins["Dependent"].dependency)
+
+        # a failed reload restores the dependent along with the plugin
+        old_plugin, old_dependent = manager.plugins["LazyOne"], manager.plugins["Dependent"]
+        plugin_path = pathlib.Path(self.ext_dir, "lazy_one", "plugin.py")
+        plugin_path.write_text(
+            PLUGIN_SOURCE.replace("    def install(self):\n", "    def install(self):\n        1 / 0\n")
+        )
+        self.assertFalse(await manager.reload_plugin("LazyOne"))
+        self.assertIs(old_plugin, manager.plugins["LazyOne"])
+        self.assertIs(old_dependent, manager.plugins["Dependent"])
+        self.assertFalse(old_dependent.namespace.disabled)
+
+    async def _assert_still_serves(self, manager: ExtensionManager, root: NameSpaceNode, old_plugin, listener_count):
+        broadcast = manager._install_context["broadcast"]
+        self.assertIs(old_plugin, manager.plugins["LazyOne"])
+        self.assertEqual(["lz"], [node.name for node in root.children_node])
+        self.assertEqual("lazy", await root.get_node(["lz"]).get_execute([]))
+        self.assertEqual(listener_count, len(broadcast.listeners))
+        self.assertIn(old_plugin.namespace, broadcast.namespaces)
+        self.assertFalse(old_plugin.namespace.disabled)
+
+    async def test_reload_import_error(self):
+        manager, root = await self._install()
+        old_plugin = manager.plugins["LazyOne"]
+        listener_count = len(manager._install_context["broadcast"].listeners)
+
+        plugin_path = pathlib.Path(self.ext_dir, "lazy_one", "plugin.py")
+        plugin_path.write_text(PLUGIN_SOURCE + '\nraise RuntimeError("broken edit")\n', encoding="utf-8")
+        self.assertFalse(await manager.reload_plugin("LazyOne"))
+        await self._assert_still_serves(manager, root, old_plugin, listener_count)
+
+        # the plugin is still reloadable once the edit is fixed
+        plugin_path.write_text(PLUGIN_SOURCE.replace('name="lz"', 'name="lz_new"'), encoding="utf-8")
+        self.assertTrue(await manager.reload_plugin("LazyOne"))
+        self.assertEqual(["lz_new"], [node.name for node in root.children_node])
+
+    async def test_reload_install_error(self):
+        manager, root = await self._install()
+        old_plugin = manager.plugins["LazyOne"]
+        listener_count = len(manager._install_context["broadcast"].listeners)
+
+        plugin_path = pathlib.Path(self.ext_dir, "lazy_one", "plugin.py")
+        broken_install = PLUGIN_SOURCE.replace(
+            "            pass\n", '            pass\n\n        raise RuntimeError("broken install")\n'
+        )
+        plugin_path.write_text(broken_install, encoding="utf-8")
+        self.assertFalse(await manager.reload_plugin("LazyOne"))
+        await self._assert_still_serves(manager, root, old_plugin, listener_count)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+import json
+import pathlib
+import tempfile
+import unittest
+
+from modules.startup_profiler import StartupProfiler
+
+
+class StartupProfilerTest(unittest.TestCase):
+    def test_disabled_records_nothing(self):
+        profiler = StartupProfiler()
+        with profiler.phase("idle"):
+            pass
+        self.assertEqual([], profiler.records)
+
+    def test_phases(self):
+        profiler = StartupProfiler()
+        profiler.enable()
+        try:
+            with profiler.phase("outer"):
+                with profiler.phase("Plugin:install", "plugin"):
+                    buffer = [bytearray(1024) for _ in range(64)]
+        finally:
+            profiler.disable()
+        records = {record.name: record for record in profiler.records}
+        self.assertEqual(0, records["outer"].depth)
+        self.assertEqual(1, records["Plugin:install"].depth)
+        self.assertEqual("plugin", records["Plugin:install"].category)
+        self.assertGreaterEqual(records["outer"].duration, records["Plugin:install"].duration)
+        self.assertGreater(records["Plugin:install"].memory, 64 * 1024)
+        self.assertIn("Plugin:install", profiler.report())
+        del buffer
+
+        trace_path = pathlib.Path(tempfile.mkdtemp()) / "trace.json"
+        profiler.dump(trace_path)
+        events = json.loads(trace_path.read_text(encoding="utf-8"))["traceEvents"]
+        self.assertEqual({"outer", "Plugin:install"}, {event["name"] for event in events})
+
+
+if __name__ == "__main__":
+    unittest.main()